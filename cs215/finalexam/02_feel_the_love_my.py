@@ -10,17 +10,34 @@
 # Devise and implement an algorithm for this problem.
 #
 
-def get_reachable_nodes(G, i):
-    unvisited_nodes = [i]
-    visited_nodes = set([i])
+import collections
+
+def get_bfs_tree(G, root):
+    """
+    Runs a breadth-first search of G from the given node.  Returns a tuple
+    whose values are two dicts, whose keys are the nodes reachable from the
+    root, and whose values are the number of edges from the root and the
+    parent in the search tree (None for the root), respectively.
+    """
+    depths = {root: 0}
+    parents = {root: None}
+    unvisited_nodes = collections.deque([root])
     while unvisited_nodes:
-        node = unvisited_nodes[0]
-        del unvisited_nodes[0]
+        node = unvisited_nodes.popleft()
         for adjacent_node in G[node]:
-            if adjacent_node not in visited_nodes:
-                visited_nodes.add(adjacent_node)
+            if adjacent_node not in depths:
+                depths[adjacent_node] = depths[node] + 1
+                parents[adjacent_node] = node
                 unvisited_nodes.append(adjacent_node)
-    return visited_nodes
+    return (depths, parents)
+
+def get_path_to_root(parents, node):
+    # returns the path from the given node up to the root of the search tree
+    path = [node]
+    while parents[node] is not None:
+        node = parents[node]
+        path.append(node)
+    return path
 
 def get_max_path_weight(G, nodes):
     max_edge_weight = None
@@ -35,35 +52,88 @@ def feel_the_love(G, i, j):
     # with `i` as the first node and `j` as the last node,
     # or None if no path exists
 
-    reachable_nodes = get_reachable_nodes(G, i)
-    if j not in reachable_nodes:
+    # the best score is that of the heaviest edge in the connected component
+    # so the shortest path goes from i to one of the heaviest edges, across
+    # it, and then on to j; a search from each end finds it in O(n + m)
+    (i_depths, i_parents) = get_bfs_tree(G, i)
+    if j not in i_depths:
         return None
 
-    max_edge_weight = get_max_path_weight(G, reachable_nodes)
+    max_edge_weight = get_max_path_weight(G, i_depths)
     if max_edge_weight is None:
         return None
 
-    unvisited = [([i], None)]
-    while True:
-        (path, path_weight) = unvisited[0]
-        del unvisited[0]
-        node = path[-1]
+    (j_depths, j_parents) = get_bfs_tree(G, j)
+    best_edge = None
+    best_length = None
+    for a in i_depths:
+        for (b, weight) in G[a].iteritems():
+            if weight == max_edge_weight:
+                length = i_depths[a] + j_depths[b]
+                if best_length is None or length < best_length:
+                    best_edge = (a, b)
+                    best_length = length
 
-        for adjacent_node in G[node]:
-            new_path = path + [adjacent_node]
+    (a, b) = best_edge
+    path = get_path_to_root(i_parents, a)
+    path.reverse()
+    path.extend(get_path_to_root(j_parents, b))
+    return path
+
+class LoveIndex(object):
+    """
+    Answers feel_the_love() queries on the same graph without searching it
+    again.  Building the index labels the connected components of G and, for
+    each one, picks one of its heaviest edges and keeps a breadth-first
+    search tree rooted at each end of that edge, all in O(n + m).  A query
+    then just walks up those trees, so it takes time proportional to the
+    length of the path it returns.  The paths have the same score as those
+    from feel_the_love() but, since they all cross the same edge, they are
+    not always the shortest ones.
+    """
 
-            new_edge_weight = G[node][adjacent_node]
-            if path_weight is None:
-                new_path_weight = new_edge_weight
-            elif new_edge_weight > path_weight:
-                new_path_weight = new_edge_weight
+    def __init__(self, G):
+        self.components = {} # node -> component id
+        self.heaviest_edges = [] # component id -> (a, b), or None if no edges
+        self.trees = [] # component id -> (a tree, b tree) from get_bfs_tree()
+        for node in G:
+            if node in self.components:
+                continue
+            component = len(self.heaviest_edges)
+            (depths, unused_parents) = get_bfs_tree(G, node)
+            heaviest_edge = None
+            max_edge_weight = None
+            for a in depths:
+                self.components[a] = component
+                for (b, weight) in G[a].iteritems():
+                    if max_edge_weight is None or weight > max_edge_weight:
+                        heaviest_edge = (a, b)
+                        max_edge_weight = weight
+            self.heaviest_edges.append(heaviest_edge)
+            if heaviest_edge is None:
+                self.trees.append(None)
             else:
-                new_path_weight = path_weight
+                (a, b) = heaviest_edge
+                self.trees.append((get_bfs_tree(G, a), get_bfs_tree(G, b)))
 
-            if new_path_weight == max_edge_weight and new_path[-1] == j:
-                return new_path
+    def feel_the_love(self, i, j):
+        """
+        Returns a path from i to j whose score is the best possible, like
+        feel_the_love(), or None if there is no such path.
+        """
+        component = self.components[i]
+        if self.components[j] != component or self.trees[component] is None:
+            return None
 
-            unvisited.append((new_path, new_path_weight))
+        ((a_depths, a_parents), (b_depths, b_parents)) = self.trees[component]
+        # cross the edge from a to b or, if that is shorter, from b to a
+        if a_depths[i] + b_depths[j] <= b_depths[i] + a_depths[j]:
+            path = get_path_to_root(a_parents, i)
+            path.extend(reversed(get_path_to_root(b_parents, j)))
+        else:
+            path = get_path_to_root(b_parents, i)
+            path.extend(reversed(get_path_to_root(a_parents, j)))
+        return path
 
 import unittest
 
@@ -228,3 +298,65 @@ class DenverTests(unittest.TestCase):
         }
         x = feel_the_love(G, 2, 3)
         self.assertListEqual(x, [2, 1, 5, 50, 5, 1, 3])
+
+    def test_LongCycle(self):
+        # exponential for a search that enumerates every walk
+        G = collections.defaultdict(dict)
+        for x in xrange(1000):
+            G[x][(x + 1) % 1000] = 1
+            G[(x + 1) % 1000][x] = 1
+        G[500][501] = G[501][500] = 2
+        x = feel_the_love(G, 0, 1)
+        self.assertEqual(len(x), 1000)
+        self.assertEqual(score_of_path(G, x), 2)
+
+class LoveIndexTests(unittest.TestCase):
+
+    def assert_valid_path(self, G, path, i, j):
+        self.assertEqual(path[0], i)
+        self.assertEqual(path[-1], j)
+        for (n1, n2) in zip(path[:-1], path[1:]):
+            self.assertIn(n2, G[n1])
+
+    def test_SameScoresAsFeelTheLove(self):
+        G = {
+            1: {2:1, 3:1, 4:10, 5:1},
+            2: {1:1},
+            3: {1:1},
+            4: {1:10},
+            5: {1:1, 50:20},
+            10: {20:1, 30:1, 40:10, 50:1},
+            20: {10:1},
+            30: {10:1},
+            40: {10:10},
+            50: {10:1, 5:20},
+            60: {},
+        }
+        index = LoveIndex(G)
+        for i in G:
+            for j in G:
+                expected = feel_the_love(G, i, j)
+                actual = index.feel_the_love(i, j)
+                if expected is None:
+                    self.assertIsNone(actual, (i, j))
+                else:
+                    self.assert_valid_path(G, actual, i, j)
+                    self.assertEqual(score_of_path(G, actual),
+                        score_of_path(G, expected))
+
+    def test_ShortestWayAcrossTheEdge(self):
+        G = {
+            1: {2:5},
+            2: {1:5, 3:1},
+            3: {2:1},
+        }
+        index = LoveIndex(G)
+        self.assertListEqual(index.feel_the_love(1, 2), [1, 2])
+        self.assertListEqual(index.feel_the_love(3, 1), [3, 2, 1])
+        self.assertListEqual(index.feel_the_love(1, 1), [1, 2, 1])
+
+    def test_DifferentComponents(self):
+        G = {1: {2: 1}, 2: {1: 1}, 3: {}}
+        index = LoveIndex(G)
+        self.assertIsNone(index.feel_the_love(1, 3))
+        self.assertIsNone(index.feel_the_love(3, 3))
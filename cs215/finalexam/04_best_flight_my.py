@@ -26,6 +26,15 @@
 # you'll have to search the graph to find them.
 #
 
+import array
+import bisect
+import multiprocessing
+
+from cs215.finalexam.shortest_paths import algebraic_dijkstra
+from cs215.finalexam.shortest_paths import lexicographic_algebra
+
+MINUTES_PER_DAY = 24 * 60
+
 class Flight(object):
 
     def __init__(self, number, depart_city, arrive_city, depart_time,
@@ -75,58 +84,276 @@ def flight_tuples_to_objects(flight_tuples):
             arrive_time, cost)
         yield flight_obj
 
-def make_flight_graph(flights, origin, destination):
-    cities = {}
-    G = {}
+class FlightTable(object):
+    """
+    A timetable stored column by column, as one array per field, instead of
+    as one Flight object per flight: a flight then takes a few dozen bytes
+    instead of a few hundred.  City names are interned as integer ids, and
+    the flight lengths are computed once, when a flight is added.
+
+    Indexing or iterating over a table gives FlightRow views, which have the
+    same attributes and methods as Flight, so a table can be passed anywhere
+    that an iterable of Flight objects is expected.
+    """
+
+    def __init__(self, flights=()):
+        """
+        *flights* is an iterable of Flight objects to add to the table.
+        """
+        self.cities = [] # city id -> city name
+        self.city_ids = {} # city name -> city id
+        self.numbers = array.array("l")
+        self.depart_cities = array.array("l")
+        self.arrive_cities = array.array("l")
+        self.depart_times = array.array("l")
+        self.arrive_times = array.array("l")
+        self.costs = array.array("l")
+        self.durations = array.array("l")
+        for flight in flights:
+            self.append(flight.number, flight.depart_city, flight.arrive_city,
+                flight.depart_time, flight.arrive_time, flight.cost)
+
+    @classmethod
+    def from_tuples(cls, flight_tuples):
+        """
+        Loads the table from tuples like those in all_flights, with times as
+        "HH:MM" strings.  This replaces flight_tuples_to_objects(): each
+        distinct time string is only parsed once, since there are at most
+        MINUTES_PER_DAY of them no matter how many flights there are.
+        """
+        table = cls()
+        times = {}
+        for (number, depart_city, arrive_city, depart_time_str,
+                arrive_time_str, cost) in flight_tuples:
+            depart_time = times.get(depart_time_str)
+            if depart_time is None:
+                depart_time = times[depart_time_str] = parse_time_str(
+                    depart_time_str)
+            arrive_time = times.get(arrive_time_str)
+            if arrive_time is None:
+                arrive_time = times[arrive_time_str] = parse_time_str(
+                    arrive_time_str)
+            table.append(number, depart_city, arrive_city, depart_time,
+                arrive_time, cost)
+        return table
+
+    def city_id(self, city):
+        """
+        Returns the integer id of the city with the given name, giving it a
+        new one if it does not have one yet.
+        """
+        city_id = self.city_ids.get(city)
+        if city_id is None:
+            city_id = len(self.cities)
+            self.city_ids[city] = city_id
+            self.cities.append(city)
+        return city_id
+
+    def append(self, number, depart_city, arrive_city, depart_time,
+            arrive_time, cost):
+        self.numbers.append(number)
+        self.depart_cities.append(self.city_id(depart_city))
+        self.arrive_cities.append(self.city_id(arrive_city))
+        self.depart_times.append(depart_time)
+        self.arrive_times.append(arrive_time)
+        self.costs.append(cost)
+        self.durations.append(arrive_time - depart_time)
+
+    def __len__(self):
+        return len(self.numbers)
+
+    def __getitem__(self, index):
+        if not -len(self.numbers) <= index < len(self.numbers):
+            raise IndexError("flight index out of range: {}".format(index))
+        return FlightRow(self, index % len(self.numbers))
+
+    def __iter__(self):
+        for index in xrange(len(self.numbers)):
+            yield FlightRow(self, index)
+
+class FlightRow(object):
+    """
+    A view of one flight in a FlightTable that looks like a Flight object.
+    """
+
+    __slots__ = ("table", "index")
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    @property
+    def number(self):
+        return self.table.numbers[self.index]
+
+    @property
+    def depart_city(self):
+        return self.table.cities[self.table.depart_cities[self.index]]
+
+    @property
+    def arrive_city(self):
+        return self.table.cities[self.table.arrive_cities[self.index]]
+
+    @property
+    def depart_time(self):
+        return self.table.depart_times[self.index]
+
+    @property
+    def arrive_time(self):
+        return self.table.arrive_times[self.index]
+
+    @property
+    def cost(self):
+        return self.table.costs[self.index]
+
+    def flight_length(self):
+        return self.table.durations[self.index]
 
-    def add_flight_to_graph_if_cheaper(depart_city, arrive_city, flight):
-        if arrive_city not in G[depart_city]:
+    # comparisons, str() and repr() work just like they do for Flight
+    __eq__ = Flight.__eq__.im_func
+    __str__ = Flight.__str__.im_func
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "FlightRow({!r})".format(Flight(self.number, self.depart_city,
+            self.arrive_city, self.depart_time, self.arrive_time, self.cost))
+
+def add_flight_to_graph_if_cheaper(G, depart_city, arrive_city, flight):
+    if arrive_city not in G[depart_city]:
+        G[depart_city][arrive_city] = flight
+    else:
+        cur_flight = G[depart_city][arrive_city]
+        flight_cost = (flight.cost, flight.flight_length())
+        cur_flight_cost = (cur_flight.cost, cur_flight.flight_length())
+        if flight_cost < cur_flight_cost:
             G[depart_city][arrive_city] = flight
+
+class TimetableIndex(object):
+    """
+    The flights of a timetable arranged for fast lookups by city and time:
+    for each city, the flights that depart from it sorted by departure time
+    and the distinct times at which flights arrive there, also sorted, so
+    that bisect can find the flights that can be caught after an arrival and
+    the arrivals that can catch a departure.  It is shared by the graph
+    builders below and can be used by any other query engine.
+    """
+
+    def __init__(self, flights):
+        """
+        *flights* is an iterable of Flight objects.
+        """
+        self.flights = tuple(flights)
+        departure_indexes = {}
+        arrival_times = {}
+        for (i, flight) in enumerate(self.flights):
+            departure_indexes.setdefault(flight.depart_city, []).append(i)
+            arrival_times.setdefault(flight.arrive_city, set()).add(
+                flight.arrive_time)
+
+        # city -> the indexes in self.flights of the flights departing it,
+        # sorted by departure time (the sort is stable, so flights that depart
+        # together keep their original order)
+        self.departure_indexes = {}
+        # city -> those flights
+        self.departures = {}
+        # city -> the departure times of those flights, for bisect
+        self.depart_times = {}
+        for (city, indexes) in departure_indexes.iteritems():
+            indexes.sort(key=lambda i: self.flights[i].depart_time)
+            self.departure_indexes[city] = indexes
+            self.departures[city] = [self.flights[i] for i in indexes]
+            self.depart_times[city] = [x.depart_time
+                for x in self.departures[city]]
+
+        # city -> sorted list of the distinct times that flights arrive there
+        self.arrival_times = {city:sorted(times)
+            for (city, times) in arrival_times.iteritems()}
+
+    def cities(self):
+        """
+        Returns a set of all of the cities that flights depart from or arrive
+        at.
+        """
+        return set(self.departures).union(self.arrival_times)
+
+    def departures_from(self, city, time):
+        """
+        Returns a list of the flights that depart from the given city at or
+        after the given time, sorted by departure time.
+        """
+        depart_times = self.depart_times.get(city)
+        if depart_times is None:
+            return []
+        i = bisect.bisect_left(depart_times, time)
+        return self.departures[city][i:]
+
+    def departure_indexes_between(self, city, earliest, latest=None):
+        """
+        Returns a list of the indexes in self.flights of the flights that
+        depart from the given city at or after *earliest* and, if *latest* is
+        given, at or before it, sorted by departure time.
+        """
+        depart_times = self.depart_times.get(city)
+        if depart_times is None:
+            return []
+        start = bisect.bisect_left(depart_times, earliest)
+        if latest is None:
+            end = len(depart_times)
         else:
-            cur_flight = G[depart_city][arrive_city]
-            flight_cost = (flight.cost,
-                flight.arrive_time - flight.depart_time)
-            cur_flight_cost = (cur_flight.cost,
-                cur_flight.arrive_time - cur_flight.depart_time)
-            if flight_cost < cur_flight_cost:
-                G[depart_city][arrive_city] = flight
+            end = bisect.bisect_right(depart_times, latest, start)
+        return self.departure_indexes[city][start:end]
+
+    def arrival_times_until(self, city, time):
+        """
+        Returns a sorted list of the distinct times at which flights arrive at
+        the given city at or before the given time.
+        """
+        arrival_times = self.arrival_times.get(city)
+        if arrival_times is None:
+            return []
+        i = bisect.bisect_right(arrival_times, time)
+        return arrival_times[:i]
+
+    def event_times(self, city):
+        """
+        Returns a sorted list of the distinct times at which flights arrive at
+        or depart from the given city.
+        """
+        times = set(self.depart_times.get(city, ()))
+        times.update(self.arrival_times.get(city, ()))
+        return sorted(times)
+
+def make_flight_graph(flights, origin, destination):
+    index = TimetableIndex(flights)
+    G = {}
 
     # build the graph, except for the flights outgoing from the "gadgets"
-    for flight in flights:
-        arrive_city = flight.arrive_city
-        arrive_time = flight.arrive_time
-        arrive_city_mangled = (arrive_city, arrive_time)
-        if arrive_city_mangled not in G:
+    cities = {}
+    for (arrive_city, arrival_times) in index.arrival_times.iteritems():
+        cities[arrive_city] = set()
+        for arrive_time in arrival_times:
+            arrive_city_mangled = (arrive_city, arrive_time)
             G[arrive_city_mangled] = {}
+            cities[arrive_city].add(arrive_city_mangled)
 
-        if arrive_city not in cities:
-            cities[arrive_city] = set()
-        cities[arrive_city].add(arrive_city_mangled)
-
-    # add the flights going out from the gadgets
-    for flight in flights:
-        arrive_city = flight.arrive_city
-        arrive_time = flight.arrive_time
-        arrive_city_mangled = (arrive_city, arrive_time)
-
-        depart_time = flight.depart_time
+    # add the flights going out from the gadgets; a flight can only be caught
+    # from the gadgets of its departure city that arrive no later than it
+    # departs, which are a prefix of the sorted arrival times
+    for flight in index.flights:
+        arrive_city_mangled = (flight.arrive_city, flight.arrive_time)
         depart_city = flight.depart_city
-        if depart_city in cities:
-            depart_cities_mangled = cities[depart_city]
-            for depart_city_mangled in depart_cities_mangled:
-                cur_depart_time = depart_city_mangled[1]
-                if depart_time >= cur_depart_time:
-                    add_flight_to_graph_if_cheaper(depart_city_mangled,
-                        arrive_city_mangled, flight)
+        for arrive_time in index.arrival_times_until(depart_city,
+                flight.depart_time):
+            add_flight_to_graph_if_cheaper(G, (depart_city, arrive_time),
+                arrive_city_mangled, flight)
 
     # add flights outgoing from the origin
     G[origin] = {}
-    for flight in flights:
-        if flight.depart_city == origin:
-            arrive_city = flight.arrive_city
-            arrive_time = flight.arrive_time
-            arrive_city_mangled = (arrive_city, arrive_time)
-            add_flight_to_graph_if_cheaper(origin, arrive_city_mangled, flight)
+    for flight in index.departures.get(origin, ()):
+        arrive_city_mangled = (flight.arrive_city, flight.arrive_time)
+        add_flight_to_graph_if_cheaper(G, origin, arrive_city_mangled, flight)
 
     # add zero-cost flights from the destination node's components to the
     # destination node itself
@@ -137,63 +364,1049 @@ def make_flight_graph(flights, origin, destination):
 
     return G
 
-def find_best_flights(flights, origin, destination):
-    flights = flight_tuples_to_objects(flights)
-    flights = tuple(flights)
-    G = make_flight_graph(flights, origin, destination)
-
-    unvisited = {origin: (0, [])}
-    visited = set()
-
-    while unvisited:
-
-        # find the node with the smallest weight in the unvisited set
-        node = None
-        node_weight = None
-        node_path = None
-        for (cur_node, (cur_node_weight, cur_path)) in unvisited.iteritems():
-            if node is None or cur_node_weight < node_weight:
-                node = cur_node
-                node_weight = cur_node_weight
-                node_path = cur_path
-
-        # update the weights for all unvisited neighbours of the node
-        for (adjacent_node, connecting_flight) in G[node].iteritems():
-            if adjacent_node in visited:
-                continue
+def make_waiting_chain_graph(index, origin, destination):
+    """
+    Builds a graph for search_flight_graph() like make_flight_graph() does,
+    but with a number of edges that is linear in the number of flights.
+    *index* is a TimetableIndex of the flights.
+
+    Instead of an edge from every gadget of a city to every flight that can
+    be caught from it, each city gets a chain of (city, time) nodes, one for
+    each time at which a flight arrives or departs there, linked in time
+    order by "waiting" edges whose value is None.  A flight is then a single
+    edge from the node of its departure to the node of its arrival, and
+    waiting at a city for a later flight means following the chain.
+    """
+    G = {}
+    for city in index.cities():
+        times = index.event_times(city)
+        for (time, next_time) in zip(times, times[1:]):
+            G[(city, time)] = {(city, next_time): None}
+        G[(city, times[-1])] = {}
+
+    for flight in index.flights:
+        if flight.depart_city == flight.arrive_city:
+            continue # waiting is always at least as good
+        add_flight_to_graph_if_cheaper(G,
+            (flight.depart_city, flight.depart_time),
+            (flight.arrive_city, flight.arrive_time), flight)
 
-            connecting_flight_weight = connecting_flight.cost
-            adjacent_node_new_weight = node_weight + connecting_flight_weight
-            new_path = node_path + [connecting_flight]
-            if adjacent_node not in unvisited:
-                unvisited[adjacent_node] = (adjacent_node_new_weight, new_path)
-            else:
-                adjacent_node_weight = unvisited[adjacent_node][0]
-                if adjacent_node_new_weight < adjacent_node_weight:
-                    unvisited[adjacent_node] = (adjacent_node_new_weight, new_path)
-                elif adjacent_node_new_weight == adjacent_node_weight:
-                    new_flight_depart_time = new_path[0].depart_time
-                    adjacent_path = unvisited[adjacent_node][1]
-                    adjacent_flight_depart_time = adjacent_path[0].depart_time
-                    if new_flight_depart_time > adjacent_flight_depart_time:
-                        unvisited[adjacent_node] = (adjacent_node_new_weight, new_path)
-
-        # move this node into the completed set
-        del unvisited[node]
-        visited.add(node)
-
-        if node == destination:
-            break
+    G[origin] = {}
+    for flight in index.departures.get(origin, ()):
+        add_flight_to_graph_if_cheaper(G, origin,
+            (flight.arrive_city, flight.arrive_time), flight)
 
-    else:
+    G[destination] = {}
+    for arrive_time in index.arrival_times.get(destination, ()):
+        G[(destination, arrive_time)][destination] = Flight(0, None, None, 0,
+            0, 0)
+
+    return G
+
+def find_best_flights(flights, origin, destination, max_legs=None,
+        min_layover=0, max_layover=None):
+    # *max_legs* limits the number of flights; *min_layover* and *max_layover*
+    # limit the minutes between arriving on one flight and departing on the
+    # next, and they are applied during the search, so the best itinerary
+    # that satisfies them is found even if the unconstrained one does not
+    index = TimetableIndex(FlightTable.from_tuples(flights))
+    if max_legs is None and min_layover == 0 and max_layover is None:
+        G = make_waiting_chain_graph(index, origin, destination)
+        return search_flight_graph(G, origin, destination)
+    return search_constrained_flights(index, origin, destination, max_legs,
+        min_layover, max_layover)
+
+class ConstrainedFlightGraph(object):
+    """
+    The graph for search_constrained_flights(), generated as the search goes
+    rather than built up front.  It looks like a dict of dicts of the
+    (cost, time, waiting) weights of search_flight_graph(), but its nodes
+    are the origin, the destination and (flight index, legs) tuples for
+    being on a flight after having taken *legs* flights, so that the
+    layovers and the number of legs of every path are known.  Without a leg
+    limit the legs are not counted, and are always 0, so that each flight
+    is only one node.
+
+    The edges out of a flight only go to the flights that depart from its
+    arrival city within the allowed layover, which bisect finds in the
+    TimetableIndex, and only while the leg budget lasts.  A node is also
+    pruned, and given no edges, once the same flight has been reached with
+    no more legs: algebraic_dijkstra() asks for the edges of each node once,
+    when it settles it, so that earlier path is at least as good and has at
+    least as many legs left.
+    """
+
+    def __init__(self, index, origin, destination, max_legs, min_layover,
+            max_layover):
+        self.index = index
+        self.origin = origin
+        self.destination = destination
+        self.max_legs = max_legs
+        self.min_layover = min_layover
+        self.max_layover = max_layover
+        self.leg_step = 0 if max_legs is None else 1
+        self.min_settled_legs = {} # flight index -> fewest legs settled
+
+    def __getitem__(self, node):
+        index = self.index
+        edges = {}
+        if node == self.origin:
+            if self.max_legs is None or self.max_legs >= 1:
+                for i in index.departure_indexes.get(self.origin, ()):
+                    flight = index.flights[i]
+                    edges[(i, self.leg_step)] = (flight.cost,
+                        MINUTES_PER_DAY - 1 - flight.depart_time, 0)
+            return edges
+        if node == self.destination:
+            return edges
+
+        (i, legs) = node
+        min_settled_legs = self.min_settled_legs.get(i)
+        if min_settled_legs is not None and min_settled_legs <= legs:
+            return edges
+        self.min_settled_legs[i] = legs
+
+        flight = index.flights[i]
+        arrive_time = flight.arrive_time
+        if flight.arrive_city == self.destination:
+            edges[self.destination] = (0, arrive_time, 0)
+        if self.max_legs is not None and legs >= self.max_legs:
+            return edges
+
+        if self.max_layover is None:
+            latest = None
+        else:
+            latest = arrive_time + self.max_layover
+        for j in index.departure_indexes_between(flight.arrive_city,
+                arrive_time + self.min_layover, latest):
+            next_flight = index.flights[j]
+            edges[(j, legs + self.leg_step)] = (next_flight.cost, 0,
+                next_flight.depart_time - arrive_time)
+        return edges
+
+def search_constrained_flights(index, origin, destination, max_legs=None,
+        min_layover=0, max_layover=None):
+    """
+    Returns the list of flight numbers of the best itinerary, as for
+    find_best_flights(), among those with at most *max_legs* flights and
+    with between *min_layover* and *max_layover* minutes between flights,
+    or None if there is no such itinerary.  *index* is a TimetableIndex of
+    the flights.  See ConstrainedFlightGraph.
+    """
+    if origin == destination:
+        return []
+    G = ConstrainedFlightGraph(index, origin, destination, max_legs,
+        min_layover, max_layover)
+    final_dist = algebraic_dijkstra(G, origin, lexicographic_algebra(3),
+        target=destination)
+    if destination not in final_dist:
+        return None
+
+    path = []
+    node = final_dist[destination][1]
+    while node != origin:
+        path.append(index.flights[node[0]].number)
+        node = final_dist[node][1]
+    path.reverse()
+    return path
+
+def search_flight_graph(G, origin, destination):
+    """
+    Returns the list of flight numbers of the best path from the origin to
+    the destination in G, a graph like the one from make_flight_graph() or
+    make_waiting_chain_graph(), or None if there is no path.
+    """
+    # "Lowest cost, then shortest total flight time" becomes a weight of
+    # (cost, time, waiting) per edge, for a lexicographic_algebra() to add
+    # up key by key.  The first departure time only enters on the edges out of
+    # the origin, so the times along any path to a gadget node add up to
+    #     MINUTES_PER_DAY - 1 - first_depart_time
+    # and the zero-cost edges into the destination then add the arrival time
+    # of their gadget, so that the time becomes the total flight time plus
+    # the constant MINUTES_PER_DAY - 1.  Ties are then broken by the least
+    # total time spent waiting between flights, so that equally good
+    # journeys do not depend on the search order.
+    H = {}
+    for (node, edges) in G.iteritems():
+        H[node] = {}
+        for (adjacent_node, flight) in edges.iteritems():
+            if flight is None:
+                # waiting for a later flight in the same city
+                H[node][adjacent_node] = (0, 0, adjacent_node[1] - node[1])
+                continue
+            time = 0
+            waiting = 0
+            if node == origin:
+                time += MINUTES_PER_DAY - 1 - flight.depart_time
+            if adjacent_node == destination:
+                time += node[1]
+            if node != origin and adjacent_node != destination:
+                waiting = flight.depart_time - node[1]
+            H[node][adjacent_node] = (flight.cost, time, waiting)
+
+    final_dist = algebraic_dijkstra(H, origin, lexicographic_algebra(3),
+        target=destination)
+    if destination not in final_dist:
         # we never completed the destination; must not be a path to it
         return None
 
-    # if we got here then the "break" statement was executed and node_path and
-    # node_weight are those of the destination node
-    path = [x.number for x in node_path[:-1]]
+    node_path = []
+    node = destination
+    parent = final_dist[node][1]
+    while parent is not None:
+        node_path.append(G[parent][node])
+        node = parent
+        parent = final_dist[node][1]
+    node_path.reverse()
+
+    # the last flight is the zero-cost one into the destination node
+    path = [x.number for x in node_path[:-1] if x is not None]
+    return path
+
+DAYS_PER_WEEK = 7
+
+# the day mask of a flight that runs on every day of the week
+EVERY_DAY = (1 << DAYS_PER_WEEK) - 1
+
+class PeriodicTimetable(object):
+    """
+    A timetable that repeats: each flight departs at the same time every
+    *period* minutes (a day, by default) but only runs on the days whose bits
+    are set in its day mask, where bit d is day d of a cycle of
+    *days_per_cycle* days (a week, by default), so that a week of schedules
+    takes no more room than the distinct flights plus an integer each.
+    *flights* are Flight objects or a FlightTable, whose times are minutes
+    into the day; a flight that arrives at an earlier time than it departs
+    arrives the next day.  *day_masks* maps flight numbers to their day
+    masks; flights that are not in it run every day.
+    """
+
+    def __init__(self, flights, day_masks=None, period=MINUTES_PER_DAY,
+            days_per_cycle=DAYS_PER_WEEK):
+        self.index = TimetableIndex(flights)
+        self.period = period
+        self.days_per_cycle = days_per_cycle
+        every_day = (1 << days_per_cycle) - 1
+        if day_masks is None:
+            day_masks = {}
+        # indexed like self.index.flights
+        self.day_masks = array.array("l", [
+            day_masks.get(flight.number, every_day) & every_day
+            for flight in self.index.flights])
+
+    def runs_on(self, i, day):
+        """
+        Returns whether the flight self.index.flights[i] runs on the given
+        day, counted from day 0 of the first cycle.
+        """
+        return bool(self.day_masks[i] >> (day % self.days_per_cycle) & 1)
+
+    def duration(self, i):
+        """
+        Returns the minutes from the departure to the arrival of the flight
+        self.index.flights[i].
+        """
+        flight = self.index.flights[i]
+        return (flight.arrive_time - flight.depart_time) % self.period
+
+    def next_departure(self, city, time, end_time):
+        """
+        Returns a (day, position) tuple for the first departure from the
+        given city at or after the given time, in minutes from the start of
+        day 0, where position is an index into
+        self.index.departure_indexes[city], or None if there are none before
+        *end_time*.  The flight found may not run on that day.
+        """
+        depart_times = self.index.depart_times.get(city)
+        if not depart_times:
+            return None
+        (day, minute) = divmod(time, self.period)
+        position = bisect.bisect_left(depart_times, minute)
+        if position == len(depart_times):
+            (day, position) = (day + 1, 0)
+        return self._before(city, day, position, end_time)
+
+    def following_departure(self, city, day, position, end_time):
+        """
+        Returns a (day, position) tuple, as for next_departure(), for the
+        departure from the given city that follows the given one, or None if
+        there are none before *end_time*.
+        """
+        position += 1
+        if position == len(self.index.depart_times[city]):
+            (day, position) = (day + 1, 0)
+        return self._before(city, day, position, end_time)
+
+    def _before(self, city, day, position, end_time):
+        depart_time = self.index.depart_times[city][position]
+        if day * self.period + depart_time >= end_time:
+            return None
+        return (day, position)
+
+class PeriodicFlightGraph(object):
+    """
+    The graph for search_periodic_flights(), unrolled a day at a time only
+    as the search reaches it rather than built for every day up front.  It
+    looks like a dict of dicts of (cost, time, waiting) weights.  Its nodes
+    are the origin and the destination, (city, day, position) tuples for
+    waiting in a city for its position'th departure of a day, which link to
+    that departure if it runs on that day and to the next departure, and
+    (day, i) tuples for being on the flight index.flights[i] that departed
+    on that day, which link to the first departure from its arrival city
+    after it lands, or to the destination.
+
+    The weights are those of search_flight_graph() with a horizon of
+    *num_days* days in place of one day, so every node and edge the search
+    settles is for a distinct flight or departure on a distinct day, and
+    days that the search never gets to are never looked at.
+    """
+
+    def __init__(self, timetable, origin, destination, start_time, num_days):
+        self.timetable = timetable
+        self.origin = origin
+        self.destination = destination
+        self.start_time = start_time
+        self.horizon = num_days * timetable.period
+        self.end_time = start_time + self.horizon
+
+    def depart_time(self, day, i):
+        return (day * self.timetable.period +
+            self.timetable.index.flights[i].depart_time)
+
+    def _wait_for(self, edges, city, time, departure):
+        # links to the given departure from the city, from the given time
+        if departure is not None:
+            (day, position) = departure
+            i = self.timetable.index.departure_indexes[city][position]
+            edges[(city, day, position)] = (0, 0,
+                self.depart_time(day, i) - time)
+
+    def __getitem__(self, node):
+        timetable = self.timetable
+        flights = timetable.index.flights
+        edges = {}
+        if node == self.destination:
+            return edges
+
+        if node == self.origin:
+            # only the origin links to departures on every day of the horizon
+            departure = timetable.next_departure(self.origin, self.start_time,
+                self.end_time)
+            departure_indexes = timetable.index.departure_indexes.get(
+                self.origin, ())
+            while departure is not None:
+                (day, position) = departure
+                i = departure_indexes[position]
+                depart_time = self.depart_time(day, i)
+                if timetable.runs_on(i, day):
+                    edges[(day, i)] = (flights[i].cost, self.horizon - 1 -
+                        (depart_time - self.start_time), 0)
+                departure = timetable.following_departure(self.origin, day,
+                    position, self.end_time)
+            return edges
+
+        if len(node) == 3:
+            (city, day, position) = node
+            i = timetable.index.departure_indexes[city][position]
+            depart_time = self.depart_time(day, i)
+            if timetable.runs_on(i, day):
+                edges[(day, i)] = (flights[i].cost, 0, 0)
+            self._wait_for(edges, city, depart_time,
+                timetable.following_departure(city, day, position,
+                    self.end_time))
+            return edges
+
+        (day, i) = node
+        arrive_time = self.depart_time(day, i) + timetable.duration(i)
+        if arrive_time >= self.end_time:
+            return edges
+        arrive_city = flights[i].arrive_city
+        if arrive_city == self.destination:
+            edges[self.destination] = (0, arrive_time - self.start_time, 0)
+        else:
+            self._wait_for(edges, arrive_city, arrive_time,
+                timetable.next_departure(arrive_city, arrive_time,
+                    self.end_time))
+        return edges
+
+def search_periodic_flights(timetable, origin, destination, start_day=0,
+        start_time=0, num_days=DAYS_PER_WEEK):
+    """
+    Returns the best itinerary, as for find_best_flights(), from the origin
+    to the destination in the given PeriodicTimetable that departs no earlier
+    than *start_time* minutes into *start_day* and arrives within *num_days*
+    days of then, as a list of (day, flight number) tuples, or None if there
+    is no such itinerary.  Unlike find_best_flights(), layovers may last
+    overnight.  See PeriodicFlightGraph.
+    """
+    if origin == destination:
+        return []
+    G = PeriodicFlightGraph(timetable, origin, destination,
+        start_day * timetable.period + start_time, num_days)
+    final_dist = algebraic_dijkstra(G, origin, lexicographic_algebra(3),
+        target=destination)
+    if destination not in final_dist:
+        return None
+
+    path = []
+    node = final_dist[destination][1]
+    while node != origin:
+        if len(node) == 2:
+            (day, i) = node
+            path.append((day, timetable.index.flights[i].number))
+        node = final_dist[node][1]
+    path.reverse()
     return path
 
+class FlightNetwork(object):
+    """
+    A flight graph like the one from make_waiting_chain_graph() that is kept
+    up to date as flights are added, cancelled and repriced, instead of being
+    built from scratch for every query.
+
+    The chain of (city, time) nodes of a city and the edges out of them only
+    depend on the flights that depart from that city and on the times at
+    which flights arrive there, so a change to a flight only marks its
+    departure and arrival cities as stale, and the chains of the stale cities
+    are rebuilt before the next query.  Each node keeps both its edges to
+    Flight objects, or None for waiting, and the (cost, time, waiting)
+    weights of those edges, so that a query searches the weights as they
+    are; the origin and destination nodes of a query are laid over them by a
+    FlightNetworkQuery, and the network itself is never copied or changed.
+    """
+
+    def __init__(self, flights=()):
+        """
+        *flights* is an iterable of Flight objects, whose numbers must be
+        unique.
+        """
+        self.flights = {} # flight number -> Flight
+        self.sequence = {} # flight number -> order in which it was added
+        self.departures = {} # city -> set of flight numbers departing it
+        self.arrivals = {} # (city, time) -> set of flight numbers arriving
+        self.cities = {} # city -> set of (city, time) nodes with arrivals
+        self.chains = {} # city -> list of its (city, time) nodes
+        self.G = {} # (city, time) -> {(city, time): Flight or None}
+        self.weights = {} # (city, time) -> {(city, time): weight}
+        self.stale_cities = set()
+        for flight in flights:
+            self.add_flight(flight)
+
+    def add_flight(self, flight):
+        """
+        Adds the given Flight object to the network.  Raises ValueError if
+        there already is a flight with the same number.
+        """
+        if flight.number in self.flights:
+            raise ValueError("duplicate flight number: {}".format(
+                flight.number))
+        self.flights[flight.number] = flight
+        self.sequence[flight.number] = len(self.sequence)
+        self.departures.setdefault(flight.depart_city, set()).add(
+            flight.number)
+
+        node = (flight.arrive_city, flight.arrive_time)
+        if node not in self.arrivals:
+            self.arrivals[node] = set()
+            self.cities.setdefault(flight.arrive_city, set()).add(node)
+        self.arrivals[node].add(flight.number)
+        self.stale_cities.add(flight.depart_city)
+        self.stale_cities.add(flight.arrive_city)
+
+    def cancel_flight(self, number):
+        """
+        Removes the flight with the given number from the network and returns
+        its Flight object.  Raises KeyError if there is no such flight.
+        """
+        flight = self.flights.pop(number)
+        del self.sequence[number]
+        self.departures[flight.depart_city].discard(number)
+
+        node = (flight.arrive_city, flight.arrive_time)
+        arrivals = self.arrivals[node]
+        arrivals.discard(number)
+        if not arrivals:
+            # only this flight linked to the node from another city, and its
+            # departure city is rebuilt along with its arrival city
+            del self.arrivals[node]
+            self.cities[flight.arrive_city].discard(node)
+        self.stale_cities.add(flight.depart_city)
+        self.stale_cities.add(flight.arrive_city)
+        return flight
+
+    def update_cost(self, number, cost):
+        """
+        Changes the cost of the flight with the given number.  Raises KeyError
+        if there is no such flight.
+        """
+        flight = self.flights[number]
+        # replace the Flight object rather than changing one that the caller
+        # may still be holding on to
+        self.flights[number] = Flight(number, flight.depart_city,
+            flight.arrive_city, flight.depart_time, flight.arrive_time, cost)
+        self.stale_cities.add(flight.depart_city)
+
+    def _rebuild_stale_cities(self):
+        G = self.G
+        weights = self.weights
+        for city in self.stale_cities:
+            for node in self.chains.pop(city, ()):
+                del G[node]
+                del weights[node]
+            # in the order they were added, so that ties between equally good
+            # flights go the same way as in make_waiting_chain_graph()
+            numbers = sorted(self.departures.get(city, ()),
+                key=self.sequence.__getitem__)
+            times = set(self.flights[x].depart_time for x in numbers)
+            times.update(x[1] for x in self.cities.get(city, ()))
+            if not times:
+                continue
+
+            times = sorted(times)
+            chain = [(city, time) for time in times]
+            for (node, next_node) in zip(chain, chain[1:]):
+                G[node] = {next_node: None}
+            G[chain[-1]] = {}
+            for number in numbers:
+                flight = self.flights[number]
+                if flight.arrive_city == city:
+                    continue # waiting is always at least as good
+                add_flight_to_graph_if_cheaper(G, (city, flight.depart_time),
+                    (flight.arrive_city, flight.arrive_time), flight)
+
+            for node in chain:
+                node_weights = weights[node] = {}
+                for (adjacent_node, flight) in G[node].iteritems():
+                    if flight is None:
+                        node_weights[adjacent_node] = (0, 0,
+                            adjacent_node[1] - node[1])
+                    else:
+                        node_weights[adjacent_node] = (flight.cost, 0, 0)
+            self.chains[city] = chain
+        self.stale_cities.clear()
+
+    def find_best_flights(self, origin, destination):
+        """
+        Returns the same list of flight numbers as find_best_flights() would
+        for the flights currently in the network, or None if the destination
+        cannot be reached from the origin.
+        """
+        if origin == destination:
+            return []
+        if not self.cities.get(destination):
+            return None
+        self._rebuild_stale_cities()
+
+        G = FlightNetworkQuery(self, origin, destination)
+        final_dist = algebraic_dijkstra(G, origin, lexicographic_algebra(3),
+            target=destination)
+        if destination not in final_dist:
+            return None
+
+        path = []
+        node = final_dist[destination][1]
+        while node != origin:
+            parent = final_dist[node][1]
+            if parent == origin:
+                flight = G.origin_flights[node]
+            else:
+                flight = self.G[parent][node]
+            if flight is not None:
+                path.append(flight.number)
+            node = parent
+        path.reverse()
+        return path
+
+class FlightNetworkQuery(object):
+    """
+    The graph that FlightNetwork.find_best_flights() searches: the weighted
+    edges of the network, with the weights of search_flight_graph(), plus
+    the edges out of the origin, which are worked out for each query, and
+    the edges into the destination, which are added to the nodes of the
+    destination city as the search reaches them.
+    """
+
+    def __init__(self, network, origin, destination):
+        self.network = network
+        self.origin = origin
+        self.destination = destination
+        G = {origin: {}}
+        for number in sorted(network.departures.get(origin, ()),
+                key=network.sequence.__getitem__):
+            flight = network.flights[number]
+            add_flight_to_graph_if_cheaper(G, origin,
+                (flight.arrive_city, flight.arrive_time), flight)
+        self.origin_flights = G[origin] # (city, time) -> Flight
+        self.origin_weights = {node:(flight.cost,
+                MINUTES_PER_DAY - 1 - flight.depart_time, 0)
+            for (node, flight) in self.origin_flights.iteritems()}
+
+    def __getitem__(self, node):
+        if node == self.origin:
+            return self.origin_weights
+        if node == self.destination:
+            return {}
+        edges = self.network.weights[node]
+        if node[0] == self.destination and node in self.network.arrivals:
+            edges = dict(edges)
+            edges[self.destination] = (0, node[1], 0)
+        return edges
+
+class ConnectionScanner(object):
+    """
+    Answers the same queries as find_best_flights() with the Connection Scan
+    Algorithm instead of a graph search.  The flights are kept as flat
+    arrays, one per field, plus two orderings of them: by departure time and
+    by arrival time.  A query is then one pass over those orderings in time
+    order, so it is linear in the number of flights and needs no graph.
+
+    Journeys that are at the same city at the same time can all take the same
+    flights from there on, so only the best one of them matters: the one with
+    the lowest cost, then the latest first departure, which is the one with
+    the shortest total time at any destination, and then the longest time in
+    the air, which is the one with the least time spent waiting between
+    flights.  The scan keeps that best journey for each city as flights
+    arrive, and extends it whenever a flight departs.
+    """
+
+    def __init__(self, flights):
+        """
+        *flights* is a FlightTable, whose columns are used as they are, or an
+        iterable of Flight objects, which are copied into a new FlightTable.
+        """
+        if not isinstance(flights, FlightTable):
+            flights = FlightTable(flights)
+        self.table = flights
+        self.cities = flights.cities
+        self.city_ids = flights.city_ids
+        self.numbers = flights.numbers
+        self.depart_cities = flights.depart_cities
+        self.arrive_cities = flights.arrive_cities
+        self.depart_times = flights.depart_times
+        self.arrive_times = flights.arrive_times
+        self.costs = flights.costs
+        self.durations = flights.durations
+
+        indexes = xrange(len(self.numbers))
+        # flights that land the minute they depart go first among those that
+        # depart together, so that the others can connect to them
+        self.by_depart_time = array.array("l", sorted(indexes,
+            key=lambda i: (self.depart_times[i], self.durations[i] != 0)))
+        self.by_arrive_time = array.array("l",
+            sorted(indexes, key=self.arrive_times.__getitem__))
+
+    def scan(self, origin):
+        """
+        Runs one scan from the given city.  Returns a (best, parents) tuple:
+        best is a list, indexed by city id, of the best (cost, duration,
+        -air_time, flight index) tuple of a journey from the origin that ends
+        at that city, or None for the cities that cannot be reached, and
+        parents is an array of the flight taken before each flight, or -1.
+        Pass a flight index and the parents to flights_to() for the journey.
+        """
+        num_cities = len(self.cities)
+        best = [None] * num_cities
+        parents = array.array("l", [-1]) * len(self.numbers)
+        origin_id = self.city_ids.get(origin)
+        if origin_id is None:
+            return (best, parents)
+
+        numbers = self.numbers
+        depart_cities = self.depart_cities
+        arrive_cities = self.arrive_cities
+        depart_times = self.depart_times
+        arrive_times = self.arrive_times
+        costs = self.costs
+        durations = self.durations
+        by_arrive_time = self.by_arrive_time
+        num_flights = len(numbers)
+
+        # the label of each flight that was taken, the (cost,
+        # -first_depart_time, -air_time) of the journey that ends with it,
+        # plus the flight taken before it
+        labels = [None] * num_flights
+        # the best label of a journey that has arrived at each city so far,
+        # and the flight it arrived on
+        arrived = [None] * num_cities
+        arrived_by = [-1] * num_cities
+
+        next_arrival = 0
+        for flight in self.by_depart_time:
+            depart_time = depart_times[flight]
+
+            # flights that arrive by this departure can connect to it
+            while (next_arrival < num_flights and
+                    arrive_times[by_arrive_time[next_arrival]] <= depart_time):
+                arrival = by_arrive_time[next_arrival]
+                next_arrival += 1
+                self._arrive(arrival, labels, arrived, arrived_by, best)
+
+            depart_city = depart_cities[flight]
+            air_time = durations[flight]
+            if depart_city == origin_id:
+                # starting fresh always beats flying back to the origin
+                labels[flight] = (costs[flight], -depart_time, -air_time)
+            elif arrived[depart_city] is not None:
+                (cost, neg_first_depart_time, neg_air_time) = \
+                    arrived[depart_city]
+                labels[flight] = (cost + costs[flight], neg_first_depart_time,
+                    neg_air_time - air_time)
+                parents[flight] = arrived_by[depart_city]
+            if air_time == 0:
+                # it was drained above, before it had a label, since it
+                # arrives when it departs; it arrives now instead
+                self._arrive(flight, labels, arrived, arrived_by, best)
+
+        while next_arrival < num_flights:
+            self._arrive(by_arrive_time[next_arrival], labels, arrived,
+                arrived_by, best)
+            next_arrival += 1
+        return (best, parents)
+
+    def _arrive(self, flight, labels, arrived, arrived_by, best):
+        label = labels[flight]
+        if label is None:
+            return # never taken
+        city = self.arrive_cities[flight]
+        if arrived[city] is None or label < arrived[city]:
+            arrived[city] = label
+            arrived_by[city] = flight
+        (cost, neg_first_depart_time, neg_air_time) = label
+        duration = self.arrive_times[flight] + neg_first_depart_time
+        if best[city] is None or (cost, duration, neg_air_time) < best[city][:3]:
+            best[city] = (cost, duration, neg_air_time, flight)
+
+    def flights_to(self, flight, parents):
+        """
+        Returns the list of flight numbers of the journey that ends with the
+        flight with the given index, from the parents of the scan() that
+        found it.
+        """
+        path = []
+        while flight != -1:
+            path.append(self.numbers[flight])
+            flight = parents[flight]
+        path.reverse()
+        return path
+
+    def find_best_flights(self, origin, destination):
+        """
+        Returns the same list of flight numbers as find_best_flights(), or None
+        if the destination cannot be reached from the origin.
+        """
+        if origin == destination:
+            return []
+        destination_id = self.city_ids.get(destination)
+        if destination_id is None:
+            return None
+        (best, parents) = self.scan(origin)
+        if best[destination_id] is None:
+            return None
+        return self.flights_to(best[destination_id][3], parents)
+
+    def _scan_bags(self, origin_id, max_bag_size):
+        # The multi-criteria version of scan(): each city keeps a "bag" of the
+        # journeys that have arrived there and that no other journey in the
+        # bag dominates, that is, is at least as cheap and left the origin at
+        # least as late.  A label is a (cost, -first_depart_time, -air_time,
+        # flight index, previous label) tuple for a journey that ends with
+        # that flight.  Yields a (flight index, labels) tuple for each flight
+        # that was taken, in order of arrival.
+        depart_cities = self.depart_cities
+        depart_times = self.depart_times
+        arrive_times = self.arrive_times
+        costs = self.costs
+        durations = self.durations
+        by_arrive_time = self.by_arrive_time
+        num_flights = len(self.numbers)
+
+        flight_bags = [None] * num_flights
+        city_bags = [[] for unused in xrange(len(self.cities))]
+
+        next_arrival = 0
+        for flight in self.by_depart_time:
+            depart_time = depart_times[flight]
+            while (next_arrival < num_flights and
+                    arrive_times[by_arrive_time[next_arrival]] <= depart_time):
+                arrival = by_arrive_time[next_arrival]
+                next_arrival += 1
+                if flight_bags[arrival]:
+                    self._arrive_bag(arrival, flight_bags, city_bags,
+                        max_bag_size)
+                    yield (arrival, flight_bags[arrival])
+
+            depart_city = depart_cities[flight]
+            cost = costs[flight]
+            air_time = durations[flight]
+            if depart_city == origin_id:
+                # starting fresh dominates every journey back to the origin
+                flight_bags[flight] = [(cost, -depart_time, -air_time, flight,
+                    None)]
+            elif city_bags[depart_city]:
+                bag = []
+                for label in city_bags[depart_city]:
+                    _add_to_bag(bag, (label[0] + cost, label[1],
+                        label[2] - air_time, flight, label), max_bag_size)
+                flight_bags[flight] = bag
+            if air_time == 0 and flight_bags[flight]:
+                # drained above before it had a bag, as for scan()
+                self._arrive_bag(flight, flight_bags, city_bags, max_bag_size)
+                yield (flight, flight_bags[flight])
+
+        while next_arrival < num_flights:
+            arrival = by_arrive_time[next_arrival]
+            next_arrival += 1
+            if flight_bags[arrival]:
+                self._arrive_bag(arrival, flight_bags, city_bags, max_bag_size)
+                yield (arrival, flight_bags[arrival])
+
+    def _arrive_bag(self, flight, flight_bags, city_bags, max_bag_size):
+        city_bag = city_bags[self.arrive_cities[flight]]
+        for label in flight_bags[flight]:
+            _add_to_bag(city_bag, label, max_bag_size)
+
+    def _label_flights(self, label):
+        # returns the list of flight numbers of the journey of a bag label
+        path = []
+        while label is not None:
+            path.append(self.numbers[label[3]])
+            label = label[4]
+        path.reverse()
+        return path
+
+    def find_pareto_flights(self, origin, destination, max_bag_size=None):
+        """
+        Returns every itinerary from the origin to the destination that no
+        other itinerary beats on both cost and total time, as a list of
+        (cost, duration, flight numbers) tuples sorted from the cheapest to
+        the fastest.  The first one is the itinerary that find_best_flights()
+        returns.  The list is empty if the destination cannot be reached.
+
+        This is the multi-criteria version of scan(): each city keeps a "bag"
+        of the journeys that have arrived there and that no other journey in
+        the bag dominates, that is, is at least as cheap and left the origin
+        at least as late.  If *max_bag_size* is given, only that many of the
+        cheapest journeys are kept in each bag, which bounds the time and
+        memory of the scan but may leave some of the fastest itineraries out.
+        """
+        if origin == destination:
+            return [(0, 0, [])]
+        origin_id = self.city_ids.get(origin)
+        destination_id = self.city_ids.get(destination)
+        if origin_id is None or destination_id is None:
+            return []
+
+        # labels at the destination are (cost, duration, -air_time, label)
+        itineraries = []
+        for (flight, labels) in self._scan_bags(origin_id, max_bag_size):
+            if self.arrive_cities[flight] != destination_id:
+                continue
+            for label in labels:
+                (cost, neg_first_depart_time, neg_air_time) = label[:3]
+                duration = self.arrive_times[flight] + neg_first_depart_time
+                _add_to_bag(itineraries,
+                    (cost, duration, neg_air_time, label), None)
+
+        itineraries.sort()
+        return [(cost, duration, self._label_flights(label))
+            for (cost, duration, unused_neg_air_time, label) in itineraries]
+
+    def profile(self, origin, max_bag_size=None):
+        """
+        Returns a FlightProfile of the best itineraries from the origin to
+        every other city for every time of departure from the origin, from a
+        single scan.  *max_bag_size* is as for find_pareto_flights().
+
+        The scan is the one from find_pareto_flights(), which keeps every
+        journey that could be the best one for some departure time; each city
+        then gets one backward sweep over the journeys that end there, from
+        the latest first departure to the earliest, that keeps the journeys
+        that are better than all of those that leave later.
+        """
+        journeys = {} # city id -> list of (first_depart_time, key, label)
+        origin_id = self.city_ids.get(origin)
+        if origin_id is not None:
+            for (flight, labels) in self._scan_bags(origin_id, max_bag_size):
+                city_journeys = journeys.setdefault(self.arrive_cities[flight],
+                    [])
+                for label in labels:
+                    (cost, neg_first_depart_time, neg_air_time) = label[:3]
+                    duration = self.arrive_times[flight] + neg_first_depart_time
+                    city_journeys.append((-neg_first_depart_time,
+                        (cost, duration, neg_air_time), label))
+
+        profiles = {}
+        for (city_id, city_journeys) in journeys.iteritems():
+            if city_id == origin_id:
+                continue
+            city_journeys.sort(key=lambda journey: (-journey[0], journey[1]))
+            entries = []
+            best_key = None
+            for (first_depart_time, key, label) in city_journeys:
+                if best_key is None or key < best_key:
+                    best_key = key
+                    entries.append((first_depart_time, key[0], key[1],
+                        self._label_flights(label)))
+            entries.reverse()
+            profiles[self.cities[city_id]] = entries
+        return FlightProfile(origin, profiles)
+
+    def find_best_flights_from(self, origin):
+        """
+        Returns a dict whose keys are the cities that can be reached from the
+        origin and whose values are the lists of flight numbers that
+        find_best_flights() would return for them, all from a single scan.
+        """
+        result = {}
+        (best, parents) = self.scan(origin)
+        for (city_id, city_best) in enumerate(best):
+            if city_best is not None:
+                result[self.cities[city_id]] = self.flights_to(city_best[3],
+                    parents)
+        result[origin] = []
+        return result
+
+class FlightProfile(object):
+    """
+    The best itineraries from one origin to every other city as a function of
+    the time of departure from the origin, from ConnectionScanner.profile().
+    For each destination this keeps a list of (depart_time, cost, duration,
+    flight numbers) entries sorted by departure time, where each entry is the
+    best itinerary that leaves the origin at or after its departure time, so
+    that the best itinerary leaving at or after any time is found with
+    bisect.
+    """
+
+    def __init__(self, origin, profiles):
+        self.origin = origin
+        self.profiles = profiles # destination -> list of entries
+        self.depart_times = {destination:[entry[0] for entry in entries]
+            for (destination, entries) in profiles.iteritems()}
+
+    def destinations(self):
+        """
+        Returns a list of the cities that can be reached from the origin.
+        """
+        return list(self.profiles)
+
+    def entries(self, destination):
+        """
+        Returns the list of (depart_time, cost, duration, flight numbers)
+        entries for the given destination; it is empty if the destination
+        cannot be reached.
+        """
+        return self.profiles.get(destination, [])
+
+    def best_after(self, destination, time):
+        """
+        Returns the (depart_time, cost, duration, flight numbers) entry of the
+        best itinerary to the given destination that leaves the origin at or
+        after the given time, in minutes since midnight, or None if there is
+        no such itinerary.
+        """
+        depart_times = self.depart_times.get(destination)
+        if depart_times is None:
+            return None
+        i = bisect.bisect_left(depart_times, time)
+        if i == len(depart_times):
+            return None
+        return self.profiles[destination][i]
+
+    def find_best_flights(self, destination, time=0):
+        """
+        Returns the list of flight numbers of the best itinerary to the given
+        destination that leaves the origin at or after the given time, like
+        find_best_flights() would if the earlier flights were cancelled, or
+        None if there is no such itinerary.
+        """
+        if destination == self.origin:
+            return []
+        entry = self.best_after(destination, time)
+        if entry is None:
+            return None
+        return entry[3]
+
+def _add_to_bag(bag, label, max_bag_size):
+    # Adds the label to the bag, a list of labels whose first two values are
+    # the criteria to minimize and whose third value breaks ties, unless a
+    # label in the bag dominates it; removes the labels that it dominates.
+    # Keeps only the max_bag_size labels that are best on the first value.
+    key = label[:3]
+    for other in bag:
+        if (other[0] <= label[0] and other[1] <= label[1] and
+                other[:3] <= key):
+            return False
+    bag[:] = [other for other in bag if not (label[0] <= other[0] and
+        label[1] <= other[1] and key <= other[:3])]
+    bag.append(label)
+    if max_bag_size is not None and len(bag) > max_bag_size:
+        bag.sort(key=lambda other: other[:3])
+        del bag[max_bag_size:]
+    return True
+
+def find_pareto_flights(flights, origin, destination, max_bag_size=None):
+    """
+    Returns all of the itineraries from the origin to the destination that
+    are best for some trade-off between cost and total time; see
+    ConnectionScanner.find_pareto_flights().
+    """
+    scanner = ConnectionScanner(FlightTable.from_tuples(flights))
+    return scanner.find_pareto_flights(origin, destination, max_bag_size)
+
+def find_best_flights_by_scan(flights, origin, destination):
+    """
+    A drop-in replacement for find_best_flights() that uses a
+    ConnectionScanner instead of building a graph.
+    """
+    scanner = ConnectionScanner(FlightTable.from_tuples(flights))
+    return scanner.find_best_flights(origin, destination)
+
+# the ConnectionScanner of a worker process, set by _init_worker()
+_worker_scanner = None
+
+def _init_worker(scanner):
+    global _worker_scanner
+    _worker_scanner = scanner
+
+def _find_best_flights_in_worker(task):
+    (origin, destinations) = task
+    best_flights = _worker_scanner.find_best_flights_from(origin)
+    return (origin, {x:best_flights.get(x) for x in destinations})
+
+def find_best_flights_batch(flights, pairs, processes=None):
+    """
+    Finds the best flights, as find_best_flights() would, for each of the
+    given (origin, destination) tuples.  The flights are parsed and indexed
+    once, the pairs are grouped by origin, and each origin gets a single
+    one-to-all ConnectionScanner scan, fanned out over a pool of *processes*
+    worker processes (by default, one per CPU).
+
+    This is a generator that yields ((origin, destination), flight numbers)
+    tuples, once for each distinct pair, as soon as the scan of their origin
+    finishes, so the pairs come out grouped by origin but in no particular
+    order.
+    """
+    destinations = {}
+    seen_pairs = set()
+    for (origin, destination) in pairs:
+        if (origin, destination) not in seen_pairs:
+            seen_pairs.add((origin, destination))
+            destinations.setdefault(origin, []).append(destination)
+
+    scanner = ConnectionScanner(FlightTable.from_tuples(flights))
+    pool = multiprocessing.Pool(processes, initializer=_init_worker,
+        initargs=(scanner,))
+    try:
+        results = pool.imap_unordered(_find_best_flights_in_worker,
+            destinations.iteritems())
+        for (origin, best_flights) in results:
+            for destination in destinations[origin]:
+                yield ((origin, destination), best_flights[destination])
+    finally:
+        # also stops the remaining scans if the caller stops early
+        pool.terminate()
+        pool.join()
+
 #
 # Here is a fictious flight schedule that is roughly based on routes
 # flown by Skipper, a regional airline in Australia
@@ -394,6 +1607,592 @@ class ProvidedTests(unittest.TestCase):
         retval = find_best_flights(all_flights, 'Meekatharra', 'Wiluna')
         self.assertListEqual(retval, [391, 459])
 
+class Test_find_best_flights(unittest.TestCase):
+
+    def test_SameCost_PicksShorterFlightTime(self):
+        # 622 and 112 both cost 60; 112 takes 51 minutes instead of 65
+        retval = find_best_flights(all_flights, 'Derby', 'Fitzroy Crossing')
+        self.assertListEqual(retval, [112])
+
+    def test_SameCost_EarlierFlightIsShorter(self):
+        # 638 and 139 both cost 50; 638 takes 50 minutes instead of 53
+        retval = find_best_flights(all_flights, 'Fitzroy Crossing', 'Derby')
+        self.assertListEqual(retval, [638])
+
+    def test_OriginIsDestination(self):
+        retval = find_best_flights(all_flights, 'Perth', 'Perth')
+        self.assertListEqual(retval, [])
+
+    def test_Chain(self):
+        flights = [
+            (1, 'A', 'B', '08:00', '09:00', 10),
+            (2, 'B', 'C', '09:30', '10:00', 10),
+            (3, 'A', 'C', '08:00', '12:00', 30),
+        ]
+        retval = find_best_flights(flights, 'A', 'C')
+        self.assertListEqual(retval, [1, 2])
+
+class Test_FlightTable(unittest.TestCase):
+
+    def setUp(self):
+        self.table = FlightTable.from_tuples([
+            (455, 'Perth', 'Wiluna', '12:22', '14:45', 60),
+            (314, 'Mt Magnet', 'Meekatharra', '06:29', '07:30', 30),
+            (459, 'Perth', 'Wiluna', '19:09', '21:35', 30),
+        ])
+
+    def test_Columns(self):
+        self.assertEqual(len(self.table), 3)
+        self.assertListEqual(self.table.cities,
+            ['Perth', 'Wiluna', 'Mt Magnet', 'Meekatharra'])
+        self.assertListEqual(list(self.table.depart_cities), [0, 2, 0])
+        self.assertListEqual(list(self.table.arrive_cities), [1, 3, 1])
+        self.assertListEqual(list(self.table.depart_times), [742, 389, 1149])
+        self.assertListEqual(list(self.table.durations), [143, 61, 146])
+
+    def test_Rows(self):
+        row = self.table[1]
+        self.assertEqual(row.number, 314)
+        self.assertEqual(row.depart_city, "Mt Magnet")
+        self.assertEqual(row.arrive_city, "Meekatharra")
+        self.assertEqual(row.depart_time, 389)
+        self.assertEqual(row.arrive_time, 450)
+        self.assertEqual(row.cost, 30)
+        self.assertEqual(row.flight_length(), 61)
+        self.assertEqual(row, Flight(314, "Mt Magnet", "Meekatharra", 389, 450,
+            30))
+        self.assertEqual(str(row), "314 Mt Magnet 389 to Meekatharra 450 for $30")
+        self.assertEqual(self.table[-1].number, 459)
+        self.assertRaises(IndexError, self.table.__getitem__, 3)
+
+    def test_SameAsFlightTuplesToObjects(self):
+        table = FlightTable.from_tuples(all_flights)
+        self.assertListEqual(list(table),
+            list(flight_tuples_to_objects(all_flights)))
+        self.assertListEqual(list(FlightTable(table)), list(table))
+
+    def test_ScannerUsesTheColumns(self):
+        scanner = ConnectionScanner(self.table)
+        self.assertIs(scanner.depart_times, self.table.depart_times)
+        self.assertListEqual(scanner.find_best_flights('Perth', 'Wiluna'),
+            [459])
+
+    def test_RowsWorkWithFlightNetwork(self):
+        network = FlightNetwork(FlightTable.from_tuples(all_flights))
+        self.assertListEqual(
+            network.find_best_flights('Mt Magnet', 'Fitzroy Crossing'),
+            [314, 803, 348, 530, 112])
+
+class Test_TimetableIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = TimetableIndex(flight_tuples_to_objects([
+            (1, 'A', 'B', '08:00', '09:00', 10),
+            (2, 'B', 'C', '09:00', '10:00', 10),
+            (3, 'B', 'C', '11:30', '12:30', 10),
+            (4, 'A', 'B', '10:00', '11:00', 10),
+            (5, 'B', 'A', '07:00', '08:00', 10),
+        ]))
+
+    def test_Cities(self):
+        self.assertSetEqual(self.index.cities(), set(['A', 'B', 'C']))
+
+    def test_DeparturesFrom(self):
+        self.assertListEqual(
+            [x.number for x in self.index.departures_from('B', 540)], [2, 3])
+        self.assertListEqual(
+            [x.number for x in self.index.departures_from('B', 541)], [3])
+        self.assertListEqual(self.index.departures_from('C', 0), [])
+
+    def test_DepartureIndexesBetween(self):
+        flights = self.index.flights
+        self.assertListEqual([flights[i].number for i in
+            self.index.departure_indexes_between('B', 0)], [5, 2, 3])
+        self.assertListEqual([flights[i].number for i in
+            self.index.departure_indexes_between('B', 420, 540)], [5, 2])
+        self.assertListEqual([flights[i].number for i in
+            self.index.departure_indexes_between('B', 541, 690)], [3])
+        self.assertListEqual(
+            self.index.departure_indexes_between('B', 691), [])
+        self.assertListEqual(self.index.departure_indexes_between('C', 0), [])
+
+    def test_ArrivalTimesUntil(self):
+        self.assertListEqual(self.index.arrival_times_until('B', 660), [540, 660])
+        self.assertListEqual(self.index.arrival_times_until('B', 659), [540])
+        self.assertListEqual(self.index.arrival_times_until('D', 659), [])
+
+    def test_EventTimes(self):
+        self.assertListEqual(self.index.event_times('B'),
+            [420, 540, 660, 690])
+
+class Test_make_waiting_chain_graph(unittest.TestCase):
+
+    def test_Chain(self):
+        flight1 = Flight(123, "A", "B", 20, 40, 100)
+        flight2 = Flight(456, "B", "C", 60, 80, 200)
+        flight3 = Flight(789, "B", "C", 30, 50, 50)
+        index = TimetableIndex([flight1, flight2, flight3])
+        G = make_waiting_chain_graph(index, "A", "C")
+        self.assertDictEqual(G, {
+            "A": {("B", 40): flight1},
+            ("A", 20): {("B", 40): flight1},
+            ("B", 30): {("B", 40): None, ("C", 50): flight3},
+            ("B", 40): {("B", 60): None},
+            ("B", 60): {("C", 80): flight2},
+            ("C", 50): {("C", 80): None, "C": Flight(0, None, None, 0, 0, 0)},
+            ("C", 80): {"C": Flight(0, None, None, 0, 0, 0)},
+            "C": {},
+        })
+        self.assertListEqual(search_flight_graph(G, "A", "C"), [123, 456])
+
+    def test_EdgesAreLinear(self):
+        index = TimetableIndex(flight_tuples_to_objects(all_flights))
+        G = make_waiting_chain_graph(index, 'Perth', 'Derby')
+        num_edges = sum(len(x) for x in G.itervalues())
+        num_events = sum(len(index.event_times(x)) for x in index.cities())
+        self.assertLessEqual(num_edges, 2 * len(all_flights) + num_events)
+
+class Test_ConnectionScanner(unittest.TestCase):
+
+    def setUp(self):
+        self.scanner = ConnectionScanner(flight_tuples_to_objects(all_flights))
+        self.cities = sorted(self.scanner.cities)
+
+    def test_SameFlightsAsFindBestFlights(self):
+        for origin in self.cities:
+            for destination in self.cities:
+                self.assertEqual(
+                    self.scanner.find_best_flights(origin, destination),
+                    find_best_flights(all_flights, origin, destination),
+                    (origin, destination))
+
+    def test_FindBestFlightsFrom(self):
+        for origin in self.cities:
+            result = self.scanner.find_best_flights_from(origin)
+            for destination in self.cities:
+                self.assertEqual(result.get(destination),
+                    self.scanner.find_best_flights(origin, destination))
+
+    def test_UnknownCity(self):
+        self.assertIsNone(self.scanner.find_best_flights('Perth', 'Sydney'))
+        self.assertIsNone(self.scanner.find_best_flights('Sydney', 'Perth'))
+
+    def test_ZeroDurationFlights(self):
+        # flight 1 lands the minute it departs, and 2 connects to it
+        flights = [
+            (2, 'B', 'C', '08:00', '09:00', 10),
+            (1, 'A', 'B', '08:00', '08:00', 10),
+            (3, 'A', 'C', '07:00', '10:00', 50),
+        ]
+        scanner = ConnectionScanner(flight_tuples_to_objects(flights))
+        self.assertListEqual(scanner.find_best_flights('A', 'B'), [1])
+        self.assertListEqual(scanner.find_best_flights('A', 'C'), [1, 2])
+        self.assertListEqual(scanner.find_best_flights('A', 'C'),
+            find_best_flights(flights, 'A', 'C'))
+        self.assertListEqual(scanner.find_pareto_flights('A', 'C'),
+            [(20, 60, [1, 2])])
+
+    def test_ScansAreIndependent(self):
+        (best, parents) = self.scanner.scan('Perth')
+        self.scanner.scan('Broome')
+        derby = self.scanner.city_ids['Derby']
+        self.assertListEqual(self.scanner.flights_to(best[derby][3], parents),
+            find_best_flights(all_flights, 'Perth', 'Derby'))
+
+    def test_TiesGoToTheLeastWaiting(self):
+        flights = [
+            (1, 'A', 'B', '08:00', '09:00', 10),
+            (2, 'B', 'C', '09:30', '10:00', 10),
+            (3, 'B', 'C', '11:30', '12:30', 10),
+            (4, 'C', 'D', '13:00', '14:00', 10),
+        ]
+        self.assertListEqual(find_best_flights_by_scan(flights, 'A', 'D'),
+            [1, 3, 4])
+        self.assertListEqual(find_best_flights(flights, 'A', 'D'), [1, 3, 4])
+
+class Test_find_pareto_flights(unittest.TestCase):
+
+    flights = [
+        (1, 'A', 'B', '08:00', '09:00', 10),
+        (2, 'B', 'D', '09:30', '10:30', 10),
+        (3, 'B', 'D', '13:00', '14:00', 5),
+        (4, 'A', 'D', '12:00', '13:00', 100),
+        (5, 'A', 'C', '11:00', '11:30', 20),
+        (6, 'C', 'D', '12:00', '12:30', 20),
+        (7, 'A', 'D', '07:00', '12:00', 200),
+    ]
+
+    def brute_force(self, flights, origin, destination):
+        # every itinerary, by depth-first search, then the non-dominated ones
+        flights = tuple(flight_tuples_to_objects(flights))
+        itineraries = []
+        def visit(path):
+            last = path[-1]
+            if last.arrive_city == destination:
+                itineraries.append((sum(x.cost for x in path),
+                    last.arrive_time - path[0].depart_time))
+            for flight in flights:
+                if (flight.depart_city == last.arrive_city and
+                        flight.depart_time >= last.arrive_time):
+                    visit(path + [flight])
+        for flight in flights:
+            if flight.depart_city == origin:
+                visit([flight])
+        return sorted(set(x for x in itineraries if not any(
+            y[0] <= x[0] and y[1] <= x[1] and y != x for y in itineraries)))
+
+    def test_Front(self):
+        retval = find_pareto_flights(self.flights, 'A', 'D')
+        self.assertListEqual(retval, [
+            (15, 360, [1, 3]),
+            (20, 150, [1, 2]),
+            (40, 90, [5, 6]),
+            (100, 60, [4]),
+        ])
+        self.assertListEqual([x[:2] for x in retval],
+            self.brute_force(self.flights, 'A', 'D'))
+
+    def test_MaxBagSize(self):
+        flights = [
+            (1, 'A', 'B', '06:00', '07:00', 10),
+            (2, 'A', 'B', '09:00', '10:00', 50),
+            (3, 'B', 'D', '11:00', '12:00', 10),
+        ]
+        self.assertListEqual(find_pareto_flights(flights, 'A', 'D'),
+            [(20, 360, [1, 3]), (60, 180, [2, 3])])
+        self.assertListEqual(find_pareto_flights(flights, 'A', 'D', 1),
+            [(20, 360, [1, 3])])
+
+    def test_CheapestIsFindBestFlights(self):
+        scanner = ConnectionScanner(flight_tuples_to_objects(all_flights))
+        for origin in scanner.cities:
+            for destination in scanner.cities:
+                retval = scanner.find_pareto_flights(origin, destination)
+                expected = find_best_flights(all_flights, origin, destination)
+                if expected is None:
+                    self.assertListEqual(retval, [])
+                else:
+                    self.assertListEqual(retval[0][2], expected)
+                    costs = [x[0] for x in retval]
+                    durations = [x[1] for x in retval]
+                    self.assertListEqual(costs, sorted(set(costs)))
+                    self.assertListEqual(durations,
+                        sorted(set(durations), reverse=True))
+
+    def test_Unreachable(self):
+        self.assertListEqual(
+            find_pareto_flights(all_flights, 'Leonora', 'Fitzroy Crossing'), [])
+        self.assertListEqual(find_pareto_flights(all_flights, 'Perth', 'Perth'),
+            [(0, 0, [])])
+
+class Test_PeriodicTimetable(unittest.TestCase):
+
+    def setUp(self):
+        flights = FlightTable.from_tuples([
+            (1, 'A', 'B', '08:00', '09:00', 10),
+            (2, 'B', 'C', '07:00', '08:00', 10),
+            (3, 'B', 'C', '10:00', '11:00', 50),
+            (4, 'C', 'D', '23:00', '01:00', 5),
+        ])
+        # flight 1 only runs on day 0 and flight 2 only on day 2
+        self.timetable = PeriodicTimetable(flights, {1: 1 << 0, 2: 1 << 2})
+
+    def test_RunsOn(self):
+        flights = self.timetable.index.flights
+        self.assertEqual(len(self.timetable.day_masks), len(flights))
+        i = [x.number for x in flights].index(1)
+        self.assertTrue(self.timetable.runs_on(i, 0))
+        self.assertFalse(self.timetable.runs_on(i, 1))
+        self.assertTrue(self.timetable.runs_on(i, DAYS_PER_WEEK))
+        self.assertEqual(self.timetable.duration(i), 60)
+        i = [x.number for x in flights].index(4)
+        self.assertTrue(self.timetable.runs_on(i, 5))
+        self.assertEqual(self.timetable.duration(i), 120)
+
+    def test_WaitsForCheaperDay(self):
+        self.assertListEqual(
+            search_periodic_flights(self.timetable, 'A', 'C'),
+            [(0, 1), (2, 2)])
+
+    def test_OvernightFlight(self):
+        self.assertListEqual(
+            search_periodic_flights(self.timetable, 'A', 'D'),
+            [(0, 1), (2, 2), (2, 4)])
+
+    def test_NumDays(self):
+        self.assertListEqual(
+            search_periodic_flights(self.timetable, 'A', 'C', num_days=2),
+            [(0, 1), (0, 3)])
+        self.assertIsNone(
+            search_periodic_flights(self.timetable, 'C', 'D', num_days=1))
+
+    def test_StartDay(self):
+        self.assertListEqual(
+            search_periodic_flights(self.timetable, 'A', 'C', start_day=1),
+            [(7, 1), (7, 3)])
+        self.assertListEqual(search_periodic_flights(self.timetable, 'A',
+            'C', start_day=0, start_time=8 * 60 + 1, num_days=14),
+            [(7, 1), (9, 2)])
+
+    def test_Unreachable(self):
+        self.assertIsNone(search_periodic_flights(self.timetable, 'D', 'A'))
+        self.assertIsNone(search_periodic_flights(self.timetable, 'A', 'E'))
+        self.assertListEqual(
+            search_periodic_flights(self.timetable, 'A', 'A'), [])
+
+    def test_OneDayIsFindBestFlights(self):
+        timetable = PeriodicTimetable(FlightTable.from_tuples(all_flights))
+        cities = sorted(timetable.index.cities())
+        for origin in cities[::3]:
+            for destination in cities:
+                path = search_periodic_flights(timetable, origin, destination,
+                    num_days=1)
+                if path is not None:
+                    path = [number for (day, number) in path]
+                self.assertEqual(path,
+                    find_best_flights(all_flights, origin, destination),
+                    (origin, destination))
+
+class Test_FlightNetwork(unittest.TestCase):
+
+    def setUp(self):
+        self.network = FlightNetwork(flight_tuples_to_objects(all_flights))
+        self.cities = sorted(set(x[1] for x in all_flights))
+
+    def assert_same_as_find_best_flights(self, flights):
+        for origin in self.cities:
+            for destination in self.cities:
+                self.assertEqual(
+                    self.network.find_best_flights(origin, destination),
+                    find_best_flights(flights, origin, destination),
+                    (origin, destination))
+
+    def test_SameFlightsAsFindBestFlights(self):
+        self.assert_same_as_find_best_flights(all_flights)
+
+    def test_SameGraphAsMakeWaitingChainGraph(self):
+        self.network.find_best_flights('Perth', 'Derby')
+        index = TimetableIndex(FlightTable.from_tuples(all_flights))
+        G = make_waiting_chain_graph(index, 'Perth', 'Derby')
+        del G['Perth']
+        del G['Derby']
+        for node in self.network.cities['Derby']:
+            del G[node]['Derby']
+        self.assertDictEqual(self.network.G, G)
+        self.assertItemsEqual(self.network.weights, G)
+
+    def test_CancelFlight(self):
+        flight = self.network.cancel_flight(112)
+        self.assertEqual(flight.number, 112)
+        self.assertListEqual(
+            self.network.find_best_flights('Derby', 'Fitzroy Crossing'), [622])
+        self.assert_same_as_find_best_flights(
+            [x for x in all_flights if x[0] != 112])
+        self.assertRaises(KeyError, self.network.cancel_flight, 112)
+
+    def test_CancelOnlyFlightIntoGadget(self):
+        self.network.cancel_flight(314) # the only arrival at Meekatharra 07:30
+        self.network.find_best_flights('Perth', 'Derby')
+        self.assertNotIn(('Meekatharra', 450), self.network.G)
+        self.assertNotIn(('Meekatharra', 450), self.network.weights)
+        self.assert_same_as_find_best_flights(
+            [x for x in all_flights if x[0] != 314])
+
+    def test_AddFlight(self):
+        new_flight = (1000, 'Derby', 'Fitzroy Crossing', '20:00', '20:30', 60)
+        self.network.add_flight(next(flight_tuples_to_objects([new_flight])))
+        self.assertListEqual(
+            self.network.find_best_flights('Derby', 'Fitzroy Crossing'), [1000])
+        self.assert_same_as_find_best_flights(all_flights + [new_flight])
+        self.assertRaises(ValueError, self.network.add_flight,
+            Flight(1000, 'Perth', 'Broome', 0, 1, 1))
+
+    def test_UpdateCost(self):
+        self.network.update_cost(622, 10)
+        self.assertListEqual(
+            self.network.find_best_flights('Derby', 'Fitzroy Crossing'), [622])
+        self.assert_same_as_find_best_flights([x if x[0] != 622 else
+            x[:5] + (10,) for x in all_flights])
+        self.assertRaises(KeyError, self.network.update_cost, 1, 10)
+
+    def test_UnknownCities(self):
+        self.assertIsNone(self.network.find_best_flights('Perth', 'Sydney'))
+        self.assertIsNone(self.network.find_best_flights('Sydney', 'Perth'))
+
+class Test_FlightProfile(unittest.TestCase):
+
+    def setUp(self):
+        self.scanner = ConnectionScanner(flight_tuples_to_objects(all_flights))
+
+    def test_SameFlightsAsFindBestFlights(self):
+        for origin in ['Broome', 'Perth', 'Wiluna']:
+            profile = self.scanner.profile(origin)
+            for time in [0, 7 * 60, 12 * 60 + 30, 18 * 60, 23 * 60]:
+                # drop the flights from the origin that leave before the time
+                flights = [x for x in all_flights if x[1] != origin or
+                    parse_time_str(x[3]) >= time]
+                for destination in self.scanner.cities:
+                    self.assertEqual(
+                        profile.find_best_flights(destination, time),
+                        find_best_flights(flights, origin, destination),
+                        (origin, time, destination))
+
+    def test_Entries(self):
+        flights = [
+            (1, 'A', 'B', '06:00', '07:00', 10),
+            (2, 'A', 'B', '09:00', '10:00', 50),
+            (3, 'A', 'B', '12:00', '14:00', 10),
+            (4, 'A', 'B', '13:00', '14:00', 30),
+        ]
+        scanner = ConnectionScanner(flight_tuples_to_objects(flights))
+        profile = scanner.profile('A')
+        self.assertListEqual(profile.destinations(), ['B'])
+        self.assertListEqual(profile.entries('B'), [
+            (360, 10, 60, [1]),
+            (720, 10, 120, [3]),
+            (780, 30, 60, [4]),
+        ])
+        self.assertEqual(profile.best_after('B', 0), (360, 10, 60, [1]))
+        self.assertEqual(profile.best_after('B', 361), (720, 10, 120, [3]))
+        self.assertEqual(profile.best_after('B', 721), (780, 30, 60, [4]))
+        self.assertIsNone(profile.best_after('B', 781))
+        self.assertIsNone(profile.best_after('C', 0))
+        self.assertListEqual(profile.find_best_flights('A', 0), [])
+
+class Test_find_best_flights_Constrained(unittest.TestCase):
+
+    flights = [
+        (1, 'A', 'B', '08:00', '09:00', 10),
+        (2, 'B', 'C', '09:10', '10:00', 10),
+        (3, 'B', 'C', '10:00', '11:00', 15),
+        (4, 'C', 'D', '11:30', '12:00', 10),
+        (5, 'A', 'D', '07:00', '12:00', 40),
+        (6, 'A', 'C', '06:00', '07:00', 25),
+        (7, 'C', 'D', '16:00', '17:00', 5),
+        (8, 'B', 'D', '14:00', '15:00', 30),
+    ]
+
+    def brute_force(self, flights, origin, destination, max_legs,
+            min_layover, max_layover):
+        # the smallest (cost, duration) of the itineraries that satisfy the
+        # limits, found by trying them all
+        flights = list(flight_tuples_to_objects(flights))
+        results = []
+        def extend(path):
+            last = path[-1]
+            if last.arrive_city == destination:
+                results.append((sum(x.cost for x in path),
+                    last.arrive_time - path[0].depart_time))
+            if max_legs is not None and len(path) >= max_legs:
+                return
+            for flight in flights:
+                layover = flight.depart_time - last.arrive_time
+                if (flight.depart_city == last.arrive_city and
+                        layover >= min_layover and
+                        (max_layover is None or layover <= max_layover)):
+                    extend(path + [flight])
+        for flight in flights:
+            if flight.depart_city == origin:
+                extend([flight])
+        return min(results) if results else None
+
+    def cost_and_duration(self, flights, numbers):
+        if numbers is None:
+            return None
+        flights = {x.number:x for x in flight_tuples_to_objects(flights)}
+        path = [flights[x] for x in numbers]
+        return (sum(x.cost for x in path),
+            path[-1].arrive_time - path[0].depart_time)
+
+    def test_Unconstrained(self):
+        self.assertListEqual(
+            find_best_flights(self.flights, 'A', 'D'), [1, 2, 7])
+
+    def test_MaxLegs(self):
+        self.assertListEqual(
+            find_best_flights(self.flights, 'A', 'D', max_legs=2), [6, 7])
+        self.assertListEqual(
+            find_best_flights(self.flights, 'A', 'D', max_legs=1), [5])
+        self.assertIsNone(
+            find_best_flights(self.flights, 'A', 'C', max_legs=0))
+
+    def test_MinLayover(self):
+        self.assertListEqual(find_best_flights(self.flights, 'A', 'C',
+            min_layover=30), [6])
+        self.assertListEqual(find_best_flights(self.flights, 'A', 'D',
+            max_legs=3, min_layover=30, max_layover=120), [1, 3, 4])
+
+    def test_MaxLayover(self):
+        self.assertListEqual(find_best_flights(self.flights, 'A', 'D',
+            max_layover=60), [1, 3, 4])
+        self.assertListEqual(find_best_flights(self.flights, 'A', 'D',
+            max_layover=0), [5])
+
+    def test_SameAsBruteForce(self):
+        for origin in 'ABCD':
+            for destination in 'ABCD':
+                if origin == destination:
+                    continue
+                for max_legs in [None, 1, 2, 3]:
+                    for (min_layover, max_layover) in [(0, None), (0, 60),
+                            (10, None), (30, 120), (60, 360)]:
+                        result = find_best_flights(self.flights, origin,
+                            destination, max_legs, min_layover, max_layover)
+                        self.assertEqual(
+                            self.cost_and_duration(self.flights, result),
+                            self.brute_force(self.flights, origin,
+                                destination, max_legs, min_layover,
+                                max_layover),
+                            (origin, destination, max_legs, min_layover,
+                                max_layover))
+
+    def test_LooseLimitsAreUnconstrained(self):
+        cities = sorted(set(x[1] for x in all_flights))
+        for origin in cities[::3]:
+            for destination in cities:
+                self.assertEqual(find_best_flights(all_flights, origin,
+                    destination, max_legs=len(all_flights),
+                    max_layover=MINUTES_PER_DAY),
+                    find_best_flights(all_flights, origin, destination),
+                    (origin, destination))
+
+    def test_SameCity(self):
+        self.assertListEqual(
+            find_best_flights(self.flights, 'A', 'A', max_legs=1), [])
+
+class Test_find_best_flights_batch(unittest.TestCase):
+
+    def test_SameFlightsAsFindBestFlights(self):
+        cities = sorted(set(x[1] for x in all_flights))
+        pairs = [(x, y) for x in cities[::2] for y in cities]
+        actual = dict(find_best_flights_batch(all_flights, pairs,
+            processes=2))
+        self.assertEqual(len(actual), len(pairs))
+        for (origin, destination) in pairs:
+            self.assertEqual(actual[(origin, destination)],
+                find_best_flights(all_flights, origin, destination),
+                (origin, destination))
+
+    def test_DuplicateAndUnknownPairs(self):
+        pairs = [('Perth', 'Derby'), ('Perth', 'Sydney'), ('Perth', 'Derby'),
+            ('Sydney', 'Perth'), ('Perth', 'Perth')]
+        actual = list(find_best_flights_batch(all_flights, pairs,
+            processes=1))
+        self.assertEqual(len(actual), 4)
+        self.assertDictEqual(dict(actual), {
+            ('Perth', 'Derby'):
+                find_best_flights(all_flights, 'Perth', 'Derby'),
+            ('Perth', 'Sydney'): None,
+            ('Sydney', 'Perth'): None,
+            ('Perth', 'Perth'): [],
+        })
+
+    def test_StopEarly(self):
+        results = find_best_flights_batch(all_flights,
+            [('Perth', 'Derby'), ('Broome', 'Perth')], processes=2)
+        self.assertEqual(len(next(results)), 2)
+        results.close()
+
 class Test_parse_time_str(unittest.TestCase):
 
     def test_0000(self):
@@ -17,43 +17,46 @@
 # version (heap or list) you should use.
 #
 
-# code for heap can be found in the instructors comments below
-from cs215.finalexam.heap import heappopmin
-from cs215.finalexam.heap import insert_heap
-from cs215.finalexam.heap import decrease_val
-from operator import itemgetter
-
-import math
-
-def maximize_probability_of_favor(G, v1, v2):
-    # Use the property that log(a) + log(b) = log(ab)
-    # And since each edge weight is in the range [0,1] => log(a) < 0
-    # So translate the edge weights into their negative logarithms
-
-    H = {x:{} for x in G}
-    for node1 in G:
-        for node2 in G[node1]:
-            p_node1_node2 = G[node1][node2]
-            p_node1_node2_log = math.log(p_node1_node2, 2)
-            p_node1_node2_log_positive = -p_node1_node2_log
-            H[node1][node2] = p_node1_node2_log_positive
-
-    # Dijkstra using heaps is O(mlogn) and using lists is O(n^2)
-    # So choose the better algorithm based on this.
+# The list version lives on as dense_dijkstra() and the heap version as
+# algebraic_dijkstra(), both in shortest_paths.py, and
+# maximize_probability_of_favor() picks between them.
+from cs215.finalexam.favor_calibration import load_calibration
+from cs215.finalexam.favor_calibration import make_favor_graph
+from cs215.finalexam.favor_calibration import prefer_dense
+from cs215.finalexam.shortest_paths import CompactGraph
+from cs215.finalexam.shortest_paths import DenseGraph
+from cs215.finalexam.shortest_paths import MOST_PROBABLE
+from cs215.finalexam.shortest_paths import algebraic_dijkstra
+from cs215.finalexam.shortest_paths import bidirectional_dijkstra
+from cs215.finalexam.shortest_paths import dense_dijkstra
+from cs215.finalexam.shortest_paths import k_best_paths
+
+import array
+import itertools
+import operator
+
+# loaded once rather than on every search; rerun favor_calibration and
+# reload this module to pick up a new calibration
+CALIBRATION = load_calibration()
+
+def maximize_probability_of_favor(G, v1, v2, calibration=None):
+    # Dijkstra using heaps is O(mlogn) and using an adjacency matrix is
+    # O(n^2), so choose the faster one for this graph, using the constant
+    # factors measured by favor_calibration (CALIBRATION) unless
+    # *calibration* is given.  Both multiply the probabilities directly,
+    # largest first.
+    if calibration is None:
+        calibration = CALIBRATION
     n = len(G)
     m = sum(len(G[x]) for x in G)
-    n_squared = n * n
-    m_log_n = m * math.log(n, 2)
-    if n_squared < m_log_n:
-        results = dijkstra_list(H, v1)
+    if prefer_dense(n, m, calibration):
+        results = dense_dijkstra(DenseGraph(G), v1, MOST_PROBABLE,
+            target=v2)
     else:
-        results = dijkstra_heap(H, v1)
+        results = algebraic_dijkstra(CompactGraph(G), v1, MOST_PROBABLE,
+            target=v2)
 
-    result = results[v2]
-
-    p_v1_v2_log_positive = result[0]
-    p_v1_v2_log = -p_v1_v2_log_positive
-    p_v1_v2 = 2 ** p_v1_v2_log
+    p_v1_v2 = results[v2][0]
 
     path = [v2]
     node = v2
@@ -64,70 +67,113 @@ def maximize_probability_of_favor(G, v1, v2):
 
     return (path, p_v1_v2)
 
-#
-# version of dijkstra implemented using a heap
-#
-# returns a dictionary mapping a node to the distance
-# to that node and the parent
-#
-# Do not modify this code
-#
-def dijkstra_heap(G, a):
-    # Distance to the input node is zero, and it has
-    # no parent
-    first_entry = (0, a, None)
-    heap = [first_entry]
-    # location keeps track of items in the heap
-    # so that we can update their value later
-    location = {first_entry:0}
-    dist_so_far = {a:first_entry}
-    final_dist = {}
-    while len(dist_so_far) > 0:
-        dist, node, parent = heappopmin(heap, location)
-        # lock it down!
-        final_dist[node] = (dist, parent)
-        del dist_so_far[node]
-        for x in G[node]:
-            if x in final_dist:
-                continue
-            new_dist = G[node][x] + final_dist[node][0]
-            new_entry = (new_dist, x, node)
-            if x not in dist_so_far:
-                # add to the heap
-                insert_heap(heap, new_entry, location)
-                dist_so_far[x] = new_entry
-            elif new_entry < dist_so_far[x]:
-                # update heap
-                decrease_val(heap, location, dist_so_far[x], new_entry)
-                dist_so_far[x] = new_entry
-    return final_dist
-
-#
-# version of dijkstra implemented using a list
-#
-# returns a dictionary mapping a node to the distance
-# to that node and the parent
-#
-# Do not modify this code
-#
-def dijkstra_list(G, a):
-    dist_so_far = {a:(0, None)} # keep track of the parent node
-    final_dist = {}
-    while len(final_dist) < len(G):
-        node, entry = min(dist_so_far.items(), key=itemgetter(1))
-        # lock it down!
-        final_dist[node] = entry
-        del dist_so_far[node]
-        for x in G[node]:
-            if x in final_dist:
-                continue
-            new_dist = G[node][x] + final_dist[node][0]
-            new_entry = (new_dist, node)
-            if x not in dist_so_far:
-                dist_so_far[x] = new_entry
-            elif new_entry < dist_so_far[x]:
-                dist_so_far[x] = new_entry
-    return final_dist
+def maximize_probability_of_favor_bidirectional(G, v1, v2):
+    """
+    Does the same as maximize_probability_of_favor(), but searches forwards
+    from v1 and backwards from v2 at the same time, which usually settles
+    far fewer people in a large network.  Returns a tuple whose values are
+    the path, its probability and the number of people settled, or None, 0.0
+    and that number if there is no chain.
+    """
+    (prob, path, num_settled) = bidirectional_dijkstra(CompactGraph(G), v1,
+        v2, MOST_PROBABLE)
+    if path is None:
+        prob = 0.0
+    return (path, prob, num_settled)
+
+def most_probable_favor_chains(G, v1, v2, k=None):
+    """
+    Generates the chains of people from v1 to v2 that visit nobody twice,
+    most probable first, as (path, probability) tuples like the one from
+    maximize_probability_of_favor(), stopping after *k* of them if *k* is
+    given or else when the caller stops asking.  See k_best_paths().
+    """
+    chains = k_best_paths(CompactGraph(G), v1, v2, MOST_PROBABLE)
+    for (prob, path) in itertools.islice(chains, k):
+        yield (path, prob)
+
+def count_settled(G, v1, v2):
+    """
+    Returns a dict mapping the names of the ways of searching for a favor
+    chain from v1 to v2 to the number of people each settles: a full tree
+    from v1, a search from v1 that stops at v2, and a bidirectional search.
+    """
+    graph = CompactGraph(G)
+    return {
+        "single_source": len(algebraic_dijkstra(graph, v1, MOST_PROBABLE)),
+        "single_pair": len(algebraic_dijkstra(graph, v1, MOST_PROBABLE,
+            target=v2)),
+        "bidirectional": bidirectional_dijkstra(graph, v1, v2,
+            MOST_PROBABLE)[2],
+    }
+
+class FavorMatrix(object):
+    """
+    The most probable chain of favors between every pair of people in the
+    graph G, for when every pair will be asked about: one single-source
+    search from each person, over a single DenseGraph or CompactGraph of G
+    chosen as for maximize_probability_of_favor(), keeping the probability
+    and the parent of every chain.  Each row costs one search, so the whole
+    matrix costs n of them, O(n^3) when G is dense, plus n*n probabilities
+    and parents in memory.  That is about half a minute for 600 people who
+    all know each other, and several minutes at 1000, though sparse graphs
+    go further (20 seconds for 1000 people with 1% of the pairs linked); for
+    thousands of people, ask maximize_probability_of_favor() about only the
+    pairs that are needed.  An edge of probability 0 is no edge.
+    """
+
+    def __init__(self, G, calibration=None):
+        if calibration is None:
+            calibration = CALIBRATION
+        n = len(G)
+        m = sum(len(G[x]) for x in G)
+        if prefer_dense(n, m, calibration):
+            (graph, search) = (DenseGraph(G), dense_dijkstra)
+        else:
+            (graph, search) = (CompactGraph(G), algebraic_dijkstra)
+        self.nodes = graph.nodes
+        self.handles = graph.handles
+        handles = self.handles
+        # probabilities[i][j] is the best probability from i to j, or 0.0,
+        # and parents[i][j] the node before j on that chain, or -1
+        self.probabilities = []
+        self.parents = []
+        for node in self.nodes:
+            row = array.array("d", [0.0]) * n
+            parents = array.array("l", [-1]) * n
+            final_dist = search(graph, node, MOST_PROBABLE)
+            for (x, (p, parent)) in final_dist.iteritems():
+                if p > 0.0:
+                    j = handles[x]
+                    row[j] = p
+                    if parent is not None:
+                        parents[j] = handles[parent]
+            self.probabilities.append(row)
+            self.parents.append(parents)
+
+    def probability(self, v1, v2):
+        """
+        Returns the largest probability that v1 will get a favor done by v2,
+        1.0 if they are the same person, or 0.0 if there is no chain.
+        """
+        return self.probabilities[self.handles[v1]][self.handles[v2]]
+
+    def path(self, v1, v2):
+        """
+        Returns the most probable chain of people from v1 to v2, as for
+        maximize_probability_of_favor(), or None if there is no chain.
+        """
+        i = self.handles[v1]
+        j = self.handles[v2]
+        if self.probabilities[i][j] == 0.0:
+            return None
+        parents = self.parents[i]
+        path = [v2]
+        while j != i:
+            j = parents[j]
+            path.append(self.nodes[j])
+        path.reverse()
+        return path
 
 ##########
 #
@@ -135,6 +181,41 @@ def dijkstra_list(G, a):
 
 import unittest
 
+def create_2_nodes_graph():
+    return {
+        "A": {"B": 0.25},
+        "B": {"A": 0.80},
+    }
+
+def create_3_node_clique_graph():
+    return {
+        "A": {"B": 0.1, "C": 0.2},
+        "B": {"C": 0.3, "A": 0.9},
+        "C": {"A": 0.8, "B": 0.7},
+    }
+
+def create_4_node_clique_graph():
+    return {
+        "A": {"B": 0.1, "C": 0.9, "D": 0.6},
+        "B": {"A": 0.2, "C": 0.7, "D": 0.1},
+        "C": {"A": 0.2, "B": 0.2, "D": 0.1},
+        "D": {"A": 0.7, "B": 0.7, "C": 0.9},
+    }
+
+def create_big_dipper_graph():
+    return {
+        "A": {"B": 0.1},
+        "B": {"C": 0.7},
+        "C": {"D": 0.2, "E": 0.4},
+        "D": {"F": 0.7},
+        "E": {"F": 0.1},
+        "F": {},
+    }
+
+# the sample graphs of the tests below, for tests that check every pair
+SAMPLE_GRAPHS = [create_2_nodes_graph, create_3_node_clique_graph,
+    create_4_node_clique_graph, create_big_dipper_graph]
+
 class ProvidedTests(unittest.TestCase):
 
     def get_result(self):
@@ -157,26 +238,137 @@ class ProvidedTests(unittest.TestCase):
 
 class FindingAFavorTestCase(unittest.TestCase):
 
+    # both backends are checked, whichever the calibration would pick
+    CALIBRATIONS = [
+        {"dense_cost": 0.0, "heap_cost": 1.0},
+        {"dense_cost": 1.0, "heap_cost": 0.0},
+    ]
+
     def assert_path(self, v1, v2, expected_path):
-        (actual_path, unused_prob) = self.calculate_result(v1, v2)
-        self.assertListEqual(actual_path, expected_path)
+        for (actual_path, unused_prob) in self.calculate_results(v1, v2):
+            self.assertListEqual(actual_path, expected_path)
 
     def assert_probability(self, v1, v2, expected_prob, places=3):
-        (unused_path, actual_prob) = self.calculate_result(v1, v2)
-        self.assertAlmostEqual(actual_prob, expected_prob, places)
+        for (unused_path, actual_prob) in self.calculate_results(v1, v2):
+            self.assertAlmostEqual(actual_prob, expected_prob, places)
 
-    def calculate_result(self, v1, v2):
+    def calculate_results(self, v1, v2):
         G = self.create_graph()
-        result = maximize_probability_of_favor(G, v1, v2)
-        return result
+        results = [maximize_probability_of_favor(G, v1, v2, calibration)
+            for calibration in self.CALIBRATIONS]
+        results.append(maximize_probability_of_favor(G, v1, v2))
+        return results
+
+class TestBidirectional(unittest.TestCase):
+
+    def test_SameAsMaximizeProbabilityOfFavor(self):
+        for create_graph in SAMPLE_GRAPHS:
+            G = create_graph()
+            for v1 in G:
+                for v2 in G:
+                    (path, prob, unused_num_settled) = (
+                        maximize_probability_of_favor_bidirectional(G, v1, v2))
+                    try:
+                        expected = maximize_probability_of_favor(G, v1, v2)
+                    except KeyError:
+                        expected = (None, 0.0)
+                    self.assertEqual(path, expected[0], (v1, v2))
+                    self.assertAlmostEqual(prob, expected[1])
+
+    def test_CountSettled(self):
+        # a long chain with a side branch that only the full tree explores
+        G = {x:{x + 1: 0.9} for x in xrange(10)}
+        G[10] = {}
+        G[0][100] = 0.95
+        G.update({x:{x + 1: 0.99} for x in xrange(100, 120)})
+        G[120] = {}
+        counts = count_settled(G, 0, 3)
+        self.assertEqual(counts["single_source"], 32)
+        self.assertLess(counts["single_pair"], counts["single_source"])
+        self.assertLess(counts["bidirectional"], counts["single_pair"])
+
+class TestMostProbableFavorChains(unittest.TestCase):
+
+    def create_graph(self):
+        return {'a':{'b':.9, 'e':.5},
+                'b':{'c':.9, 'e':.8},
+                'c':{'d':.01},
+                'd':{},
+                'e':{'f':.5},
+                'f':{'d':.5}}
+
+    def test_Chains(self):
+        chains = list(most_probable_favor_chains(self.create_graph(), 'a',
+            'd'))
+        self.assertListEqual([path for (path, prob) in chains], [
+            ['a', 'b', 'e', 'f', 'd'],
+            ['a', 'e', 'f', 'd'],
+            ['a', 'b', 'c', 'd'],
+        ])
+        for (expected, (unused_path, prob)) in zip([.18, .125, .0081],
+                chains):
+            self.assertAlmostEqual(prob, expected)
+
+    def test_FirstIsMaximizeProbabilityOfFavor(self):
+        G = create_4_node_clique_graph()
+        for v1 in G:
+            for v2 in G:
+                if v1 != v2:
+                    (path, prob) = next(most_probable_favor_chains(G, v1, v2))
+                    self.assertEqual(path,
+                        maximize_probability_of_favor(G, v1, v2)[0])
+
+    def test_K(self):
+        G = self.create_graph()
+        self.assertEqual(len(list(most_probable_favor_chains(G, 'a', 'd',
+            k=2))), 2)
+        self.assertListEqual(list(most_probable_favor_chains(G, 'd', 'a')),
+            [])
+
+class TestFavorMatrix(unittest.TestCase):
+
+    def assert_same_as_maximize_probability_of_favor(self, G):
+        matrix = FavorMatrix(G)
+        for v1 in G:
+            for v2 in G:
+                try:
+                    (path, prob) = maximize_probability_of_favor(G, v1, v2)
+                except KeyError:
+                    # v2 was never reached
+                    (path, prob) = (None, 0.0)
+                self.assertAlmostEqual(matrix.probability(v1, v2), prob)
+                self.assertEqual(matrix.path(v1, v2), path, (v1, v2))
+
+    def test_Provided(self):
+        G = {'a':{'b':.9, 'e':.5},
+             'b':{'c':.9},
+             'c':{'d':.01},
+             'd':{},
+             'e':{'f':.5},
+             'f':{'d':.5}}
+        matrix = FavorMatrix(G)
+        self.assertListEqual(matrix.path('a', 'd'), ['a', 'e', 'f', 'd'])
+        self.assertAlmostEqual(matrix.probability('a', 'd'), .125)
+        self.assertIsNone(matrix.path('d', 'a'))
+        self.assertEqual(matrix.probability('d', 'a'), 0.0)
+        self.assertListEqual(matrix.path('a', 'a'), ['a'])
+        self.assertEqual(matrix.probability('a', 'a'), 1.0)
+
+    def test_SameAsMaximizeProbabilityOfFavor(self):
+        for create_graph in SAMPLE_GRAPHS:
+            self.assert_same_as_maximize_probability_of_favor(create_graph())
+
+    def test_RandomGraphs(self):
+        import random
+        rng = random.Random(2)
+        for (n, density) in [(10, 0.2), (15, 0.5), (12, 1.0)]:
+            self.assert_same_as_maximize_probability_of_favor(
+                make_favor_graph(n, density, rng))
 
 class Test2Nodes(FindingAFavorTestCase):
 
     def create_graph(self):
-        return {
-            "A": {"B": 0.25},
-            "B": {"A": 0.80},
-        }
+        return create_2_nodes_graph()
 
     def test_AtoB_path(self):
         self.assert_path("A", "B", ["A", "B"])
@@ -193,11 +385,7 @@ class Test2Nodes(FindingAFavorTestCase):
 class Test3NodeClique(FindingAFavorTestCase):
 
     def create_graph(self):
-        return {
-            "A": {"B": 0.1, "C": 0.2},
-            "B": {"C": 0.3, "A": 0.9},
-            "C": {"A": 0.8, "B": 0.7},
-        }
+        return create_3_node_clique_graph()
 
     def test_AtoB_path(self):
         self.assert_path("A", "B", ["A", "C", "B"])
@@ -238,12 +426,7 @@ class Test3NodeClique(FindingAFavorTestCase):
 class Test4NodeClique(FindingAFavorTestCase):
 
     def create_graph(self):
-        return {
-            "A": {"B": 0.1, "C": 0.9, "D": 0.6},
-            "B": {"A": 0.2, "C": 0.7, "D": 0.1},
-            "C": {"A": 0.2, "B": 0.2, "D": 0.1},
-            "D": {"A": 0.7, "B": 0.7, "C": 0.9},
-        }
+        return create_4_node_clique_graph()
 
     def test_AtoB_path(self):
         self.assert_path("A", "B", ["A", "D", "B"])
@@ -320,14 +503,7 @@ class Test4NodeClique(FindingAFavorTestCase):
 class TestBigDipper(FindingAFavorTestCase):
 
     def create_graph(self):
-        return {
-            "A": {"B": 0.1},
-            "B": {"C": 0.7},
-            "C": {"D": 0.2, "E": 0.4},
-            "D": {"F": 0.7},
-            "E": {"F": 0.1},
-            "F": {},
-        }
+        return create_big_dipper_graph()
 
     def test_AtoF_path(self):
         self.assert_path("A", "F", ["A", "B", "C", "D", "F"])
@@ -0,0 +1,169 @@
+"""
+Measures where dense_dijkstra() starts to beat algebraic_dijkstra() for
+maximize_probability_of_favor() in 08_finding_a_favor_my, and saves the
+result for it to choose between them.
+
+The choice used to compare n*n with m*log(n), which ignores how much each
+step of the two algorithms costs.  Here both are timed on random favor
+graphs of several sizes and densities, and the seconds per unit of n*n for
+the dense search and per unit of m*log(n) for the heap search are saved to
+CALIBRATION_FILENAME as JSON.  The dense search is then chosen whenever
+    dense_cost * n * n < heap_cost * m * log(n)
+
+Run it on the machine that will run the searches; without the file,
+DEFAULT_CALIBRATION is used.
+"""
+
+import io
+import json
+import math
+import os
+import random
+import time
+import unittest
+
+from cs215.finalexam.shortest_paths import CompactGraph
+from cs215.finalexam.shortest_paths import DenseGraph
+from cs215.finalexam.shortest_paths import MOST_PROBABLE
+from cs215.finalexam.shortest_paths import algebraic_dijkstra
+from cs215.finalexam.shortest_paths import dense_dijkstra
+
+CALIBRATION_FILENAME = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+    "favor_calibration.json")
+
+# what this script measured on a typical machine
+DEFAULT_CALIBRATION = {"dense_cost": 2.2e-7, "heap_cost": 1.9e-7}
+
+# the (number of nodes, fraction of pairs with an edge) graphs to time
+GRAPH_SHAPES = [(n, density) for n in (50, 100, 200)
+    for density in (0.05, 0.2, 0.5, 1.0)]
+
+
+def load_calibration(filename=CALIBRATION_FILENAME):
+    """
+    Returns the calibration saved in the given file, or DEFAULT_CALIBRATION
+    if there is no such file.
+    """
+    if not os.path.exists(filename):
+        return dict(DEFAULT_CALIBRATION)
+    with io.open(filename, "rb") as f:
+        return json.load(f)
+
+
+def save_calibration(calibration, filename=CALIBRATION_FILENAME):
+    with io.open(filename, "wb") as f:
+        json.dump(calibration, f, indent=2, sort_keys=True)
+
+
+def prefer_dense(num_nodes, num_edges, calibration):
+    """
+    Returns whether dense_dijkstra() is expected to be faster than
+    algebraic_dijkstra() on a graph of the given size.
+    """
+    if num_nodes < 2:
+        return False
+    dense_time = calibration["dense_cost"] * num_nodes * num_nodes
+    heap_time = (calibration["heap_cost"] * num_edges *
+        math.log(num_nodes, 2))
+    return dense_time < heap_time
+
+
+def make_favor_graph(num_nodes, density, rng):
+    """
+    Returns a random favor graph, a dict of dicts of probabilities, in which
+    each ordered pair of distinct nodes has an edge with probability
+    *density*.
+    """
+    G = {x:{} for x in xrange(num_nodes)}
+    for x in xrange(num_nodes):
+        for y in xrange(num_nodes):
+            if x != y and rng.random() < density:
+                G[x][y] = rng.uniform(0.01, 1.0)
+    return G
+
+
+def time_search(search, graph, sources):
+    """
+    Returns the wall time, in seconds, of searching from each of the given
+    sources with the given function.
+    """
+    start_time = time.time()
+    for source in sources:
+        search(graph, source, MOST_PROBABLE)
+    return time.time() - start_time
+
+
+def calibrate(shapes=GRAPH_SHAPES, num_sources=5, seed=0):
+    """
+    Times both searches on a random graph of each of the given shapes and
+    returns a calibration: the median over the shapes of the seconds per
+    search per unit of n*n and of m*log(n).
+    """
+    rng = random.Random(seed)
+    dense_costs = []
+    heap_costs = []
+    for (num_nodes, density) in shapes:
+        G = make_favor_graph(num_nodes, density, rng)
+        num_edges = sum(len(edges) for edges in G.itervalues())
+        if num_edges == 0:
+            continue
+        sources = rng.sample(xrange(num_nodes), min(num_sources, num_nodes))
+        dense_time = time_search(dense_dijkstra, DenseGraph(G), sources)
+        heap_time = time_search(algebraic_dijkstra, CompactGraph(G), sources)
+        dense_costs.append(
+            dense_time / len(sources) / (num_nodes * num_nodes))
+        heap_costs.append(heap_time / len(sources) /
+            (num_edges * math.log(num_nodes, 2)))
+    return {"dense_cost": median(dense_costs), "heap_cost": median(heap_costs)}
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+class CalibrationTests(unittest.TestCase):
+
+    def test_Calibrate(self):
+        calibration = calibrate([(10, 0.5), (20, 1.0)], num_sources=2)
+        self.assertItemsEqual(calibration, DEFAULT_CALIBRATION)
+        self.assertGreater(calibration["dense_cost"], 0)
+        self.assertGreater(calibration["heap_cost"], 0)
+
+    def test_PreferDense(self):
+        calibration = {"dense_cost": 1.0, "heap_cost": 1.0}
+        self.assertTrue(prefer_dense(4, 12, calibration))
+        self.assertFalse(prefer_dense(100, 200, calibration))
+        self.assertFalse(prefer_dense(1, 0, calibration))
+        calibration = {"dense_cost": 3.0, "heap_cost": 1.0}
+        self.assertFalse(prefer_dense(4, 12, calibration))
+
+    def test_LoadMissingFile(self):
+        self.assertDictEqual(load_calibration("no-such-calibration.json"),
+            DEFAULT_CALIBRATION)
+
+    def test_SaveAndLoad(self):
+        import tempfile
+        (fd, filename) = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        try:
+            save_calibration({"dense_cost": 1.5, "heap_cost": 0.5}, filename)
+            self.assertDictEqual(load_calibration(filename),
+                {"dense_cost": 1.5, "heap_cost": 0.5})
+        finally:
+            os.remove(filename)
+
+    def test_MakeFavorGraph(self):
+        G = make_favor_graph(10, 1.0, random.Random(1))
+        self.assertEqual(sum(len(edges) for edges in G.itervalues()), 90)
+        for edges in G.itervalues():
+            for p in edges.itervalues():
+                self.assertTrue(0.0 < p <= 1.0)
+
+
+if __name__ == "__main__":
+    calibration = calibrate()
+    print("dense_cost: {dense_cost:.3g} s per n*n".format(**calibration))
+    print("heap_cost:  {heap_cost:.3g} s per m*log(n)".format(**calibration))
+    save_calibration(calibration)
+    print("saved {}".format(CALIBRATION_FILENAME))
@@ -108,6 +108,517 @@ def decrease_val(heap, location, old_val, new_val):
     up_heapify(heap, i, location)
 
 
+class IndexedHeap(object):
+    """
+    A min-heap of integer handles, each of which has a key.
+
+    Unlike the functions above, which track positions in a dict keyed by the
+    whole (value, id, ...) tuple, the heap, the positions and the keys are
+    kept in parallel lists indexed by handle, so no tuple is ever hashed or
+    rebuilt.  Handles should be small non-negative integers, such as the
+    index of a node in a list of nodes; they need not be contiguous.
+
+    Keys that compare equal are ordered by a sequence number assigned on
+    insertion, so the heap never falls through to comparing anything other
+    than the keys themselves.
+
+    *arity* is the number of children of each heap node; the default of 2 is
+    a binary heap.  Larger arities make the heap shallower, which speeds up
+    insert() and decrease_key() at the expense of pop_min().
+    """
+
+    def __init__(self, arity=2):
+        if arity < 2:
+            raise ValueError("invalid arity: {}".format(arity))
+        self.arity = arity
+        self._heap = [] # heap index -> handle
+        self._pos = [] # handle -> heap index, or -1 if not in the heap
+        self._key = [] # handle -> key
+        self._seq = [] # handle -> insertion sequence number
+        self._next_seq = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __contains__(self, handle):
+        return handle < len(self._pos) and self._pos[handle] >= 0
+
+    def key(self, handle):
+        """
+        Returns the key of the given handle, which must be in the heap.
+        """
+        if handle not in self:
+            raise KeyError(handle)
+        return self._key[handle]
+
+    def insert(self, handle, key):
+        """
+        Adds the given handle to the heap with the given key.  Raises
+        ValueError if the handle is already in the heap.
+        """
+        pos = self._pos
+        if handle >= len(pos):
+            grow_by = handle + 1 - len(pos)
+            pos.extend([-1] * grow_by)
+            self._key.extend([None] * grow_by)
+            self._seq.extend([0] * grow_by)
+        elif pos[handle] >= 0:
+            raise ValueError("handle {} is already in the heap".format(handle))
+        self._key[handle] = key
+        self._seq[handle] = self._next_seq
+        self._next_seq += 1
+        index = len(self._heap)
+        self._heap.append(handle)
+        pos[handle] = index
+        self._up_heapify(index)
+
+    def decrease_key(self, handle, key):
+        """
+        Lowers the key of the given handle, which must be in the heap, to the
+        given key.  Raises ValueError if the new key is larger than the old.
+        """
+        if handle not in self:
+            raise KeyError(handle)
+        if self._key[handle] < key:
+            raise ValueError("new key {!r} is larger than old key {!r}"
+                .format(key, self._key[handle]))
+        self._key[handle] = key
+        self._up_heapify(self._pos[handle])
+
+    def peek_min(self):
+        """
+        Returns a (handle, key) tuple for the handle with the smallest key
+        without removing it.  Raises IndexError if the heap is empty.
+        """
+        handle = self._heap[0]
+        return (handle, self._key[handle])
+
+    def pop_min(self):
+        """
+        Removes the handle with the smallest key and returns a (handle, key)
+        tuple for it.  Raises IndexError if the heap is empty.
+        """
+        heap = self._heap
+        handle = heap[0]
+        last_handle = heap.pop()
+        self._pos[handle] = -1
+        if heap:
+            heap[0] = last_handle
+            self._pos[last_handle] = 0
+            self._down_heapify(0)
+        return (handle, self._key[handle])
+
+    def _less(self, handle1, handle2):
+        key1 = self._key[handle1]
+        key2 = self._key[handle2]
+        if key1 < key2:
+            return True
+        elif key2 < key1:
+            return False
+        return self._seq[handle1] < self._seq[handle2]
+
+    def _up_heapify(self, index):
+        # move the "hole" up instead of swapping at every level
+        heap = self._heap
+        pos = self._pos
+        arity = self.arity
+        handle = heap[index]
+        while index > 0:
+            parent_index = (index - 1) // arity
+            parent_handle = heap[parent_index]
+            if not self._less(handle, parent_handle):
+                break # heap property is satisfied
+            heap[index] = parent_handle
+            pos[parent_handle] = index
+            index = parent_index
+        heap[index] = handle
+        pos[handle] = index
+
+    def _down_heapify(self, index):
+        heap = self._heap
+        pos = self._pos
+        arity = self.arity
+        size = len(heap)
+        handle = heap[index]
+        while True:
+            first_child_index = (index * arity) + 1
+            if first_child_index >= size:
+                break # we are a leaf node
+            # find the smallest child
+            child_index = first_child_index
+            end_child_index = min(first_child_index + arity, size)
+            for sibling_index in xrange(first_child_index + 1, end_child_index):
+                if self._less(heap[sibling_index], heap[child_index]):
+                    child_index = sibling_index
+            child_handle = heap[child_index]
+            if not self._less(child_handle, handle):
+                break # heap property is satisfied
+            heap[index] = child_handle
+            pos[child_handle] = index
+            index = child_index
+        heap[index] = handle
+        pos[handle] = index
+
+
+class PairingHeap(object):
+    """
+    A pairing heap of integer handles, each of which has a key.
+
+    This has the same interface as IndexedHeap and can be used in its place.
+    insert() and decrease_key() are O(1), which makes it a good fit for
+    searches that perform many more decreases than removals; pop_min() is
+    O(log n) amortized.  The tree is stored as parallel lists of child,
+    sibling and previous (parent or left sibling) handles.
+    """
+
+    def __init__(self):
+        self._root = -1
+        self._size = 0
+        self._in_heap = [] # handle -> True if the handle is in the heap
+        self._child = [] # handle -> leftmost child, or -1
+        self._sibling = [] # handle -> right sibling, or -1
+        self._prev = [] # handle -> parent if leftmost child else left sibling
+        self._key = [] # handle -> key
+        self._seq = [] # handle -> insertion sequence number
+        self._next_seq = 0
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, handle):
+        return handle < len(self._in_heap) and self._in_heap[handle]
+
+    def key(self, handle):
+        """
+        Returns the key of the given handle, which must be in the heap.
+        """
+        if handle not in self:
+            raise KeyError(handle)
+        return self._key[handle]
+
+    def insert(self, handle, key):
+        """
+        Adds the given handle to the heap with the given key.  Raises
+        ValueError if the handle is already in the heap.
+        """
+        in_heap = self._in_heap
+        if handle >= len(in_heap):
+            grow_by = handle + 1 - len(in_heap)
+            in_heap.extend([False] * grow_by)
+            self._child.extend([-1] * grow_by)
+            self._sibling.extend([-1] * grow_by)
+            self._prev.extend([-1] * grow_by)
+            self._key.extend([None] * grow_by)
+            self._seq.extend([0] * grow_by)
+        elif in_heap[handle]:
+            raise ValueError("handle {} is already in the heap".format(handle))
+        in_heap[handle] = True
+        self._child[handle] = -1
+        self._sibling[handle] = -1
+        self._prev[handle] = -1
+        self._key[handle] = key
+        self._seq[handle] = self._next_seq
+        self._next_seq += 1
+        self._size += 1
+        self._root = self._meld(self._root, handle)
+
+    def decrease_key(self, handle, key):
+        """
+        Lowers the key of the given handle, which must be in the heap, to the
+        given key.  Raises ValueError if the new key is larger than the old.
+        """
+        if handle not in self:
+            raise KeyError(handle)
+        if self._key[handle] < key:
+            raise ValueError("new key {!r} is larger than old key {!r}"
+                .format(key, self._key[handle]))
+        self._key[handle] = key
+        if handle == self._root:
+            return
+
+        # cut the subtree rooted at handle out of its sibling list, then meld
+        # it back in at the root
+        prev = self._prev[handle]
+        sibling = self._sibling[handle]
+        if self._child[prev] == handle:
+            self._child[prev] = sibling
+        else:
+            self._sibling[prev] = sibling
+        if sibling >= 0:
+            self._prev[sibling] = prev
+        self._sibling[handle] = -1
+        self._prev[handle] = -1
+        self._root = self._meld(self._root, handle)
+
+    def peek_min(self):
+        """
+        Returns a (handle, key) tuple for the handle with the smallest key
+        without removing it.  Raises IndexError if the heap is empty.
+        """
+        if self._root < 0:
+            raise IndexError("peek from an empty heap")
+        return (self._root, self._key[self._root])
+
+    def pop_min(self):
+        """
+        Removes the handle with the smallest key and returns a (handle, key)
+        tuple for it.  Raises IndexError if the heap is empty.
+        """
+        handle = self._root
+        if handle < 0:
+            raise IndexError("pop from an empty heap")
+        self._in_heap[handle] = False
+        self._size -= 1
+
+        # detach the children of the old root
+        sibling_list = self._sibling
+        children = []
+        child = self._child[handle]
+        while child >= 0:
+            next_child = sibling_list[child]
+            sibling_list[child] = -1
+            self._prev[child] = -1
+            children.append(child)
+            child = next_child
+        self._child[handle] = -1
+
+        # two-pass pairing: meld pairs from left to right, then meld the
+        # results from right to left
+        paired = []
+        for i in xrange(0, len(children) - 1, 2):
+            paired.append(self._meld(children[i], children[i + 1]))
+        if len(children) % 2 == 1:
+            paired.append(children[-1])
+        root = -1
+        for subtree in reversed(paired):
+            root = self._meld(root, subtree)
+        self._root = root
+
+        return (handle, self._key[handle])
+
+    def _less(self, handle1, handle2):
+        key1 = self._key[handle1]
+        key2 = self._key[handle2]
+        if key1 < key2:
+            return True
+        elif key2 < key1:
+            return False
+        return self._seq[handle1] < self._seq[handle2]
+
+    def _meld(self, handle1, handle2):
+        # both handles must be roots of their own trees; returns the new root
+        if handle1 < 0:
+            return handle2
+        elif handle2 < 0:
+            return handle1
+        if self._less(handle2, handle1):
+            (handle1, handle2) = (handle2, handle1)
+        child = self._child[handle1]
+        self._sibling[handle2] = child
+        if child >= 0:
+            self._prev[child] = handle2
+        self._child[handle1] = handle2
+        self._prev[handle2] = handle1
+        return handle1
+
+
+class BucketQueue(object):
+    """
+    A monotone priority queue of integer handles with integer keys, using a
+    circular array of buckets (Dial's algorithm).
+
+    This has the same interface as IndexedHeap, but every key that is
+    inserted must be at least the last key popped and at most *max_step*
+    more than it.  That always holds in Dijkstra's algorithm when the edge
+    weights are integers between 0 and *max_step*, and then every operation
+    is O(1) apart from skipping over empty buckets, for O(m + n*C) overall.
+    """
+
+    def __init__(self, max_step):
+        if max_step < 0:
+            raise ValueError("invalid max_step: {}".format(max_step))
+        self.max_step = max_step
+        self._buckets = [set() for _ in xrange(max_step + 1)]
+        self._key = [] # handle -> key, or None if not in the queue
+        self._cur_key = 0 # no key in the queue is smaller than this
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, handle):
+        return handle < len(self._key) and self._key[handle] is not None
+
+    def key(self, handle):
+        """
+        Returns the key of the given handle, which must be in the queue.
+        """
+        if handle not in self:
+            raise KeyError(handle)
+        return self._key[handle]
+
+    def insert(self, handle, key):
+        """
+        Adds the given handle to the queue with the given key.  Raises
+        ValueError if the handle is already in the queue or if the key is
+        out of the range of keys that the queue can currently hold.
+        """
+        keys = self._key
+        if handle >= len(keys):
+            keys.extend([None] * (handle + 1 - len(keys)))
+        elif keys[handle] is not None:
+            raise ValueError("handle {} is already in the queue".format(handle))
+        self._check_key(key)
+        keys[handle] = key
+        self._buckets[key % len(self._buckets)].add(handle)
+        self._size += 1
+
+    def decrease_key(self, handle, key):
+        """
+        Lowers the key of the given handle, which must be in the queue, to
+        the given key.  Raises ValueError if the new key is larger than the
+        old or smaller than the last key popped.
+        """
+        if handle not in self:
+            raise KeyError(handle)
+        old_key = self._key[handle]
+        if old_key < key:
+            raise ValueError("new key {!r} is larger than old key {!r}"
+                .format(key, old_key))
+        self._check_key(key)
+        num_buckets = len(self._buckets)
+        self._buckets[old_key % num_buckets].discard(handle)
+        self._buckets[key % num_buckets].add(handle)
+        self._key[handle] = key
+
+    def pop_min(self):
+        """
+        Removes the handle with the smallest key and returns a (handle, key)
+        tuple for it.  Raises IndexError if the queue is empty.
+        """
+        if self._size == 0:
+            raise IndexError("pop from an empty queue")
+        buckets = self._buckets
+        num_buckets = len(buckets)
+        cur_key = self._cur_key
+        while not buckets[cur_key % num_buckets]:
+            cur_key += 1
+        self._cur_key = cur_key
+        handle = buckets[cur_key % num_buckets].pop()
+        self._key[handle] = None
+        self._size -= 1
+        return (handle, cur_key)
+
+    def _check_key(self, key):
+        if key < self._cur_key or key > self._cur_key + self.max_step:
+            raise ValueError("key {!r} is outside of [{}, {}]".format(key,
+                self._cur_key, self._cur_key + self.max_step))
+
+
+class RadixHeap(object):
+    """
+    A monotone priority queue of integer handles with non-negative integer
+    keys (a radix heap).
+
+    This has the same interface as IndexedHeap, but every key that is
+    inserted must be at least the last key popped, as is always the case in
+    Dijkstra's algorithm with non-negative integer edge weights.  Handles are
+    kept in buckets by the highest bit in which their key differs from the
+    last key popped, so each handle moves down at most log(C) times and the
+    search is O(m + n*log(C)), where C is the largest edge weight.
+    """
+
+    def __init__(self):
+        self._buckets = [set()] # bit length of (key ^ last key) -> handles
+        self._key = [] # handle -> key, or None if not in the heap
+        self._last_key = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, handle):
+        return handle < len(self._key) and self._key[handle] is not None
+
+    def key(self, handle):
+        """
+        Returns the key of the given handle, which must be in the heap.
+        """
+        if handle not in self:
+            raise KeyError(handle)
+        return self._key[handle]
+
+    def insert(self, handle, key):
+        """
+        Adds the given handle to the heap with the given key.  Raises
+        ValueError if the handle is already in the heap or if the key is
+        smaller than the last key popped.
+        """
+        keys = self._key
+        if handle >= len(keys):
+            keys.extend([None] * (handle + 1 - len(keys)))
+        elif keys[handle] is not None:
+            raise ValueError("handle {} is already in the heap".format(handle))
+        self._check_key(key)
+        keys[handle] = key
+        self._bucket(key).add(handle)
+        self._size += 1
+
+    def decrease_key(self, handle, key):
+        """
+        Lowers the key of the given handle, which must be in the heap, to the
+        given key.  Raises ValueError if the new key is larger than the old
+        or smaller than the last key popped.
+        """
+        if handle not in self:
+            raise KeyError(handle)
+        old_key = self._key[handle]
+        if old_key < key:
+            raise ValueError("new key {!r} is larger than old key {!r}"
+                .format(key, old_key))
+        self._check_key(key)
+        self._bucket(old_key).discard(handle)
+        self._bucket(key).add(handle)
+        self._key[handle] = key
+
+    def pop_min(self):
+        """
+        Removes the handle with the smallest key and returns a (handle, key)
+        tuple for it.  Raises IndexError if the heap is empty.
+        """
+        if self._size == 0:
+            raise IndexError("pop from an empty heap")
+        buckets = self._buckets
+        if not buckets[0]:
+            # find the first non-empty bucket, make its smallest key the new
+            # last key and redistribute its handles into the lower buckets
+            index = 1
+            while not buckets[index]:
+                index += 1
+            handles = buckets[index]
+            buckets[index] = set()
+            keys = self._key
+            self._last_key = min(keys[handle] for handle in handles)
+            for handle in handles:
+                self._bucket(keys[handle]).add(handle)
+        handle = buckets[0].pop()
+        self._key[handle] = None
+        self._size -= 1
+        return (handle, self._last_key)
+
+    def _bucket(self, key):
+        index = (key ^ self._last_key).bit_length()
+        buckets = self._buckets
+        while index >= len(buckets):
+            buckets.append(set())
+        return buckets[index]
+
+    def _check_key(self, key):
+        if key < self._last_key:
+            raise ValueError("key {!r} is smaller than the last key popped, {!r}"
+                .format(key, self._last_key))
+
+
 def _test_location(heap, location):
     for n, i in location.items():
         assert heap[i] == n
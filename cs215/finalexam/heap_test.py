@@ -0,0 +1,221 @@
+import random
+import unittest
+from cs215.finalexam.heap import BucketQueue
+from cs215.finalexam.heap import IndexedHeap
+from cs215.finalexam.heap import PairingHeap
+from cs215.finalexam.heap import RadixHeap
+
+class PriorityQueueTests(object):
+
+    def test_EmptyHeap(self):
+        heap = self.make_heap()
+        self.assertEqual(len(heap), 0)
+        self.assertNotIn(0, heap)
+        self.assertRaises(IndexError, heap.pop_min)
+
+    def test_InsertAndPopOneHandle(self):
+        heap = self.make_heap()
+        heap.insert(5, 1.5)
+        self.assertEqual(len(heap), 1)
+        self.assertIn(5, heap)
+        self.assertEqual(heap.key(5), 1.5)
+        self.assertEqual(heap.pop_min(), (5, 1.5))
+        self.assertEqual(len(heap), 0)
+        self.assertNotIn(5, heap)
+
+    def test_PopsInKeyOrder(self):
+        keys = [8, 3, 9, 1, 4, 7, 2, 6, 5, 0]
+        heap = self.make_heap()
+        for (handle, key) in enumerate(keys):
+            heap.insert(handle, key)
+        popped = [heap.pop_min()[1] for _ in keys]
+        self.assertListEqual(popped, sorted(keys))
+
+    def test_EqualKeysPopInInsertionOrder(self):
+        heap = self.make_heap()
+        for handle in (4, 2, 7, 0):
+            heap.insert(handle, 1)
+        popped = [heap.pop_min()[0] for _ in range(4)]
+        self.assertListEqual(popped, [4, 2, 7, 0])
+
+    def test_EqualKeysNeverCompareHandlesOrPayloads(self):
+        # keys that cannot be ordered against each other beyond equality
+        heap = self.make_heap()
+        heap.insert(0, (1, None))
+        heap.insert(1, (1, None))
+        self.assertEqual(heap.pop_min()[0], 0)
+
+    def test_DecreaseKey(self):
+        heap = self.make_heap()
+        heap.insert(0, 10)
+        heap.insert(1, 20)
+        heap.insert(2, 30)
+        heap.decrease_key(2, 5)
+        self.assertEqual(heap.key(2), 5)
+        self.assertEqual(heap.pop_min(), (2, 5))
+        self.assertEqual(heap.pop_min(), (0, 10))
+
+    def test_DecreaseKeyToLargerKeyRaises(self):
+        heap = self.make_heap()
+        heap.insert(0, 10)
+        self.assertRaises(ValueError, heap.decrease_key, 0, 11)
+
+    def test_DecreaseKeyOfMissingHandleRaises(self):
+        heap = self.make_heap()
+        heap.insert(0, 10)
+        heap.pop_min()
+        self.assertRaises(KeyError, heap.decrease_key, 0, 1)
+
+    def test_InsertDuplicateHandleRaises(self):
+        heap = self.make_heap()
+        heap.insert(3, 10)
+        self.assertRaises(ValueError, heap.insert, 3, 1)
+
+    def test_HandleCanBeReinsertedAfterPop(self):
+        heap = self.make_heap()
+        heap.insert(3, 10)
+        heap.pop_min()
+        heap.insert(3, 1)
+        self.assertEqual(heap.pop_min(), (3, 1))
+
+    def test_RandomOperations(self):
+        rng = random.Random(1234)
+        heap = self.make_heap()
+        expected = {}
+        for _ in range(2000):
+            op = rng.random()
+            if op < 0.5:
+                handle = rng.randrange(200)
+                if handle not in expected:
+                    key = rng.randrange(1000)
+                    heap.insert(handle, key)
+                    expected[handle] = key
+            elif op < 0.8 and expected:
+                handle = rng.choice(list(expected))
+                key = expected[handle] - rng.randrange(50)
+                heap.decrease_key(handle, key)
+                expected[handle] = key
+            elif expected:
+                (handle, key) = heap.pop_min()
+                self.assertEqual(key, min(expected.itervalues()))
+                self.assertEqual(expected.pop(handle), key)
+            self.assertEqual(len(heap), len(expected))
+
+    def test_PopAfterManyDecreases(self):
+        heap = self.make_heap()
+        for handle in range(20):
+            heap.insert(handle, 100 + handle)
+        for handle in range(19, -1, -1):
+            heap.decrease_key(handle, handle)
+        popped = [heap.pop_min()[0] for _ in range(20)]
+        self.assertListEqual(popped, range(20))
+
+class IndexedHeapTest(PriorityQueueTests, unittest.TestCase):
+
+    def make_heap(self):
+        return IndexedHeap()
+
+    def test_InvalidArityRaises(self):
+        self.assertRaises(ValueError, IndexedHeap, 1)
+
+class FourAryIndexedHeapTest(PriorityQueueTests, unittest.TestCase):
+
+    def make_heap(self):
+        return IndexedHeap(4)
+
+class EightAryIndexedHeapTest(PriorityQueueTests, unittest.TestCase):
+
+    def make_heap(self):
+        return IndexedHeap(8)
+
+class PairingHeapTest(PriorityQueueTests, unittest.TestCase):
+
+    def make_heap(self):
+        return PairingHeap()
+
+class MonotoneQueueTests(object):
+
+    def test_EmptyQueue(self):
+        queue = self.make_queue()
+        self.assertEqual(len(queue), 0)
+        self.assertNotIn(0, queue)
+        self.assertRaises(IndexError, queue.pop_min)
+
+    def test_PopsInKeyOrder(self):
+        keys = [8, 3, 9, 1, 4, 7, 2, 6, 5, 0, 3]
+        queue = self.make_queue()
+        for (handle, key) in enumerate(keys):
+            queue.insert(handle, key)
+        popped = [queue.pop_min() for _ in keys]
+        self.assertListEqual([x[1] for x in popped], sorted(keys))
+        for (handle, key) in popped:
+            self.assertEqual(keys[handle], key)
+
+    def test_DecreaseKey(self):
+        queue = self.make_queue()
+        queue.insert(0, 4)
+        queue.insert(1, 8)
+        queue.decrease_key(1, 2)
+        self.assertEqual(queue.key(1), 2)
+        self.assertEqual(queue.pop_min(), (1, 2))
+        self.assertEqual(queue.pop_min(), (0, 4))
+        self.assertNotIn(0, queue)
+
+    def test_DecreaseKeyToLargerKeyRaises(self):
+        queue = self.make_queue()
+        queue.insert(0, 4)
+        self.assertRaises(ValueError, queue.decrease_key, 0, 5)
+
+    def test_InsertBelowLastPoppedKeyRaises(self):
+        queue = self.make_queue()
+        queue.insert(0, 4)
+        queue.pop_min()
+        self.assertRaises(ValueError, queue.insert, 1, 3)
+
+    def test_InsertDuplicateHandleRaises(self):
+        queue = self.make_queue()
+        queue.insert(0, 4)
+        self.assertRaises(ValueError, queue.insert, 0, 5)
+
+    def test_RandomMonotoneOperations(self):
+        rng = random.Random(4321)
+        queue = self.make_queue()
+        expected = {}
+        last_key = 0
+        for _ in range(2000):
+            op = rng.random()
+            if op < 0.5:
+                handle = rng.randrange(200)
+                if handle not in expected:
+                    key = last_key + rng.randrange(self.MAX_STEP + 1)
+                    queue.insert(handle, key)
+                    expected[handle] = key
+            elif op < 0.7 and expected:
+                handle = rng.choice(list(expected))
+                key = rng.randrange(last_key, expected[handle] + 1)
+                queue.decrease_key(handle, key)
+                expected[handle] = key
+            elif expected:
+                (handle, key) = queue.pop_min()
+                self.assertEqual(key, min(expected.itervalues()))
+                self.assertEqual(expected.pop(handle), key)
+                last_key = key
+            self.assertEqual(len(queue), len(expected))
+
+class BucketQueueTest(MonotoneQueueTests, unittest.TestCase):
+
+    MAX_STEP = 10
+
+    def make_queue(self):
+        return BucketQueue(self.MAX_STEP)
+
+    def test_InsertBeyondMaxStepRaises(self):
+        queue = self.make_queue()
+        self.assertRaises(ValueError, queue.insert, 0, self.MAX_STEP + 1)
+
+class RadixHeapTest(MonotoneQueueTests, unittest.TestCase):
+
+    MAX_STEP = 100000
+
+    def make_queue(self):
+        return RadixHeap()
@@ -0,0 +1,878 @@
+#
+# Single-source shortest path searches that are shared by the final exam
+# problems and the units that need them.
+#
+
+import array
+import heapq
+import itertools
+import multiprocessing
+import operator
+
+from cs215.finalexam.heap import BucketQueue
+from cs215.finalexam.heap import IndexedHeap
+from cs215.finalexam.heap import RadixHeap
+
+def add_keys(keys1, keys2):
+    """
+    Returns the element-wise sum of two equally long tuples.
+    """
+    return tuple(map(operator.add, keys1, keys2))
+
+def path_to(final_dist, node):
+    """
+    Returns the path, a list of nodes, from the source of the search that
+    returned *final_dist* to the given node, or None if the node was not
+    reached.
+    """
+    if node not in final_dist:
+        return None
+    path = [node]
+    parent = final_dist[node][1]
+    while parent is not None:
+        path.append(parent)
+        parent = final_dist[parent][1]
+    path.reverse()
+    return path
+
+class PathAlgebra(object):
+    """
+    How the weights along a path make up its length, for algebraic_dijkstra().
+
+    combine(length, weight) returns the length of a path extended by an edge
+    of the given weight, and *identity* is the length of the empty path.  The
+    best path is the one whose key(length) is smallest, or whose length is
+    smallest if *key* is None.  For Dijkstra's algorithm to be right,
+    extending a path must never make its key smaller.
+    """
+
+    def __init__(self, combine, identity, key=None):
+        self.combine = combine
+        self.identity = identity
+        self.key = key
+
+# the usual sum of the weights
+SHORTEST = PathAlgebra(operator.add, 0)
+
+# the largest weight on the path, smallest first, for non-negative weights
+BOTTLENECK = PathAlgebra(max, 0.0)
+
+# the product of probabilities on the path, largest first
+MOST_PROBABLE = PathAlgebra(operator.mul, 1.0, operator.neg)
+
+def lexicographic_algebra(num_keys):
+    """
+    Returns the PathAlgebra for edge weights that are tuples of *num_keys*
+    non-negative numbers, such as (cost, duration), where the length of a
+    path is the element-wise sum of its weights and lengths are compared
+    lexicographically: the first key decides, the second breaks ties in the
+    first, and so on.
+    """
+    return PathAlgebra(add_keys, (0,) * num_keys)
+
+class CompactGraph(object):
+    """
+    A read-only copy of a graph, like the dict of dicts that the searches
+    above take, in compressed sparse row form.
+
+    The nodes are numbered from 0 to n-1 in the order of *nodes*, and the
+    edges out of node i go to targets[offsets[i]:offsets[i+1]] with the
+    corresponding weights.  The offsets and targets are arrays of integers;
+    the weights are a list, so that they can be of any type.
+
+    If *shared* is true the three are multiprocessing RawArrays instead, and
+    the weights must be numbers, so that processes forked after the graph is
+    built share their memory instead of each getting a copy of it.
+    """
+
+    def __init__(self, graph, shared=False):
+        self.nodes = list(graph)
+        self.handles = {node:handle for (handle, node) in enumerate(self.nodes)}
+        self.offsets = array.array("l", [0])
+        self.targets = array.array("l")
+        self.weights = []
+        handles = self.handles
+        for node in self.nodes:
+            for (adjacent_node, weight) in graph[node].iteritems():
+                self.targets.append(handles[adjacent_node])
+                self.weights.append(weight)
+            self.offsets.append(len(self.targets))
+        if shared:
+            self.offsets = multiprocessing.RawArray("l", self.offsets)
+            self.targets = multiprocessing.RawArray("l", self.targets)
+            self.weights = multiprocessing.RawArray("d", self.weights)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, node):
+        return node in self.handles
+
+    def reversed(self):
+        """
+        Returns a CompactGraph with the same nodes and handles as this one
+        but with every edge turned around, for searching backwards.
+        """
+        num_nodes = len(self.nodes)
+        offsets = array.array("l", [0]) * (num_nodes + 1)
+        for x in self.targets:
+            offsets[x + 1] += 1
+        for handle in xrange(num_nodes):
+            offsets[handle + 1] += offsets[handle]
+        targets = array.array("l", self.targets)
+        weights = [None] * len(self.weights)
+        next_edges = array.array("l", offsets)
+        for handle in xrange(num_nodes):
+            for edge in xrange(self.offsets[handle], self.offsets[handle + 1]):
+                x = self.targets[edge]
+                reverse_edge = next_edges[x]
+                next_edges[x] += 1
+                targets[reverse_edge] = handle
+                weights[reverse_edge] = self.weights[edge]
+
+        reverse_graph = CompactGraph({})
+        reverse_graph.nodes = self.nodes
+        reverse_graph.handles = self.handles
+        reverse_graph.offsets = offsets
+        reverse_graph.targets = targets
+        reverse_graph.weights = weights
+        return reverse_graph
+
+def algebraic_dijkstra(graph, a, algebra=SHORTEST, target=None,
+        make_queue=IndexedHeap):
+    """
+    Dijkstra's algorithm for any PathAlgebra, with a priority queue of
+    integer node handles made by calling *make_queue* with no arguments.
+    The default IndexedHeap takes any keys; for SHORTEST on non-negative
+    integer weights a RadixHeap, or a BucketQueue that is given the largest
+    weight (Dial's algorithm), avoids the log(n) of a heap.
+
+    *graph* is either a CompactGraph, whose arrays the inner loop reads
+    directly, or anything that maps nodes to dicts mapping adjacent nodes to
+    the weight of the edge to them, such as a dict of dicts.  In the latter
+    case nodes are given handles as they are discovered, and graph[node] is
+    looked up exactly once for each node, when it is settled, so the graph
+    can generate its edges as the search goes.
+
+    Returns a dict mapping each node that was settled to a tuple whose values
+    are the length of the best path to that node and its parent (None for
+    *a*).  If *target* is given, the search stops as soon as the target has
+    been settled.
+    """
+    combine = algebra.combine
+    key = algebra.key
+    compact = isinstance(graph, CompactGraph)
+    if compact:
+        nodes = graph.nodes
+        handles = graph.handles
+        offsets = graph.offsets
+        targets = graph.targets
+        weights = graph.weights
+        lengths = [None] * len(nodes)
+        parents = [-1] * len(nodes)
+        settled = bytearray(len(nodes))
+    else:
+        nodes = [a]
+        handles = {a:0}
+        lengths = [None]
+        parents = [-1]
+        settled = bytearray(1)
+
+    # nodes are only compared with the target by handle, so that their
+    # __eq__ is never called, and never with None
+    target_handle = handles.get(target, -1) if target is not None else -1
+    queue = make_queue()
+    handle = handles[a]
+    lengths[handle] = algebra.identity
+    queue.insert(handle, algebra.identity if key is None else
+        key(algebra.identity))
+    settled_handles = []
+    while queue:
+        (handle, unused_key) = queue.pop_min()
+        # lock it down!
+        settled[handle] = 1
+        settled_handles.append(handle)
+        if handle == target_handle:
+            break
+        if compact:
+            start = offsets[handle]
+            end = offsets[handle + 1]
+            edges = itertools.izip(targets[start:end], weights[start:end])
+        else:
+            edges = []
+            for (x, weight) in graph[nodes[handle]].iteritems():
+                x_handle = handles.get(x)
+                if x_handle is None:
+                    x_handle = len(nodes)
+                    handles[x] = x_handle
+                    if target is not None and x == target:
+                        target_handle = x_handle
+                    nodes.append(x)
+                    lengths.append(None)
+                    parents.append(-1)
+                    settled.append(0)
+                edges.append((x_handle, weight))
+
+        length = lengths[handle]
+        for (x, weight) in edges:
+            if settled[x]:
+                continue
+            new_length = combine(length, weight)
+            new_key = new_length if key is None else key(new_length)
+            if lengths[x] is None:
+                lengths[x] = new_length
+                parents[x] = handle
+                queue.insert(x, new_key)
+            elif new_key < queue.key(x):
+                lengths[x] = new_length
+                parents[x] = handle
+                queue.decrease_key(x, new_key)
+
+    final_dist = {}
+    for handle in settled_handles:
+        parent = parents[handle]
+        final_dist[nodes[handle]] = (lengths[handle],
+            nodes[parent] if parent >= 0 else None)
+    return final_dist
+
+def bidirectional_dijkstra(graph, a, b, algebra=SHORTEST, reverse_graph=None):
+    """
+    Finds the best path from *a* to *b* in a CompactGraph by searching
+    forwards from *a* and, over *reverse_graph* (by default
+    graph.reversed()), backwards from *b*, one step at a time on whichever
+    side has fewer nodes waiting, and stopping once the two frontiers
+    combined cannot beat the best path found where they meet.
+
+    The lengths of the two halves of a path are joined with the algebra's
+    combine(), so the lengths must be of the same kind as the weights, and
+    combine() must never make a length better, as for SHORTEST, BOTTLENECK,
+    MOST_PROBABLE and lexicographic_algebra().
+
+    Returns a tuple whose values are the length of the path, the path as a
+    list of nodes, and the number of nodes settled by both searches; the
+    first two are None if there is no path.
+    """
+    if reverse_graph is None:
+        reverse_graph = graph.reversed()
+    combine = algebra.combine
+    key = algebra.key
+    if key is None:
+        key = lambda length: length
+    num_nodes = len(graph)
+    source = graph.handles[a]
+    target = graph.handles[b]
+    if source == target:
+        return (algebra.identity, [a], 1)
+
+    # index 0 is the forward search from a and index 1 the backward one
+    # from b
+    searches = []
+    for (search_graph, handle) in [(graph, source), (reverse_graph, target)]:
+        lengths = [None] * num_nodes
+        lengths[handle] = algebra.identity
+        parents = [-1] * num_nodes
+        heap = IndexedHeap()
+        heap.insert(handle, key(algebra.identity))
+        searches.append((search_graph, lengths, parents, bytearray(num_nodes),
+            heap))
+
+    best_length = None
+    best_key = None
+    meeting_handle = -1
+    num_settled = 0
+    forward_heap = searches[0][4]
+    backward_heap = searches[1][4]
+    while forward_heap and backward_heap:
+        if best_length is not None:
+            frontier_length = combine(
+                searches[0][1][forward_heap.peek_min()[0]],
+                searches[1][1][backward_heap.peek_min()[0]])
+            if not key(frontier_length) < best_key:
+                break
+
+        side = 0 if len(forward_heap) <= len(backward_heap) else 1
+        (search_graph, lengths, parents, settled, heap) = searches[side]
+        other_lengths = searches[1 - side][1]
+        (handle, unused_key) = heap.pop_min()
+        # lock it down!
+        settled[handle] = 1
+        num_settled += 1
+        length = lengths[handle]
+        offsets = search_graph.offsets
+        targets = search_graph.targets
+        weights = search_graph.weights
+        for edge in xrange(offsets[handle], offsets[handle + 1]):
+            x = targets[edge]
+            if settled[x]:
+                continue
+            new_length = combine(length, weights[edge])
+            new_key = key(new_length)
+            if lengths[x] is None:
+                heap.insert(x, new_key)
+            elif new_key < heap.key(x):
+                heap.decrease_key(x, new_key)
+            else:
+                continue
+            lengths[x] = new_length
+            parents[x] = handle
+            if other_lengths[x] is not None:
+                # the two searches meet at x
+                if side == 0:
+                    path_length = combine(new_length, other_lengths[x])
+                else:
+                    path_length = combine(other_lengths[x], new_length)
+                path_key = key(path_length)
+                if best_length is None or path_key < best_key:
+                    best_length = path_length
+                    best_key = path_key
+                    meeting_handle = x
+
+    if best_length is None:
+        return (None, None, num_settled)
+    nodes = graph.nodes
+    path = []
+    handle = meeting_handle
+    while handle >= 0:
+        path.append(nodes[handle])
+        handle = searches[0][2][handle]
+    path.reverse()
+    handle = searches[1][2][meeting_handle]
+    while handle >= 0:
+        path.append(nodes[handle])
+        handle = searches[1][2][handle]
+    return (best_length, path, num_settled)
+
+def k_best_paths(graph, a, b, algebra=SHORTEST, reverse_graph=None):
+    """
+    Generates the loopless paths from *a* to *b* in a CompactGraph, best
+    first, as (length, path) tuples where the path is a list of nodes, for
+    as long as the caller keeps asking; see itertools.islice() to take the
+    best k.
+
+    This is Yen's algorithm with Lawler's change: each path found is the
+    parent of new candidates, one for each node from where it left its own
+    parent onwards, made of the path up to that node (the root) and the best
+    spur from that node to *b* that avoids the rest of the root and the
+    edges out of the root taken by the paths already found.  All the
+    candidates wait in one heap.  The spur searches are A* searches guided
+    by one backward search from *b* over *reverse_graph* (by default
+    graph.reversed()), whose lengths are the best possible without the
+    avoided nodes and edges, so each spur search mostly walks straight down
+    that tree instead of exploring the whole graph again.
+
+    The lengths are joined with the algebra's combine() as in
+    bidirectional_dijkstra(), with the same requirements.
+    """
+    if reverse_graph is None:
+        reverse_graph = graph.reversed()
+    combine = algebra.combine
+    key = algebra.key
+    if key is None:
+        key = lambda length: length
+    offsets = graph.offsets
+    targets = graph.targets
+    weights = graph.weights
+    source = graph.handles[a]
+    target = graph.handles[b]
+
+    # the best lengths to b, and the next node on the way there
+    to_target = [None] * len(graph)
+    next_handles = [-1] * len(graph)
+    for (node, (length, parent)) in algebraic_dijkstra(reverse_graph, b,
+            algebra).iteritems():
+        handle = graph.handles[node]
+        to_target[handle] = length
+        if parent is not None:
+            next_handles[handle] = graph.handles[parent]
+    if to_target[source] is None:
+        return
+
+    # edge index -> the handle that the edge leaves
+    edge_sources = array.array("l", [0]) * len(targets)
+    for handle in xrange(len(graph)):
+        for edge in xrange(offsets[handle], offsets[handle + 1]):
+            edge_sources[edge] = handle
+
+    def edge_between(handle, next_handle):
+        # the best edge from handle to next_handle
+        best_edge = None
+        for edge in xrange(offsets[handle], offsets[handle + 1]):
+            if targets[edge] == next_handle and (best_edge is None or
+                    key(weights[edge]) < key(weights[best_edge])):
+                best_edge = edge
+        return best_edge
+
+    def spur_search(spur, blocked_handles, blocked_edges):
+        # returns the edges of the best path from spur to the target that
+        # avoids the blocked handles and edges, or None
+        lengths = {spur:algebra.identity}
+        parent_edges = {spur:None}
+        settled = set()
+        heap = IndexedHeap()
+        heap.insert(spur, key(combine(algebra.identity, to_target[spur])))
+        while heap:
+            (handle, unused_key) = heap.pop_min()
+            if handle == target:
+                edges = []
+                while parent_edges[handle] is not None:
+                    edge = parent_edges[handle]
+                    edges.append(edge)
+                    handle = edge_sources[edge]
+                edges.reverse()
+                return edges
+            settled.add(handle)
+            length = lengths[handle]
+            for edge in xrange(offsets[handle], offsets[handle + 1]):
+                x = targets[edge]
+                if (x in settled or blocked_handles[x] or
+                        to_target[x] is None or edge in blocked_edges):
+                    continue
+                new_length = combine(length, weights[edge])
+                new_key = key(combine(new_length, to_target[x]))
+                if x not in lengths:
+                    heap.insert(x, new_key)
+                elif new_key < heap.key(x):
+                    heap.decrease_key(x, new_key)
+                else:
+                    continue
+                lengths[x] = new_length
+                parent_edges[x] = edge
+        return None
+
+    # the first path follows the backward search tree
+    first_edges = []
+    handle = source
+    while handle != target:
+        first_edges.append(edge_between(handle, next_handles[handle]))
+        handle = next_handles[handle]
+
+    # a path is a tuple of its edges; candidates are (key, sequence number,
+    # length, edges, deviation) tuples, where deviation is the index of the
+    # node at which the path left its parent
+    found = []
+    seen = set([tuple(first_edges)])
+    candidates = [(key(to_target[source]), 0, to_target[source],
+        tuple(first_edges), 0)]
+    blocked_handles = bytearray(len(graph))
+    num_candidates = 1
+    while candidates:
+        (unused_key, unused_seq, length, edges, deviation) = heapq.heappop(
+            candidates)
+        found.append(edges)
+        nodes = [a] + [graph.nodes[targets[edge]] for edge in edges]
+        yield (length, nodes)
+
+        # the lengths of the roots, by the index of their last node
+        root_lengths = [algebra.identity]
+        for edge in edges:
+            root_lengths.append(combine(root_lengths[-1], weights[edge]))
+        for i in xrange(deviation, len(edges)):
+            spur = edge_sources[edges[i]]
+            root = edges[:i]
+            blocked_edges = set(path[i] for path in found
+                if len(path) > i and path[:i] == root)
+            for edge in root:
+                blocked_handles[edge_sources[edge]] = 1
+            spur_edges = spur_search(spur, blocked_handles, blocked_edges)
+            for edge in root:
+                blocked_handles[edge_sources[edge]] = 0
+            if spur_edges is None:
+                continue
+            path = root + tuple(spur_edges)
+            if path in seen:
+                continue
+            seen.add(path)
+            path_length = root_lengths[i]
+            for edge in spur_edges:
+                path_length = combine(path_length, weights[edge])
+            heapq.heappush(candidates, (key(path_length), num_candidates,
+                path_length, path, i))
+            num_candidates += 1
+
+class DenseGraph(object):
+    """
+    A read-only copy of a graph, like the dict of dicts that the searches
+    above take, as an adjacency matrix for dense_dijkstra().
+
+    The nodes are numbered from 0 to n-1 in the order of *nodes*, and
+    rows[i][j] is the weight of the edge from node i to node j, or NaN if
+    there is no such edge.  Each row is an array of doubles, so the weights
+    must be numbers.
+    """
+
+    def __init__(self, graph):
+        self.nodes = list(graph)
+        self.handles = {node:handle for (handle, node) in enumerate(self.nodes)}
+        no_edges = array.array("d", [float("nan")]) * len(self.nodes)
+        self.rows = []
+        handles = self.handles
+        for node in self.nodes:
+            row = array.array("d", no_edges)
+            for (adjacent_node, weight) in graph[node].iteritems():
+                row[handles[adjacent_node]] = weight
+            self.rows.append(row)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, node):
+        return node in self.handles
+
+def _columns(handles):
+    # like operator.itemgetter(*handles), but always returns a tuple, even
+    # for a single handle
+    if len(handles) == 1:
+        (handle,) = handles
+        return lambda values: (values[handle],)
+    return operator.itemgetter(*handles)
+
+def dense_dijkstra(graph, a, algebra=SHORTEST, target=None):
+    """
+    Dijkstra's algorithm on a DenseGraph for any PathAlgebra whose lengths
+    and keys are numbers, in O(n^2) time without a heap: the keys of the
+    nodes waiting to be settled are kept in a list, with infinity for every
+    other node, so that each step finds the next node to settle with the
+    built-in min() and list.index() rather than a Python loop.  It then
+    relaxes the columns of its row for the nodes that are not settled yet
+    all at once, gathering them with operator.itemgetter() and combining
+    and comparing them with map() and itertools.compress(), so that only the
+    entries that improve are touched from Python.  This beats
+    algebraic_dijkstra() when most pairs of nodes have an edge.
+
+    Returns a dict like the one from algebraic_dijkstra(), and stops early in
+    the same way if *target* is given.
+    """
+    combine = algebra.combine
+    key = algebra.key
+    rows = graph.rows
+    num_nodes = len(graph)
+    infinity = float("inf")
+
+    keys = [infinity] * num_nodes
+    pending = range(num_nodes) # the handles of the nodes not settled yet
+    lengths = [None] * num_nodes
+    parents = [-1] * num_nodes
+    target_handle = graph.handles.get(target, -1)
+    handle = graph.handles[a]
+    lengths[handle] = algebra.identity
+    keys[handle] = (algebra.identity if key is None else
+        key(algebra.identity))
+    settled_handles = []
+    while True:
+        min_key = min(keys)
+        if min_key == infinity:
+            break
+        handle = keys.index(min_key)
+        # lock it down!
+        keys[handle] = infinity
+        pending.remove(handle)
+        settled_handles.append(handle)
+        if handle == target_handle or not pending:
+            break
+        columns = _columns(pending)
+        weights = columns(rows[handle])
+        candidates = map(combine,
+            itertools.repeat(lengths[handle], len(pending)), weights)
+        new_keys = candidates if key is None else map(key, candidates)
+        better = itertools.compress(
+            itertools.izip(pending, weights, candidates, new_keys),
+            map(operator.lt, new_keys, columns(keys)))
+        for (x, weight, new_length, new_key) in better:
+            # NaN, the only value that is not equal to itself, is no edge;
+            # it compares false, but max() does not pass it on
+            if weight != weight:
+                continue
+            lengths[x] = new_length
+            parents[x] = handle
+            keys[x] = new_key
+
+    nodes = graph.nodes
+    final_dist = {}
+    for handle in settled_handles:
+        parent = parents[handle]
+        final_dist[nodes[handle]] = (lengths[handle],
+            nodes[parent] if parent >= 0 else None)
+    return final_dist
+
+##########
+#
+# Test
+
+import unittest
+
+def create_sample_graph():
+    # A to E is shortest by way of C and F, and G is unreachable
+    return {
+        "A": {"B": 7, "C": 9, "F": 14},
+        "B": {"A": 7, "C": 10, "D": 15},
+        "C": {"A": 9, "B": 10, "D": 11, "F": 2},
+        "D": {"B": 15, "C": 11, "E": 6},
+        "E": {"D": 6, "F": 9},
+        "F": {"A": 14, "C": 2, "E": 9},
+        "G": {},
+    }
+
+class AlgebraicDijkstraTests(unittest.TestCase):
+
+    def test_Shortest(self):
+        G = create_sample_graph()
+        final_dist = algebraic_dijkstra(CompactGraph(G), "A")
+        self.assertDictEqual(final_dist, algebraic_dijkstra(G, "A"))
+        self.assertListEqual(path_to(final_dist, "E"), ["A", "C", "F", "E"])
+        self.assertIsNone(path_to(final_dist, "G"))
+
+    def test_Bottleneck(self):
+        G = {
+            "A": {"B": 3.0, "C": 1.0},
+            "B": {"A": 3.0, "D": 1.0},
+            "C": {"A": 1.0, "D": 2.0},
+            "D": {"B": 1.0, "C": 2.0},
+        }
+        final_dist = algebraic_dijkstra(CompactGraph(G), "A", BOTTLENECK)
+        self.assertEqual(final_dist["A"], (0.0, None))
+        self.assertEqual(final_dist["D"], (2.0, "C"))
+        self.assertEqual(final_dist["B"], (2.0, "D"))
+
+    def test_MostProbable(self):
+        G = {"a": {"b": .9, "e": .5}, "b": {"c": .9}, "c": {"d": .01},
+            "d": {}, "e": {"f": .5}, "f": {"d": .5}}
+        final_dist = algebraic_dijkstra(CompactGraph(G), "a", MOST_PROBABLE)
+        self.assertAlmostEqual(final_dist["d"][0], .125)
+        self.assertListEqual(path_to(final_dist, "d"), ["a", "e", "f", "d"])
+
+    def test_Lexicographic(self):
+        G = {
+            "A": {"B": (1, 50), "C": (2, 10), "D": (4, 0)},
+            "B": {"D": (2, 10)},
+            "C": {"D": (1, 20)},
+            "D": {},
+        }
+        final_dist = algebraic_dijkstra(CompactGraph(G), "A",
+            lexicographic_algebra(2), target="C")
+        self.assertEqual(final_dist["C"], ((2, 10), "A"))
+        self.assertNotIn("D", final_dist)
+        # A-B-D and A-C-D both cost 3, but A-C-D is quicker
+        final_dist = algebraic_dijkstra(G, "A", lexicographic_algebra(2))
+        self.assertEqual(final_dist["D"], ((3, 30), "C"))
+        self.assertDictEqual(final_dist,
+            algebraic_dijkstra(CompactGraph(G), "A", lexicographic_algebra(2)))
+
+    def test_LazyGraph(self):
+        # the edges of each node are asked for once, when it is settled
+        class LazyGraph(object):
+            def __init__(self):
+                self.asked = []
+            def __getitem__(self, node):
+                self.asked.append(node)
+                return {node + 1: 1, node + 2: 3} if node < 10 else {}
+        G = LazyGraph()
+        final_dist = algebraic_dijkstra(G, 0, target=5)
+        self.assertEqual(final_dist[5], (5, 4))
+        self.assertListEqual(G.asked, range(5))
+
+class BidirectionalDijkstraTests(unittest.TestCase):
+
+    def test_Reversed(self):
+        G = create_sample_graph()
+        reverse_graph = CompactGraph(G).reversed()
+        reverse_G = {x:{} for x in G}
+        for x in G:
+            for (y, weight) in G[x].iteritems():
+                reverse_G[y][x] = weight
+        for x in G:
+            handle = reverse_graph.handles[x]
+            edges = range(reverse_graph.offsets[handle],
+                reverse_graph.offsets[handle + 1])
+            self.assertDictEqual(
+                {reverse_graph.nodes[reverse_graph.targets[edge]]:
+                    reverse_graph.weights[edge] for edge in edges},
+                reverse_G[x])
+
+    def test_SameAsAlgebraicDijkstra(self):
+        G = {"a": {"b": .9, "e": .5}, "b": {"c": .9}, "c": {"d": .01},
+            "d": {}, "e": {"f": .5}, "f": {"d": .5}}
+        for (graph, algebra) in [(create_sample_graph(), SHORTEST),
+                (create_sample_graph(), BOTTLENECK), (G, MOST_PROBABLE)]:
+            compact_graph = CompactGraph(graph)
+            reverse_graph = compact_graph.reversed()
+            for a in graph:
+                final_dist = algebraic_dijkstra(compact_graph, a, algebra)
+                for b in graph:
+                    (length, path, unused_num_settled) = (
+                        bidirectional_dijkstra(compact_graph, a, b, algebra,
+                            reverse_graph))
+                    if b in final_dist:
+                        self.assertAlmostEqual(length, final_dist[b][0])
+                        self.assertEqual(path[0], a)
+                        self.assertEqual(path[-1], b)
+                    else:
+                        self.assertIsNone(length)
+                        self.assertIsNone(path)
+
+    def test_Path(self):
+        (length, path, num_settled) = bidirectional_dijkstra(
+            CompactGraph(create_sample_graph()), "A", "E")
+        self.assertEqual(length, 20)
+        self.assertListEqual(path, ["A", "C", "F", "E"])
+        self.assertLess(num_settled, 6)
+        self.assertEqual(bidirectional_dijkstra(
+            CompactGraph(create_sample_graph()), "A", "A"), (0, ["A"], 1))
+
+    def test_SettlesFewerNodes(self):
+        # on a grid, two searches of half the radius cover about half as
+        # much as one search of the whole radius
+        G = {}
+        for x in xrange(41):
+            for y in xrange(41):
+                G[(x, y)] = {}
+                for (dx, dy) in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
+                    if 0 <= x + dx <= 40 and 0 <= y + dy <= 40:
+                        G[(x, y)][(x + dx, y + dy)] = 1
+        graph = CompactGraph(G)
+        (length, path, num_settled) = bidirectional_dijkstra(graph, (10, 20),
+            (30, 20))
+        self.assertEqual(length, 20)
+        self.assertEqual(len(path), 21)
+        single_pair_settled = len(algebraic_dijkstra(graph, (10, 20),
+            target=(30, 20)))
+        self.assertLess(num_settled, 0.75 * single_pair_settled)
+
+class KBestPathsTests(unittest.TestCase):
+
+    def all_paths(self, G, a, b, algebra):
+        # every loopless path from a to b, as sorted (key, length, path)
+        key = algebra.key or (lambda length: length)
+        paths = []
+        def extend(path, length):
+            if path[-1] == b:
+                paths.append((key(length), length, list(path)))
+                return
+            for (x, weight) in G[path[-1]].iteritems():
+                if x not in path:
+                    extend(path + [x], algebra.combine(length, weight))
+        extend([a], algebra.identity)
+        paths.sort()
+        return paths
+
+    def test_Shortest(self):
+        G = create_sample_graph()
+        paths = list(k_best_paths(CompactGraph(G), "A", "E"))
+        expected = self.all_paths(G, "A", "E", SHORTEST)
+        self.assertListEqual([x[0] for x in paths], [x[1] for x in expected])
+        self.assertListEqual(paths[0][1], ["A", "C", "F", "E"])
+        self.assertEqual(len(set(tuple(x[1]) for x in paths)), len(paths))
+
+    def test_SameAsAllPaths(self):
+        import random
+        # imported here, since favor_calibration imports this module
+        from cs215.finalexam.favor_calibration import make_favor_graph
+        rng = random.Random(5)
+        for trial in xrange(20):
+            algebra = MOST_PROBABLE if trial % 2 else SHORTEST
+            n = rng.randint(3, 7)
+            G = make_favor_graph(n, 0.4, rng)
+            graph = CompactGraph(G)
+            for (a, b) in [(0, n - 1), (n - 1, 0), (1, 2)]:
+                paths = list(k_best_paths(graph, a, b, algebra))
+                expected = self.all_paths(G, a, b, algebra)
+                self.assertEqual(len(paths), len(expected))
+                for ((length, path), (unused_key, expected_length,
+                        unused_path)) in zip(paths, expected):
+                    self.assertAlmostEqual(length, expected_length)
+                    self.assertEqual(len(set(path)), len(path))
+                    self.assertEqual((path[0], path[-1]), (a, b))
+
+    def test_Lazy(self):
+        G = {x:{y:1 for y in xrange(20) if y != x} for x in xrange(20)}
+        paths = k_best_paths(CompactGraph(G), 0, 1)
+        self.assertEqual(next(paths), (1, [0, 1]))
+        self.assertEqual(next(paths)[0], 2)
+        paths.close()
+
+    def test_Unreachable(self):
+        G = {"A": {"B": 1}, "B": {}, "C": {"A": 1}}
+        self.assertListEqual(list(k_best_paths(CompactGraph(G), "A", "C")),
+            [])
+
+class DenseDijkstraTests(unittest.TestCase):
+
+    def assert_same_as_algebraic_dijkstra(self, G, a, algebra):
+        expected = algebraic_dijkstra(CompactGraph(G), a, algebra)
+        actual = dense_dijkstra(DenseGraph(G), a, algebra)
+        self.assertItemsEqual(actual, expected)
+        for node in expected:
+            self.assertAlmostEqual(actual[node][0], expected[node][0])
+
+    def test_Shortest(self):
+        G = create_sample_graph()
+        final_dist = dense_dijkstra(DenseGraph(G), "A")
+        self.assertListEqual(path_to(final_dist, "E"), ["A", "C", "F", "E"])
+        self.assertIsNone(path_to(final_dist, "G"))
+        for node in G:
+            self.assert_same_as_algebraic_dijkstra(G, node, SHORTEST)
+
+    def test_MostProbable(self):
+        G = {"a": {"b": .9, "e": .5}, "b": {"c": .9}, "c": {"d": .01},
+            "d": {}, "e": {"f": .5}, "f": {"d": .5}}
+        final_dist = dense_dijkstra(DenseGraph(G), "a", MOST_PROBABLE)
+        self.assertAlmostEqual(final_dist["d"][0], .125)
+        self.assertListEqual(path_to(final_dist, "d"), ["a", "e", "f", "d"])
+        for node in G:
+            self.assert_same_as_algebraic_dijkstra(G, node, MOST_PROBABLE)
+
+    def test_ZeroWeights(self):
+        # an edge of weight 0.0 is an edge, unlike the NaN of no edge
+        G = {1: {2: 0.0}, 2: {3: 0.0}, 3: {}, 4: {1: 0.0}}
+        final_dist = dense_dijkstra(DenseGraph(G), 1, BOTTLENECK, target=3)
+        self.assertEqual(final_dist[3], (0.0, 2))
+        self.assertNotIn(4, final_dist)
+
+    def test_Empty(self):
+        G = {"A": {}}
+        self.assertDictEqual(dense_dijkstra(DenseGraph(G), "A"),
+            {"A": (0, None)})
+
+    def test_Bottleneck(self):
+        # most pairs have no edge, and max() would turn their NaN into a path
+        G = create_sample_graph()
+        for node in G:
+            self.assert_same_as_algebraic_dijkstra(G, node, BOTTLENECK)
+
+    def test_LastNodePending(self):
+        G = {"A": {"B": 2}, "B": {"A": 1}}
+        self.assertDictEqual(dense_dijkstra(DenseGraph(G), "A"),
+            {"A": (0, None), "B": (2, "A")})
+
+class IntegerDijkstraTests(unittest.TestCase):
+
+    def assert_distances(self, final_dist):
+        self.assertDictEqual({x:final_dist[x][0] for x in final_dist},
+            {"A": 0, "B": 7, "C": 9, "D": 20, "E": 20, "F": 11})
+
+    def test_RadixHeap(self):
+        final_dist = algebraic_dijkstra(create_sample_graph(), "A",
+            make_queue=RadixHeap)
+        self.assert_distances(final_dist)
+        self.assertListEqual(path_to(final_dist, "E"), ["A", "C", "F", "E"])
+
+    def test_BucketQueue(self):
+        final_dist = algebraic_dijkstra(create_sample_graph(), "A",
+            make_queue=lambda: BucketQueue(15))
+        self.assert_distances(final_dist)
+        self.assertListEqual(path_to(final_dist, "E"), ["A", "C", "F", "E"])
+
+    def test_Target(self):
+        final_dist = algebraic_dijkstra(CompactGraph(create_sample_graph()),
+            "A", target="C", make_queue=RadixHeap)
+        self.assertEqual(final_dist["C"], (9, "A"))
+        self.assertNotIn("D", final_dist)
+
+    def test_Unreachable(self):
+        final_dist = algebraic_dijkstra(create_sample_graph(), "A",
+            make_queue=RadixHeap)
+        self.assertIsNone(path_to(final_dist, "G"))
+
+    def test_ZeroWeights(self):
+        G = {1: {2: 0}, 2: {3: 0}, 3: {}}
+        final_dist = algebraic_dijkstra(G, 1, make_queue=lambda: BucketQueue(0))
+        self.assertEqual(final_dist[3], (0, 2))
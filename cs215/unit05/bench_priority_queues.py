@@ -0,0 +1,161 @@
+"""
+Compares the priority queue backends from cs215.finalexam.heap by running
+dijkstra() from prob02_different_paths_my on the weighted Marvel character
+graph from each of the characters of interest.
+
+For each backend this reports the number of nodes settled (pop_min() calls),
+the number of decrease_key() calls and the wall time spent in dijkstra().
+
+Run it from this directory so that marvel_characters.txt can be found.
+"""
+
+import time
+import unittest
+
+from cs215.finalexam.heap import IndexedHeap
+from cs215.finalexam.heap import PairingHeap
+from cs215.unit05.prob02_different_paths_my import CHARACTERS_OF_INTEREST
+from cs215.unit05.prob02_different_paths_my import create_marvel_graph
+from cs215.unit05.prob02_different_paths_my import dijkstra
+from cs215.unit05.prob02_different_paths_my import load_marvel_characters
+
+BACKENDS = [
+    ("binary", lambda: IndexedHeap(2)),
+    ("4-ary", lambda: IndexedHeap(4)),
+    ("8-ary", lambda: IndexedHeap(8)),
+    ("pairing", PairingHeap),
+]
+
+
+class CountingQueue(object):
+    """
+    Wraps a priority queue and counts the calls to pop_min(), insert() and
+    decrease_key() that are made on it.
+    """
+
+    def __init__(self, queue):
+        self.queue = queue
+        self.num_inserts = 0
+        self.num_settled = 0
+        self.num_decrease_keys = 0
+
+    def __len__(self):
+        return len(self.queue)
+
+    def __contains__(self, handle):
+        return handle in self.queue
+
+    def key(self, handle):
+        return self.queue.key(handle)
+
+    def insert(self, handle, key):
+        self.num_inserts += 1
+        self.queue.insert(handle, key)
+
+    def decrease_key(self, handle, key):
+        self.num_decrease_keys += 1
+        self.queue.decrease_key(handle, key)
+
+    def pop_min(self):
+        self.num_settled += 1
+        return self.queue.pop_min()
+
+
+def count_operations(graph, sources, make_queue):
+    """
+    Runs dijkstra() from each of the given sources using a CountingQueue
+    around queues made by *make_queue*.  Returns a tuple whose values are the
+    total number of nodes settled and of decrease_key() calls.
+    """
+    num_settled = 0
+    num_decrease_keys = 0
+    for source in sources:
+        queues = []
+        def make_counting_queue():
+            queue = CountingQueue(make_queue())
+            queues.append(queue)
+            return queue
+        dijkstra(graph, source, make_counting_queue)
+        for queue in queues:
+            num_settled += queue.num_settled
+            num_decrease_keys += queue.num_decrease_keys
+    return (num_settled, num_decrease_keys)
+
+
+def time_dijkstra(graph, sources, make_queue):
+    """
+    Runs dijkstra() from each of the given sources using queues made by
+    *make_queue* and returns the total wall time, in seconds.  This is timed
+    separately from count_operations() so that the counting does not skew
+    the times.
+    """
+    start_time = time.time()
+    for source in sources:
+        dijkstra(graph, source, make_queue)
+    return time.time() - start_time
+
+
+def benchmark(graph, sources, backends=BACKENDS):
+    """
+    Runs dijkstra() from each of the given sources with each of the given
+    (name, make_queue) backends.  Returns a list of tuples, one per backend,
+    whose values are the backend name, the number of nodes settled, the
+    number of decrease_key() calls and the wall time in seconds.
+    """
+    results = []
+    for (name, make_queue) in backends:
+        (num_settled, num_decrease_keys) = count_operations(graph, sources,
+            make_queue)
+        elapsed_time = time_dijkstra(graph, sources, make_queue)
+        results.append((name, num_settled, num_decrease_keys, elapsed_time))
+    return results
+
+
+def print_results(results):
+    print("{:<10} {:>10} {:>14} {:>10}".format("backend", "settled",
+        "decrease_keys", "seconds"))
+    for (name, num_settled, num_decrease_keys, elapsed_time) in results:
+        print("{:<10} {:>10} {:>14} {:>10.3f}".format(name, num_settled,
+            num_decrease_keys, elapsed_time))
+    fastest = min(results, key=lambda result: result[3])
+    print("fastest: {}".format(fastest[0]))
+
+
+class BenchmarkTests(unittest.TestCase):
+
+    def test_AllBackendsDoTheSameWork(self):
+        comics = {
+            1: ["A", "B"],
+            2: ["A", "B", "C"],
+            3: ["B", "C"],
+            4: ["D", "E", "F"],
+            5: ["D", "A", "B"],
+            6: ["E", "A", "B"],
+            7: ["F", "G"],
+        }
+        graph = create_marvel_graph(comics)
+        results = benchmark(graph, ["A", "G"])
+        self.assertListEqual([x[0] for x in results],
+            [x[0] for x in BACKENDS])
+        for (unused_name, num_settled, num_decrease_keys, unused_time) in results:
+            self.assertEqual(num_settled, 14)
+            self.assertEqual(num_decrease_keys, results[0][2])
+
+    def test_CountingQueue(self):
+        queue = CountingQueue(IndexedHeap())
+        queue.insert(0, 5)
+        queue.insert(1, 6)
+        queue.decrease_key(1, 4)
+        self.assertEqual(queue.pop_min(), (1, 4))
+        self.assertEqual(queue.num_inserts, 2)
+        self.assertEqual(queue.num_decrease_keys, 1)
+        self.assertEqual(queue.num_settled, 1)
+
+
+if __name__ == "__main__":
+    print("load_marvel_characters()")
+    comics = load_marvel_characters()
+    print("create_marvel_graph()")
+    graph = create_marvel_graph(comics)
+    results = benchmark(graph, CHARACTERS_OF_INTEREST)
+    print_results(results)
@@ -0,0 +1,252 @@
+"""
+Answers minimax ("least obscure") path queries on an undirected graph, such
+as the IMDB actor-movie graph from load_graph() in
+prob03_least_obscure_path_my.
+
+The path between two nodes whose largest edge weight is smallest always has
+the same largest edge weight as their path in a minimum spanning forest of
+the graph.  So the forest is built once with Kruskal's algorithm, and then
+binary lifting tables, which store the largest edge weight on each jump
+towards the root, answer each query in O(log n) by walking both nodes up to
+their lowest common ancestor.
+"""
+
+import collections
+import unittest
+
+
+class UnionFind(object):
+    """
+    A disjoint-set forest over the integers 0 to n-1, with union by size and
+    path halving.
+    """
+
+    def __init__(self, n):
+        self.parents = range(n)
+        self.sizes = [1] * n
+
+    def find(self, x):
+        parents = self.parents
+        while parents[x] != x:
+            parents[x] = parents[parents[x]]
+            x = parents[x]
+        return x
+
+    def union(self, x, y):
+        """
+        Merges the sets containing x and y.  Returns True if they were
+        different sets, or False if they already were the same set.
+        """
+        x = self.find(x)
+        y = self.find(y)
+        if x == y:
+            return False
+        if self.sizes[x] < self.sizes[y]:
+            (x, y) = (y, x)
+        self.parents[y] = x
+        self.sizes[x] += self.sizes[y]
+        return True
+
+
+class BottleneckForest(object):
+    """
+    A minimum spanning forest of a graph plus the binary lifting tables for
+    bottleneck queries on it.  *graph* is a dict whose keys are nodes and
+    whose values are dicts mapping adjacent nodes to the weight of the edge
+    to them, as returned from load_graph().
+    """
+
+    def __init__(self, graph):
+        self.nodes = list(graph)
+        self.handles = {node:handle for (handle, node) in enumerate(self.nodes)}
+        tree = self._kruskal(graph)
+        self._build_lifting_tables(tree)
+
+    def _kruskal(self, graph):
+        # returns the forest as a list, indexed by handle, of lists of
+        # (handle, weight) tuples
+        handles = self.handles
+        edges = []
+        for (node, adjacent_nodes) in graph.iteritems():
+            handle = handles[node]
+            for (adjacent_node, weight) in adjacent_nodes.iteritems():
+                adjacent_handle = handles[adjacent_node]
+                if handle < adjacent_handle:
+                    edges.append((weight, handle, adjacent_handle))
+        edges.sort()
+
+        num_nodes = len(self.nodes)
+        components = UnionFind(num_nodes)
+        tree = [[] for unused in xrange(num_nodes)]
+        num_tree_edges = 0
+        for (weight, handle1, handle2) in edges:
+            if components.union(handle1, handle2):
+                tree[handle1].append((handle2, weight))
+                tree[handle2].append((handle1, weight))
+                num_tree_edges += 1
+                if num_tree_edges == num_nodes - 1:
+                    break
+        return tree
+
+    def _build_lifting_tables(self, tree):
+        num_nodes = len(tree)
+        # each tree of the forest is rooted at its first node; roots are their
+        # own parents, through an edge of weight None, which max() ignores
+        # because None compares less than any number in Python 2
+        self.components = [None] * num_nodes
+        self.depths = [0] * num_nodes
+        parents = range(num_nodes)
+        parent_weights = [None] * num_nodes
+        for root in xrange(num_nodes):
+            if self.components[root] is not None:
+                continue
+            self.components[root] = root
+            queue = collections.deque([root])
+            while queue:
+                handle = queue.popleft()
+                for (child, weight) in tree[handle]:
+                    if self.components[child] is None:
+                        self.components[child] = root
+                        self.depths[child] = self.depths[handle] + 1
+                        parents[child] = handle
+                        parent_weights[child] = weight
+                        queue.append(child)
+
+        # ancestors[k][x] is the ancestor 2**k levels above x (or the root)
+        # and max_weights[k][x] is the largest edge weight on the way there
+        self.ancestors = [parents]
+        self.max_weights = [parent_weights]
+        max_depth = max(self.depths) if num_nodes else 0
+        while (1 << len(self.ancestors)) <= max_depth:
+            prev_ancestors = self.ancestors[-1]
+            prev_max_weights = self.max_weights[-1]
+            self.ancestors.append([prev_ancestors[prev_ancestors[x]]
+                for x in xrange(num_nodes)])
+            self.max_weights.append([
+                max(prev_max_weights[x], prev_max_weights[prev_ancestors[x]])
+                for x in xrange(num_nodes)])
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, node):
+        return node in self.handles
+
+    def query(self, node1, node2):
+        """
+        Returns the smallest possible largest edge weight on a path between
+        the two given nodes, 0.0 if they are the same node, or None if there
+        is no path between them.
+        """
+        handle1 = self.handles[node1]
+        handle2 = self.handles[node2]
+        if self.components[handle1] != self.components[handle2]:
+            return None
+        if self.depths[handle1] < self.depths[handle2]:
+            (handle1, handle2) = (handle2, handle1)
+
+        result = 0.0
+        depth_difference = self.depths[handle1] - self.depths[handle2]
+        level = 0
+        while depth_difference:
+            if depth_difference & 1:
+                result = max(result, self.max_weights[level][handle1])
+                handle1 = self.ancestors[level][handle1]
+            depth_difference >>= 1
+            level += 1
+        if handle1 == handle2:
+            return result
+
+        for level in xrange(len(self.ancestors) - 1, -1, -1):
+            ancestors = self.ancestors[level]
+            if ancestors[handle1] != ancestors[handle2]:
+                max_weights = self.max_weights[level]
+                result = max(result, max_weights[handle1], max_weights[handle2])
+                handle1 = ancestors[handle1]
+                handle2 = ancestors[handle2]
+        parent_weights = self.max_weights[0]
+        return max(result, parent_weights[handle1], parent_weights[handle2])
+
+    def query_all(self, pairs):
+        """
+        Returns a dict mapping each of the given (node1, node2) tuples to the
+        value that query() returns for them.
+        """
+        return {pair:self.query(*pair) for pair in pairs}
+
+
+class BottleneckForestTests(unittest.TestCase):
+
+    def create_graph(self):
+        edges = [
+            ("A", "B", 3.0), ("A", "C", 1.0), ("B", "C", 1.0), ("B", "D", 2.0),
+            ("C", "E", 6.0), ("D", "E", 1.0), ("D", "F", 4.0), ("E", "F", 1.0),
+            ("F", "G", 2.0), ("G", "H", 1.0), ("H", "E", 7.0), ("H", "I", 0.5),
+            ("X", "Y", 5.0),
+        ]
+        graph = {}
+        for (node1, node2, weight) in edges:
+            graph.setdefault(node1, {})[node2] = weight
+            graph.setdefault(node2, {})[node1] = weight
+        return graph
+
+    def brute_force(self, graph, source):
+        # Dijkstra where the length of a path is its largest edge weight
+        weights = {source:0.0}
+        finished = set()
+        while len(finished) < len(weights):
+            node = min((x for x in weights if x not in finished),
+                key=weights.get)
+            finished.add(node)
+            for (adjacent_node, weight) in graph[node].iteritems():
+                new_weight = max(weights[node], weight)
+                if new_weight < weights.get(adjacent_node, float("inf")):
+                    weights[adjacent_node] = new_weight
+        return weights
+
+    def test_AllPairs(self):
+        graph = self.create_graph()
+        forest = BottleneckForest(graph)
+        self.assertEqual(len(forest), len(graph))
+        for node1 in graph:
+            expected = self.brute_force(graph, node1)
+            for node2 in graph:
+                self.assertEqual(forest.query(node1, node2),
+                    expected.get(node2), (node1, node2))
+
+    def test_Examples(self):
+        forest = BottleneckForest(self.create_graph())
+        self.assertEqual(forest.query("A", "I"), 2.0)
+        self.assertEqual(forest.query("X", "Y"), 5.0)
+        self.assertEqual(forest.query("A", "A"), 0.0)
+        self.assertIsNone(forest.query("A", "X"))
+
+    def test_QueryAll(self):
+        forest = BottleneckForest(self.create_graph())
+        self.assertDictEqual(forest.query_all([("A", "I"), ("Y", "X")]),
+            {("A", "I"): 2.0, ("Y", "X"): 5.0})
+
+    def test_LongPath(self):
+        # a path deep enough to need several levels of the lifting tables
+        graph = collections.defaultdict(dict)
+        for x in xrange(100):
+            weight = float((x * 37) % 101)
+            graph[x][x + 1] = weight
+            graph[x + 1][x] = weight
+        forest = BottleneckForest(graph)
+        for (node1, node2) in [(0, 100), (3, 64), (50, 51), (99, 2)]:
+            expected = max(graph[x][x + 1]
+                for x in xrange(min(node1, node2), max(node1, node2)))
+            self.assertEqual(forest.query(node1, node2), expected)
+
+    def test_Empty(self):
+        self.assertEqual(len(BottleneckForest({})), 0)
+
+    def test_UnionFind(self):
+        components = UnionFind(5)
+        self.assertTrue(components.union(0, 1))
+        self.assertTrue(components.union(3, 4))
+        self.assertFalse(components.union(1, 0))
+        self.assertTrue(components.union(1, 4))
+        self.assertEqual(components.find(0), components.find(3))
+        self.assertNotEqual(components.find(0), components.find(2))
@@ -0,0 +1,337 @@
+"""
+Contraction hierarchies for answering many shortest path queries on the same
+undirected graph, such as the IMDB actor-movie graph from load_graph() in
+prob03_least_obscure_path_my.
+
+Building the hierarchy contracts the nodes one at a time, least important
+first, where importance is the "edge difference": the number of shortcuts
+that contracting the node would add minus the number of edges it removes.
+Whenever a node is contracted, a shortcut is added between each pair of its
+neighbours unless a "witness" path that avoids the node is at least as good.
+A query then only ever moves upwards in the hierarchy, from both ends, and
+meets in the middle, so it settles a tiny part of the graph.
+
+The cost of a path is built up with a *combine* function, starting from
+*identity*: operator.add and 0.0 give the usual sum of edge weights, and max
+and 0.0 give the largest edge weight on the path, such as the obscurity of
+a path of movies.  Any combine function works as long as it never makes a
+path cheaper by extending it.
+
+A hierarchy can be saved to a file and loaded again, so that building it is
+only paid once per dataset; *combine* must then be picklable (a builtin or a
+module-level function, not a lambda).
+"""
+
+import cPickle
+import heapq
+import operator
+import unittest
+
+# the default maximum number of nodes that a witness search may settle;
+# giving up early only costs extra shortcuts, never wrong answers
+MAX_WITNESS_SETTLED = 200
+
+# the initial node ordering only looks for one-edge witnesses, since it is
+# only an estimate and priorities are recomputed before contracting anyway
+INITIAL_WITNESS_SETTLED = 1
+
+
+class ContractionHierarchy(object):
+    """
+    The result of build_contraction_hierarchy().  For each node, only the
+    edges (and shortcuts) to nodes that were contracted after it are kept.
+    """
+
+    def __init__(self, nodes, ranks, upward_edges, combine, identity):
+        self.nodes = nodes # handle -> node
+        self.handles = {node:handle for (handle, node) in enumerate(nodes)}
+        self.ranks = ranks # handle -> order in which the node was contracted
+        self.upward_edges = upward_edges # handle -> {handle: weight}
+        self.combine = combine
+        self.identity = identity
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, node):
+        return node in self.handles
+
+    def num_upward_edges(self):
+        return sum(len(edges) for edges in self.upward_edges)
+
+    def query(self, source, target):
+        """
+        Returns the cost of the cheapest path between the two given nodes, or
+        None if there is no path between them.
+        """
+        source_handle = self.handles[source]
+        target_handle = self.handles[target]
+        if source_handle == target_handle:
+            return self.identity
+
+        combine = self.combine
+        upward_edges = self.upward_edges
+        costs = ({source_handle:self.identity}, {target_handle:self.identity})
+        settled = (set(), set())
+        queues = ([(self.identity, source_handle)],
+            [(self.identity, target_handle)])
+        best_cost = None
+        while queues[0] or queues[1]:
+            # advance whichever search has the cheaper next node
+            if not queues[1] or (queues[0] and queues[0][0] <= queues[1][0]):
+                direction = 0
+            else:
+                direction = 1
+            (cost, handle) = heapq.heappop(queues[direction])
+            if handle in settled[direction]:
+                continue
+            if best_cost is not None and not cost < best_cost:
+                # nothing left in this direction can beat the best path
+                del queues[direction][:]
+                continue
+            settled[direction].add(handle)
+
+            other_cost = costs[1 - direction].get(handle)
+            if other_cost is not None:
+                path_cost = combine(cost, other_cost)
+                if best_cost is None or path_cost < best_cost:
+                    best_cost = path_cost
+
+            direction_costs = costs[direction]
+            for (adjacent_handle, weight) in upward_edges[handle].iteritems():
+                new_cost = combine(cost, weight)
+                cur_cost = direction_costs.get(adjacent_handle)
+                if cur_cost is None or new_cost < cur_cost:
+                    direction_costs[adjacent_handle] = new_cost
+                    heapq.heappush(queues[direction], (new_cost, adjacent_handle))
+        return best_cost
+
+    def save(self, f):
+        """
+        Writes this hierarchy to the given binary file object.
+        """
+        state = (self.nodes, self.ranks, self.upward_edges, self.combine,
+            self.identity)
+        cPickle.dump(state, f, cPickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, f):
+        """
+        Reads a hierarchy that was written by save() from the given binary
+        file object.
+        """
+        (nodes, ranks, upward_edges, combine, identity) = cPickle.load(f)
+        return cls(nodes, ranks, upward_edges, combine, identity)
+
+
+class _Contractor(object):
+    # the mutable state of build_contraction_hierarchy()
+
+    def __init__(self, graph, combine, identity):
+        self.combine = combine
+        self.identity = identity
+        self.nodes = list(graph)
+        handles = {node:handle for (handle, node) in enumerate(self.nodes)}
+        # handle -> {handle: weight} for the nodes not contracted yet
+        self.edges = []
+        for node in self.nodes:
+            edges = {}
+            for (adjacent_node, weight) in graph[node].iteritems():
+                adjacent_handle = handles[adjacent_node]
+                if adjacent_handle == handles[node]:
+                    continue # a loop never helps a path
+                if adjacent_handle not in edges or weight < edges[adjacent_handle]:
+                    edges[adjacent_handle] = weight
+            self.edges.append(edges)
+        self.num_contracted_neighbours = [0] * len(self.nodes)
+
+    def shortcuts(self, handle, max_settled):
+        """
+        Returns a list of (handle1, handle2, weight) tuples, the shortcuts that
+        contracting the node with the given handle would need, looking for
+        witnesses among at most *max_settled* nodes around each neighbour.
+        """
+        combine = self.combine
+        edges = self.edges[handle]
+        neighbours = list(edges)
+        shortcuts = []
+        for (i, handle1) in enumerate(neighbours):
+            targets = {}
+            for handle2 in neighbours[i + 1:]:
+                targets[handle2] = combine(edges[handle1], edges[handle2])
+            if not targets:
+                continue
+            witness_costs = self.witness_search(handle1, handle, targets,
+                max_settled)
+            for (handle2, shortcut_cost) in targets.iteritems():
+                witness_cost = witness_costs.get(handle2)
+                if witness_cost is None or shortcut_cost < witness_cost:
+                    shortcuts.append((handle1, handle2, shortcut_cost))
+        return shortcuts
+
+    def witness_search(self, source, avoid, targets, max_settled):
+        # a Dijkstra from source that avoids one node and gives up once it
+        # is past the most expensive target or has settled enough nodes
+        combine = self.combine
+        max_cost = max(targets.itervalues())
+        num_targets_left = len(targets)
+        costs = {source:self.identity}
+        settled = set()
+        queue = [(self.identity, source)]
+        while queue and len(settled) < max_settled:
+            (cost, handle) = heapq.heappop(queue)
+            if handle in settled:
+                continue
+            settled.add(handle)
+            if handle in targets:
+                num_targets_left -= 1
+                if num_targets_left == 0:
+                    break
+            for (adjacent_handle, weight) in self.edges[handle].iteritems():
+                if adjacent_handle == avoid:
+                    continue
+                new_cost = combine(cost, weight)
+                if max_cost < new_cost:
+                    continue # too expensive to be a witness for any target
+                cur_cost = costs.get(adjacent_handle)
+                if cur_cost is None or new_cost < cur_cost:
+                    costs[adjacent_handle] = new_cost
+                    heapq.heappush(queue, (new_cost, adjacent_handle))
+        return costs
+
+    def priority(self, handle, max_settled):
+        """
+        Returns a tuple whose values are the priority of the node with the
+        given handle, lower meaning less important, and the shortcuts that
+        contracting it would need, to be passed to contract().
+        """
+        shortcuts = self.shortcuts(handle, max_settled)
+        edge_difference = len(shortcuts) - len(self.edges[handle])
+        return (edge_difference + self.num_contracted_neighbours[handle],
+            shortcuts)
+
+    def contract(self, handle, shortcuts):
+        """
+        Contracts the node with the given handle and returns its edges to the
+        nodes that are still left, which all end up higher in the hierarchy.
+        """
+        edges = self.edges
+        for (handle1, handle2, weight) in shortcuts:
+            cur_weight = edges[handle1].get(handle2)
+            if cur_weight is None or weight < cur_weight:
+                edges[handle1][handle2] = weight
+                edges[handle2][handle1] = weight
+        upward_edges = edges[handle]
+        for adjacent_handle in upward_edges:
+            del edges[adjacent_handle][handle]
+            self.num_contracted_neighbours[adjacent_handle] += 1
+        edges[handle] = None
+        return upward_edges
+
+
+def build_contraction_hierarchy(graph, combine=operator.add, identity=0.0,
+        max_witness_settled=MAX_WITNESS_SETTLED):
+    """
+    Builds a ContractionHierarchy of the given undirected graph, a dict whose
+    keys are nodes and whose values are dicts mapping adjacent nodes to the
+    weight of the edge to them.  See the module docstring for *combine* and
+    *identity*.
+    """
+    contractor = _Contractor(graph, combine, identity)
+    num_nodes = len(contractor.nodes)
+    queue = [(contractor.priority(handle, INITIAL_WITNESS_SETTLED)[0], handle)
+        for handle in xrange(num_nodes)]
+    heapq.heapify(queue)
+
+    ranks = [None] * num_nodes
+    upward_edges = [None] * num_nodes
+    next_rank = 0
+    while queue:
+        (priority, handle) = heapq.heappop(queue)
+        # priorities go stale as neighbours are contracted; recompute lazily
+        # and put the node back if it is no longer the least important
+        (new_priority, shortcuts) = contractor.priority(handle,
+            max_witness_settled)
+        if queue and new_priority > queue[0][0]:
+            heapq.heappush(queue, (new_priority, handle))
+            continue
+        upward_edges[handle] = contractor.contract(handle, shortcuts)
+        ranks[handle] = next_rank
+        next_rank += 1
+
+    return ContractionHierarchy(contractor.nodes, ranks, upward_edges, combine,
+        identity)
+
+
+class ContractionHierarchyTests(unittest.TestCase):
+
+    def create_graph(self):
+        edges = [
+            ("A", "B", 3.0), ("A", "C", 1.0), ("B", "C", 1.0), ("B", "D", 2.0),
+            ("C", "E", 6.0), ("D", "E", 1.0), ("D", "F", 4.0), ("E", "F", 1.0),
+            ("F", "G", 2.0), ("G", "H", 1.0), ("H", "E", 7.0),
+            ("X", "Y", 5.0),
+        ]
+        graph = {}
+        for (node1, node2, weight) in edges:
+            graph.setdefault(node1, {})[node2] = weight
+            graph.setdefault(node2, {})[node1] = weight
+        return graph
+
+    def brute_force(self, graph, source, combine, identity):
+        costs = {source:identity}
+        queue = [(identity, source)]
+        settled = set()
+        while queue:
+            (cost, node) = heapq.heappop(queue)
+            if node in settled:
+                continue
+            settled.add(node)
+            for (adjacent_node, weight) in graph[node].iteritems():
+                new_cost = combine(cost, weight)
+                if adjacent_node not in costs or new_cost < costs[adjacent_node]:
+                    costs[adjacent_node] = new_cost
+                    heapq.heappush(queue, (new_cost, adjacent_node))
+        return costs
+
+    def assert_all_pairs(self, graph, hierarchy, combine, identity):
+        for source in graph:
+            expected = self.brute_force(graph, source, combine, identity)
+            for target in graph:
+                self.assertEqual(hierarchy.query(source, target),
+                    expected.get(target), (source, target))
+
+    def test_SumOfWeights(self):
+        graph = self.create_graph()
+        hierarchy = build_contraction_hierarchy(graph)
+        self.assertEqual(len(hierarchy), len(graph))
+        self.assertEqual(hierarchy.query("A", "H"), 9.0)
+        self.assert_all_pairs(graph, hierarchy, operator.add, 0.0)
+
+    def test_MaxOfWeights(self):
+        graph = self.create_graph()
+        hierarchy = build_contraction_hierarchy(graph, max, 0.0)
+        self.assertEqual(hierarchy.query("A", "H"), 2.0)
+        self.assert_all_pairs(graph, hierarchy, max, 0.0)
+
+    def test_TinyWitnessLimit(self):
+        graph = self.create_graph()
+        hierarchy = build_contraction_hierarchy(graph, max_witness_settled=1)
+        self.assert_all_pairs(graph, hierarchy, operator.add, 0.0)
+
+    def test_Disconnected(self):
+        hierarchy = build_contraction_hierarchy(self.create_graph())
+        self.assertIsNone(hierarchy.query("A", "X"))
+        self.assertEqual(hierarchy.query("X", "Y"), 5.0)
+        self.assertEqual(hierarchy.query("X", "X"), 0.0)
+
+    def test_SaveAndLoad(self):
+        import io
+        graph = self.create_graph()
+        hierarchy = build_contraction_hierarchy(graph, max, 0.0)
+        f = io.BytesIO()
+        hierarchy.save(f)
+        f.seek(0)
+        loaded = ContractionHierarchy.load(f)
+        self.assertIs(loaded.combine, max)
+        self.assert_all_pairs(graph, loaded, max, 0.0)
@@ -0,0 +1,428 @@
+"""
+Point-to-point shortest path queries on a weighted, undirected graph, such as
+the Marvel character graph from create_marvel_graph() in
+prob02_different_paths_my, using A* with landmarks ("ALT").
+
+A LandmarkIndex is built once per graph.  It picks a few landmark nodes and
+stores the distance from each landmark to every node.  By the triangle
+inequality, |d(L, u) - d(L, v)| is a lower bound on d(u, v) for every
+landmark L, which lets astar() and bidirectional_astar() head straight for
+the target instead of exploring the whole graph like dijkstra() does.
+
+Every query returns a QueryStats along with its result so that the number of
+nodes it settled can be compared with a plain Dijkstra search from
+dijkstra_query().
+"""
+
+import unittest
+
+from cs215.finalexam.heap import IndexedHeap
+from cs215.unit05.prob02_different_paths_my import create_marvel_graph
+from cs215.unit05.prob02_different_paths_my import dijkstra
+from cs215.unit05.prob02_different_paths_my import load_marvel_characters
+
+INFINITY = float("inf")
+
+
+class QueryStats(object):
+    """
+    Counts the work done by one point-to-point query.
+    """
+
+    def __init__(self):
+        self.num_settled = 0 # nodes removed from a priority queue
+        self.num_relaxed = 0 # edges looked at
+
+    def __repr__(self):
+        return "QueryStats(num_settled={0.num_settled!r}, " \
+            "num_relaxed={0.num_relaxed!r})".format(self)
+
+
+def select_landmarks(graph, num_landmarks, strategy="farthest"):
+    """
+    Picks up to *num_landmarks* landmark nodes from the given graph.
+
+    With the "degree" strategy, the nodes with the most edges are picked.
+    With the "farthest" strategy, the first landmark is the node farthest
+    from the node with the most edges, and each landmark after that is the
+    node whose distance to its nearest landmark so far is the largest, which
+    tends to spread the landmarks around the edges of the graph.
+
+    Returns a tuple whose values are the list of landmarks and a list of the
+    ShortestPathTree from each of them (or None if the "degree" strategy was
+    used and the trees were never needed).
+    """
+    if num_landmarks <= 0 or not graph:
+        return ([], [])
+
+    nodes_by_degree = sorted(graph, key=lambda node: -len(graph[node]))
+    if strategy == "degree":
+        return (nodes_by_degree[:num_landmarks], None)
+    elif strategy != "farthest":
+        raise ValueError("unknown landmark strategy: {}".format(strategy))
+
+    landmarks = []
+    trees = []
+    tree = dijkstra(graph, nodes_by_degree[0])
+    nearest_landmark_distance = {node:INFINITY for node in tree}
+    while len(landmarks) < num_landmarks:
+        # the first time around, tree is from the highest-degree node
+        candidates = [node for node in tree if node not in landmarks]
+        if not candidates:
+            break
+        if landmarks:
+            landmark = max(candidates,
+                key=lambda node: nearest_landmark_distance[node])
+        else:
+            landmark = max(candidates, key=tree.distance)
+        tree = dijkstra(graph, landmark)
+        landmarks.append(landmark)
+        trees.append(tree)
+        for node in tree:
+            distance = tree.distance(node)
+            if distance < nearest_landmark_distance[node]:
+                nearest_landmark_distance[node] = distance
+    return (landmarks, trees)
+
+
+class LandmarkIndex(object):
+    """
+    The landmarks of a graph and the distance from each of them to every
+    node, from which lower bounds on the distance between any two nodes are
+    calculated.  The graph must be undirected (every edge must have a reverse
+    edge of the same weight), as create_marvel_graph() makes them.
+    """
+
+    def __init__(self, graph, num_landmarks=8, strategy="farthest"):
+        (self.landmarks, trees) = select_landmarks(graph, num_landmarks,
+            strategy)
+        if trees is None:
+            trees = [dijkstra(graph, landmark) for landmark in self.landmarks]
+
+        # node -> list of the distances to it from each landmark, which is
+        # INFINITY for landmarks in other connected components
+        self.distances = {}
+        for node in graph:
+            self.distances[node] = [tree.distance(node) if node in tree
+                else INFINITY for tree in trees]
+
+    def lower_bound(self, node1, node2):
+        """
+        Returns a lower bound on the distance between the two given nodes.
+        """
+        return self._lower_bound(self.distances[node1], self.distances[node2])
+
+    def _lower_bound(self, distances1, distances2):
+        lower_bound = 0.0
+        for (distance1, distance2) in zip(distances1, distances2):
+            if distance1 == INFINITY or distance2 == INFINITY:
+                continue
+            difference = abs(distance1 - distance2)
+            if difference > lower_bound:
+                lower_bound = difference
+        return lower_bound
+
+    def potential_towards(self, target):
+        """
+        Returns a function of a node that gives a lower bound on its distance
+        to the given target.  The bounds are cached, since A* asks for the
+        bound of a node every time it finds a shorter path to it.
+        """
+        target_distances = self.distances[target]
+        cache = {}
+        def potential(node):
+            value = cache.get(node)
+            if value is None:
+                value = self._lower_bound(self.distances[node],
+                    target_distances)
+                cache[node] = value
+            return value
+        return potential
+
+
+def _search(graph, source, target, potential):
+    # A* from source to target; with a potential of zero, this is Dijkstra
+    stats = QueryStats()
+    nodes = [source]
+    handles = {source:0}
+    distances = [0.0]
+    parents = [-1]
+    settled = [False]
+    queue = IndexedHeap()
+    queue.insert(0, potential(source))
+    target_handle = None
+    while queue:
+        (handle, unused_key) = queue.pop_min()
+        settled[handle] = True
+        stats.num_settled += 1
+        node = nodes[handle]
+        if node == target:
+            target_handle = handle
+            break
+        distance = distances[handle]
+        for (adjacent_node, weight) in graph[node].iteritems():
+            stats.num_relaxed += 1
+            new_distance = distance + weight
+            adjacent_handle = handles.get(adjacent_node)
+            if adjacent_handle is None:
+                adjacent_handle = len(nodes)
+                handles[adjacent_node] = adjacent_handle
+                nodes.append(adjacent_node)
+                distances.append(new_distance)
+                parents.append(handle)
+                settled.append(False)
+                queue.insert(adjacent_handle,
+                    new_distance + potential(adjacent_node))
+            elif (not settled[adjacent_handle]
+                    and new_distance < distances[adjacent_handle]):
+                distances[adjacent_handle] = new_distance
+                parents[adjacent_handle] = handle
+                queue.decrease_key(adjacent_handle,
+                    new_distance + potential(adjacent_node))
+
+    if target_handle is None:
+        return (None, None, stats)
+    path = []
+    handle = target_handle
+    while handle >= 0:
+        path.append(nodes[handle])
+        handle = parents[handle]
+    path.reverse()
+    return (distances[target_handle], path, stats)
+
+
+def dijkstra_query(graph, source, target):
+    """
+    Finds the shortest path from *source* to *target* with Dijkstra's
+    algorithm, stopping as soon as the target is settled.  Returns a tuple
+    whose values are the distance, the path (a list of nodes) and a
+    QueryStats; the distance and path are None if there is no path.
+    """
+    return _search(graph, source, target, lambda node: 0.0)
+
+
+def astar(graph, index, source, target):
+    """
+    Finds the shortest path from *source* to *target* with A*, using the
+    lower bounds from the given LandmarkIndex of the graph.  Returns the same
+    as dijkstra_query().
+    """
+    return _search(graph, source, target, index.potential_towards(target))
+
+
+def bidirectional_astar(graph, index, source, target):
+    """
+    Finds the shortest path from *source* to *target* with A* searches from
+    both ends at once, using the lower bounds from the given LandmarkIndex of
+    the graph.  Returns the same as dijkstra_query().
+
+    Both searches use the average of the forward and reverse potentials,
+        p(v) = (bound(v, target) - bound(source, v)) / 2
+    forwards and -p(v) backwards, which keeps them consistent with each
+    other.  With those potentials the search can stop as soon as the smallest
+    keys of the two queues add up to at least the best path found so far.
+    """
+    stats = QueryStats()
+    if source == target:
+        stats.num_settled += 1
+        return (0.0, [source], stats)
+
+    to_target = index.potential_towards(target)
+    from_source = index.potential_towards(source)
+    cache = {}
+    def forward_potential(node):
+        value = cache.get(node)
+        if value is None:
+            value = (to_target(node) - from_source(node)) / 2.0
+            cache[node] = value
+        return value
+
+    # per direction: distances, parents and settled nodes keyed by node, and
+    # a queue of handles into a list of nodes shared by both directions
+    nodes = []
+    handles = {}
+    def handle_of(node):
+        handle = handles.get(node)
+        if handle is None:
+            handle = len(nodes)
+            handles[node] = handle
+            nodes.append(node)
+        return handle
+
+    distances = ({source:0.0}, {target:0.0})
+    parents = ({source:None}, {target:None})
+    settled = (set(), set())
+    queues = (IndexedHeap(), IndexedHeap())
+    signs = (1.0, -1.0)
+    queues[0].insert(handle_of(source), forward_potential(source))
+    queues[1].insert(handle_of(target), -forward_potential(target))
+
+    best_distance = INFINITY
+    meeting_node = None
+    while queues[0] and queues[1]:
+        forward_key = queues[0].peek_min()[1]
+        reverse_key = queues[1].peek_min()[1]
+        if forward_key + reverse_key >= best_distance:
+            break
+        direction = 0 if forward_key <= reverse_key else 1
+        other = 1 - direction
+        (handle, unused_key) = queues[direction].pop_min()
+        node = nodes[handle]
+        settled[direction].add(node)
+        stats.num_settled += 1
+        distance = distances[direction][node]
+        sign = signs[direction]
+        for (adjacent_node, weight) in graph[node].iteritems():
+            stats.num_relaxed += 1
+            if adjacent_node in settled[direction]:
+                continue
+            new_distance = distance + weight
+            cur_distance = distances[direction].get(adjacent_node)
+            if cur_distance is None:
+                distances[direction][adjacent_node] = new_distance
+                parents[direction][adjacent_node] = node
+                queues[direction].insert(handle_of(adjacent_node),
+                    new_distance + sign * forward_potential(adjacent_node))
+            elif new_distance < cur_distance:
+                distances[direction][adjacent_node] = new_distance
+                parents[direction][adjacent_node] = node
+                queues[direction].decrease_key(handles[adjacent_node],
+                    new_distance + sign * forward_potential(adjacent_node))
+            else:
+                continue
+            other_distance = distances[other].get(adjacent_node)
+            if other_distance is not None:
+                if new_distance + other_distance < best_distance:
+                    best_distance = new_distance + other_distance
+                    meeting_node = adjacent_node
+
+    if meeting_node is None:
+        return (None, None, stats)
+    path = []
+    node = meeting_node
+    while node is not None:
+        path.append(node)
+        node = parents[0][node]
+    path.reverse()
+    node = parents[1][meeting_node]
+    while node is not None:
+        path.append(node)
+        node = parents[1][node]
+    return (best_distance, path, stats)
+
+
+class LandmarkSearchTests(unittest.TestCase):
+
+    COMICS = {
+        1: ["A", "B"],
+        2: ["A", "B", "C"],
+        3: ["B", "C"],
+        4: ["D", "E", "F"],
+        5: ["D", "A", "B"],
+        6: ["E", "A", "B"],
+        7: ["F", "G"],
+        8: ["A", "D"],
+        9: ["A", "D"],
+        10: ["G", "H"],
+        11: ["H", "I"],
+        12: ["I", "J"],
+        13: ["J", "K"],
+        14: ["X", "Y"],
+    }
+
+    def setUp(self):
+        self.graph = create_marvel_graph(self.COMICS)
+
+    def test_SelectLandmarksByDegree(self):
+        (landmarks, unused_trees) = select_landmarks(self.graph, 2, "degree")
+        self.assertListEqual(sorted(landmarks), ["A", "B"])
+
+    def test_SelectLandmarksFarthest(self):
+        (landmarks, trees) = select_landmarks(self.graph, 2)
+        self.assertEqual(len(landmarks), 2)
+        self.assertEqual(len(trees), 2)
+        # the farthest node from the best-connected character is K
+        self.assertEqual(landmarks[0], "K")
+
+    def test_SelectLandmarksUnknownStrategy(self):
+        self.assertRaises(ValueError, select_landmarks, self.graph, 2, "x")
+
+    def test_LowerBoundIsALowerBound(self):
+        index = LandmarkIndex(self.graph, 3)
+        for source in self.graph:
+            tree = dijkstra(self.graph, source)
+            for target in tree:
+                self.assertLessEqual(index.lower_bound(source, target),
+                    tree.distance(target) + 1e-9)
+
+    def assert_same_as_dijkstra(self, search):
+        for source in self.graph:
+            tree = dijkstra(self.graph, source)
+            for target in self.graph:
+                (distance, path, stats) = search(source, target)
+                if target not in tree:
+                    self.assertIsNone(distance)
+                    self.assertIsNone(path)
+                    continue
+                self.assertAlmostEqual(distance, tree.distance(target))
+                self.assertEqual(path[0], source)
+                self.assertEqual(path[-1], target)
+                path_distance = sum(self.graph[path[i]][path[i + 1]]
+                    for i in xrange(len(path) - 1))
+                self.assertAlmostEqual(path_distance, distance)
+                self.assertGreater(stats.num_settled, 0)
+
+    def test_DijkstraQuery(self):
+        self.assert_same_as_dijkstra(
+            lambda s, t: dijkstra_query(self.graph, s, t))
+
+    def test_AStar(self):
+        index = LandmarkIndex(self.graph, 3)
+        self.assert_same_as_dijkstra(
+            lambda s, t: astar(self.graph, index, s, t))
+
+    def test_AStarWithDegreeLandmarks(self):
+        index = LandmarkIndex(self.graph, 3, "degree")
+        self.assert_same_as_dijkstra(
+            lambda s, t: astar(self.graph, index, s, t))
+
+    def test_BidirectionalAStar(self):
+        index = LandmarkIndex(self.graph, 3)
+        self.assert_same_as_dijkstra(
+            lambda s, t: bidirectional_astar(self.graph, index, s, t))
+
+    def test_AStarSettlesFewerNodesOnAChain(self):
+        index = LandmarkIndex(self.graph, 2)
+        (unused_distance, unused_path, dijkstra_stats) = dijkstra_query(
+            self.graph, "G", "K")
+        (unused_distance, unused_path, astar_stats) = astar(self.graph, index,
+            "G", "K")
+        self.assertLess(astar_stats.num_settled, dijkstra_stats.num_settled)
+
+
+if __name__ == "__main__":
+    import random
+    import time
+    print("load_marvel_characters()")
+    comics = load_marvel_characters()
+    print("create_marvel_graph()")
+    graph = create_marvel_graph(comics)
+    print("LandmarkIndex()")
+    index = LandmarkIndex(graph)
+    rng = random.Random(215)
+    characters = sorted(graph)
+    queries = [(rng.choice(characters), rng.choice(characters))
+        for _ in xrange(100)]
+    searches = [
+        ("dijkstra", lambda s, t: dijkstra_query(graph, s, t)),
+        ("astar", lambda s, t: astar(graph, index, s, t)),
+        ("bidirectional", lambda s, t: bidirectional_astar(graph, index, s, t)),
+    ]
+    for (name, search) in searches:
+        num_settled = 0
+        start_time = time.time()
+        for (source, target) in queries:
+            num_settled += search(source, target)[2].num_settled
+        elapsed_time = time.time() - start_time
+        print("{:<14} settled={:>9} seconds={:.3f}".format(name, num_settled,
+            elapsed_time))
@@ -28,9 +28,15 @@ We've given you two of the paths. There are over 20 000 more.
 When you've found the total number, fill your answer in box.
 """
 
+import collections
 import csv
+import multiprocessing
 import unittest
 
+from cs215.finalexam.heap import IndexedHeap
+from cs215.finalexam.shortest_paths import CompactGraph
+from cs215.finalexam.shortest_paths import algebraic_dijkstra
+
 def load_marvel_characters():
     """
     Reads the marvel comic characters graph from "marvel_characters.txt".
@@ -91,205 +97,234 @@ def create_marvel_graph(comics):
     return graph
 
 
+class ShortestHopsDag(object):
+    """
+    Every shortest path by number of hops from a source node, as found by
+    get_shortest_hops().
+
+    Instead of a list of every shortest path, which can grow exponentially,
+    each node stores its depth (number of hops from the source), the set of
+    its predecessors on shortest paths and the number of shortest paths to
+    it.  Paths are only enumerated on request.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.depths = {} # node -> number of hops from the source
+        self.predecessors = {} # node -> set of predecessors on shortest paths
+        self.num_paths = {} # node -> number of shortest paths to the node
+
+    def __len__(self):
+        return len(self.depths)
+
+    def __contains__(self, node):
+        return node in self.depths
+
+    def __iter__(self):
+        return iter(self.depths)
+
+    def depth(self, node):
+        """
+        Returns the number of hops in a shortest path to the given node.
+        """
+        return self.depths[node]
+
+    def is_shortest_path(self, path):
+        """
+        Returns True if the given list of nodes is one of the shortest paths
+        by hops from the source to the last node in the list.  This is
+        O(len(path)).
+        """
+        if not path or path[0] != self.source:
+            return False
+        depth = self.depths.get(path[-1])
+        if depth is None or depth != len(path) - 1:
+            return False
+        predecessors = self.predecessors
+        for i in xrange(1, len(path)):
+            if path[i - 1] not in predecessors[path[i]]:
+                return False
+        return True
+
+    def iter_paths(self, node):
+        """
+        Generates every shortest path by hops from the source to the given
+        node, one list of nodes at a time.
+        """
+        if node not in self.depths:
+            return
+        predecessors = self.predecessors
+        # a stack of (node, path from that node to the given node) pairs,
+        # walking from the given node back towards the source
+        unfinished = [(node, [node])]
+        while unfinished:
+            (cur_node, reversed_path) = unfinished.pop()
+            if cur_node == self.source:
+                yield reversed_path[::-1]
+                continue
+            for predecessor in predecessors[cur_node]:
+                unfinished.append((predecessor, reversed_path + [predecessor]))
+
+
 def get_shortest_hops(graph, node):
     """
     Calculates the shortest paths by number of hops in the given graph from the
-    given node to all other nodes.  Returns a dict whose keys are the nodes in
-    the given graph and whose values are lists of lists of nodes whose values
-    represent a shortest path by hops.
+    given node to all other nodes.  Returns a ShortestHopsDag whose nodes are
+    the nodes reachable from the given node.
 
     Depending on the graph, it is possible for there to be more than one
-    shortest path between two nodes.  That is why the values of the dict are
-    lists of lists (lists of shortest paths) instead of just a single list.
+    shortest path between two nodes.  Each node is visited once, recording
+    all of its predecessors on shortest paths and the number of shortest
+    paths to it, so this is O(n + m) however many shortest paths there are.
     """
-    unvisited_nodes = [(node, [node])]
-    shortest_hops = {node: [[node]]}
+    dag = ShortestHopsDag(node)
+    depths = dag.depths
+    predecessors = dag.predecessors
+    num_paths = dag.num_paths
+    depths[node] = 0
+    predecessors[node] = set()
+    num_paths[node] = 1
+    unvisited_nodes = collections.deque([node])
     while unvisited_nodes:
-        (node, path) = unvisited_nodes[0]
-        del unvisited_nodes[0]
+        node = unvisited_nodes.popleft()
+        adjacent_depth = depths[node] + 1
+        node_num_paths = num_paths[node]
         for adjacent_node in graph[node]:
-            shortest_path = path + [adjacent_node]
-            if adjacent_node not in shortest_hops:
-                shortest_hops[adjacent_node] = [shortest_path]
-                unvisited_nodes.append((adjacent_node, shortest_path))
-            else:
-                shortest_paths = shortest_hops[adjacent_node]
-                cur_shortest_path_len = len(shortest_paths[0])
-                if len(shortest_path) == cur_shortest_path_len:
-                    shortest_paths.append(shortest_path)
-                    unvisited_nodes.append((adjacent_node, shortest_path))
-                else:
-                    # sanity check
-                    assert len(shortest_path) > cur_shortest_path_len
-    return shortest_hops
+            depth = depths.get(adjacent_node)
+            if depth is None:
+                depths[adjacent_node] = adjacent_depth
+                predecessors[adjacent_node] = set([node])
+                num_paths[adjacent_node] = node_num_paths
+                unvisited_nodes.append(adjacent_node)
+            elif depth == adjacent_depth:
+                predecessors[adjacent_node].add(node)
+                num_paths[adjacent_node] += node_num_paths
+    return dag
 
 
 def get_shortest_weighted_paths(graph, node):
     """
     Calculates the shortest weighted path in the given graph from the given
-    node to all other nodes.  Returns a dict whose keys are the nodes in the
-    given graph and whose values are list of nodes whose values represent the
-    shortest path by weight.
+    node to all other nodes.  Returns a ShortestPathTree whose nodes are the
+    nodes reachable from the given node.
     """
     return dijkstra(graph, node)
 
-class Heap(object):
+class ShortestPathTree(object):
+    """
+    The shortest weighted paths from a source node to every node reachable
+    from it, as found by dijkstra().
 
-    def __init__(self):
-        self.values = []
-        self.name_index_map = {}
+    Rather than a list of nodes per path, only the distance, the parent and
+    the number of hops of each node's path are stored, in lists indexed by
+    a handle that dijkstra() gives each node.  Paths are rebuilt on request
+    by following the parents back to the source.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.nodes = [] # handle -> node
+        self.handles = {} # node -> handle
+        self.distances = [] # handle -> distance from the source
+        self.parents = [] # handle -> handle of the parent, or -1 for the source
+        self.hops = [] # handle -> number of edges in the path from the source
 
     def __len__(self):
-        return len(self.values)
-
-    def __contains__(self, name):
-        return name in self.name_index_map
-
-    def add(self, name, value, path):
-        element = (name, value, path)
-        index = len(self.values)
-        self.values.append(element)
-        self.name_index_map[name] = index
-        self._up_heapify(index)
-
-    def remove_smallest_element(self):
-        element = self.values[0]
-        element_name = element[0]
-        del self.name_index_map[element_name]
-
-        last_element = self.values[-1]
-        del self.values[-1]
-        if len(self.values) > 0:
-            self.values[0] = last_element
-            last_element_name = last_element[0]
-            self.name_index_map[last_element_name] = 0
-            self._down_heapify(0)
-        return element
-
-    def get_value(self, name):
-        index = self.name_index_map[name]
-        element = self.values[index]
-        value = element[1]
-        return value
-
-    def get_path(self, name):
-        index = self.name_index_map[name]
-        element = self.values[index]
-        path = element[2]
+        return len(self.nodes)
+
+    def __contains__(self, node):
+        return node in self.handles
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    def distance(self, node):
+        """
+        Returns the weight of the shortest path to the given node.
+        """
+        return self.distances[self.handles[node]]
+
+    def num_hops(self, node):
+        """
+        Returns the number of edges in the shortest path to the given node.
+        """
+        return self.hops[self.handles[node]]
+
+    def path_to(self, node):
+        """
+        Returns the shortest path to the given node as a list of nodes that
+        starts with the source and ends with the given node.
+        """
+        handle = self.handles[node]
+        path = []
+        while handle >= 0:
+            path.append(self.nodes[handle])
+            handle = self.parents[handle]
+        path.reverse()
         return path
 
-    def set_value(self, name, new_value, new_path):
-        index = self.name_index_map[name]
-        old_element = self.values[index]
-        old_value = old_element[1]
-        assert new_value <= old_value, "new_value={} old_value={}".format(new_value, old_value)
-        new_element = (name, new_value, new_path)
-        self.values[index] = new_element
-        self._up_heapify(index)
-
-    def _up_heapify(self, index):
-        element = self.values[index]
-        value = element[1]
-        while index > 0:
-            parent_index = self._parent_index(index)
-            parent_element = self.values[parent_index]
-            parent_value = parent_element[1]
-            if value < parent_value:
-                self._swap(index, parent_index)
-                index = parent_index
-            else:
-                break # heap property is satisfied
-
-    def _down_heapify(self, index):
-        element = self.values[index]
-        value = element[1]
-        while True:
-            left_child_index = self._left_child_index(index)
-            right_child_index = self._right_child_index(index)
-
-            if left_child_index >= len(self.values):
-                left_child_element = None
-            else:
-                left_child_element = self.values[left_child_index]
+    def is_path_to(self, node, path):
+        """
+        Returns True if the given list of nodes is the shortest path that this
+        tree holds for the given node, comparing it against the parents from
+        the given node back to the source rather than building the path.
+        """
+        handle = self.handles[node]
+        if len(path) != self.hops[handle] + 1:
+            return False
+        nodes = self.nodes
+        parents = self.parents
+        for i in xrange(len(path) - 1, -1, -1):
+            if path[i] != nodes[handle]:
+                return False
+            handle = parents[handle]
+        return True
+
+def count_hops(final_dist):
+    """
+    Returns a dict mapping each node in the given dict from algebraic_dijkstra()
+    to the number of edges in its path from the source, following each chain
+    of parents only as far as a node whose count is already known.
+    """
+    hops = {}
+    for node in final_dist:
+        unknown = []
+        while node not in hops:
+            parent = final_dist[node][1]
+            if parent is None:
+                hops[node] = 0
+                break
+            unknown.append(node)
+            node = parent
+        num_hops = hops[node]
+        for node in reversed(unknown):
+            num_hops += 1
+            hops[node] = num_hops
+    return hops
+
+def dijkstra(G, v, make_queue=IndexedHeap):
+    """
+    Calculates the shortest weighted paths in the given graph from the given
+    node to all nodes reachable from it, with algebraic_dijkstra().  Returns a
+    ShortestPathTree.
 
-            if right_child_index >= len(self.values):
-                right_child_element = None
-            else:
-                right_child_element = self.values[right_child_index]
-
-            if left_child_element is None:
-                assert right_child_element is None # sanity check
-                break # we are a leaf node; no more down_heapifying necessary
-            elif right_child_element is None:
-                left_child_value = left_child_element[1]
-                if value > left_child_value:
-                    self._swap(index, left_child_index)
-                break # we are a left node; no more down_heapifying necessary
-            else:
-                left_child_value = left_child_element[1]
-                right_child_value = right_child_element[1]
-                if value <= left_child_value and value <= right_child_value:
-                    break # heap property satisfied
-                if left_child_value > right_child_value:
-                    swap_index = right_child_index
-                else:
-                    swap_index = left_child_index
-                self._swap(index, swap_index)
-                index = swap_index
-
-    def _swap(self, index1, index2):
-        element1 = self.values[index1]
-        element2 = self.values[index2]
-        self.values[index1] = element2
-        self.values[index2] = element1
-        name1 = element1[0]
-        name2 = element2[0]
-        self.name_index_map[name1] = index2
-        self.name_index_map[name2] = index1
-
-    def _parent_index(self, index):
-        if index <= 0:
-            raise ValueError("element {} has no parent".format(index))
-        elif index % 2 == 0:
-            parent_index = (index / 2) - 1
-        else:
-            parent_index = (index - 1) / 2
-        return parent_index
-
-    def _left_child_index(self, index):
-        left_child_index = (index * 2) + 1
-        return left_child_index
-
-    def _right_child_index(self, index):
-        right_child_index = (index * 2) + 2
-        return right_child_index
-
-def dijkstra(G, v):
-    dist_so_far = Heap()
-    dist_so_far.add(v, 0.0, [v])
-    final_dist = {}
-    while len(final_dist) < len(G):
-        try:
-            shortest_dist_node = dist_so_far.remove_smallest_element()
-        except IndexError:
-            break # no more nodes left; this must be a disconnected graph
-        w = shortest_dist_node[0]
-        shortest_path_length = shortest_dist_node[1]
-        shortest_path = shortest_dist_node[2]
-        # lock it down!
-        final_dist[w] = (shortest_path_length, shortest_path)
-        for x in G[w]:
-            if x not in final_dist:
-                if x not in dist_so_far:
-                    distance = final_dist[w][0] + G[w][x]
-                    dist_so_far.add(x, distance, final_dist[w][1] + [x])
-                else:
-                    dist_so_far_x = dist_so_far.get_value(x)
-                    possibly_smaller_dist_so_far_x = final_dist[w][0] + G[w][x]
-                    if possibly_smaller_dist_so_far_x < dist_so_far_x:
-                        dist_so_far.set_value(x, possibly_smaller_dist_so_far_x,
-                            final_dist[w][1] + [x])
-    return {x:final_dist[x][1] for x in final_dist}
+    *make_queue* is called with no arguments to create the priority queue;
+    it may be any of the queues from cs215.finalexam.heap, such as
+    IndexedHeap, a d-ary IndexedHeap or a PairingHeap.
+    """
+    final_dist = algebraic_dijkstra(G, v, make_queue=make_queue)
+    hops = count_hops(final_dist)
+    tree = ShortestPathTree(v)
+    for (node, (distance, unused_parent)) in final_dist.iteritems():
+        tree.handles[node] = len(tree.nodes)
+        tree.nodes.append(node)
+        tree.distances.append(distance)
+        tree.hops.append(hops[node])
+    handles = tree.handles
+    for node in tree.nodes:
+        parent = final_dist[node][1]
+        tree.parents.append(-1 if parent is None else handles[parent])
+    return tree
 
 def get_num_different_paths(comics, characters):
     print("create_marvel_graph()")
@@ -302,9 +337,10 @@ def get_num_different_paths(comics, characters):
 
         for node in shortest_hops:
             assert node in shortest_weighted_paths # sanity check
-            shortest_hops_paths = shortest_hops[node]
-            weighted_path = shortest_weighted_paths[node]
-            if weighted_path not in shortest_hops_paths:
+            # the weighted path is one of the shortest paths by hops exactly
+            # when it has as few hops as they do
+            num_hops = shortest_hops.depth(node)
+            if shortest_weighted_paths.num_hops(node) != num_hops:
                 count += 1
 
         # just a sanity check
@@ -313,6 +349,85 @@ def get_num_different_paths(comics, characters):
 
     return count
 
+def count_different_paths(compact_graph, source):
+    """
+    Counts the nodes whose shortest weighted path from the node with the
+    given handle in the given CompactGraph has a different number of hops
+    than a shortest path by hops, just like one iteration of
+    get_num_different_paths() does.  Edges are visited in the same order as
+    in the dict graph, so ties are broken the same way.
+    """
+    num_nodes = len(compact_graph)
+    offsets = compact_graph.offsets
+    targets = compact_graph.targets
+
+    # number of hops by breadth-first search
+    depths = [-1] * num_nodes
+    depths[source] = 0
+    unvisited_nodes = collections.deque([source])
+    while unvisited_nodes:
+        node = unvisited_nodes.popleft()
+        adjacent_depth = depths[node] + 1
+        for i in xrange(offsets[node], offsets[node + 1]):
+            adjacent_node = targets[i]
+            if depths[adjacent_node] < 0:
+                depths[adjacent_node] = adjacent_depth
+                unvisited_nodes.append(adjacent_node)
+
+    # number of hops of the shortest weighted paths
+    final_dist = algebraic_dijkstra(compact_graph, compact_graph.nodes[source])
+    hops = count_hops(final_dist)
+    handles = compact_graph.handles
+    return sum(1 for node in final_dist
+        if hops[node] != depths[handles[node]])
+
+
+# the CompactGraph of a worker process, set by _init_worker()
+_worker_graph = None
+
+def _init_worker(compact_graph):
+    global _worker_graph
+    _worker_graph = compact_graph
+
+def _count_different_paths_in_worker(source):
+    return (source, count_different_paths(_worker_graph, source))
+
+
+def count_different_paths_by_source(compact_graph, sources, processes=None):
+    """
+    Runs count_different_paths() for each of the given source handles, fanned
+    out over a pool of *processes* worker processes (by default, one per
+    CPU) that share the given CompactGraph.  Returns a list of (source,
+    count) tuples, one for each of the given sources, even repeated ones, in
+    the order in which they finish.
+    """
+    pool = multiprocessing.Pool(processes, initializer=_init_worker,
+        initargs=(compact_graph,))
+    try:
+        counts = list(pool.imap_unordered(_count_different_paths_in_worker,
+            sources))
+    finally:
+        pool.close()
+        pool.join()
+    return counts
+
+
+def get_num_different_paths_parallel(comics, characters=None, processes=None):
+    """
+    Does the same as get_num_different_paths(), but processes the characters
+    in parallel in *processes* worker processes (by default, one per CPU).
+    If *characters* is None then every character in the comics is processed.
+    """
+    print("create_marvel_graph()")
+    graph = create_marvel_graph(comics)
+    compact_graph = CompactGraph(graph, shared=True)
+    del graph
+    if characters is None:
+        characters = compact_graph.nodes
+    sources = [compact_graph.handles[character] for character in characters]
+    counts = count_different_paths_by_source(compact_graph, sources, processes)
+    return sum(count for (source, count) in counts)
+
 class DenverTests(unittest.TestCase):
 
     def test_3Nodes(self):
@@ -383,6 +498,157 @@ class DenverTests(unittest.TestCase):
         self.assertEqual(get_num_different_paths(comics, ["B"]), 3)
         self.assertEqual(get_num_different_paths(comics, ["C"]), 4)
 
+class DijkstraTests(unittest.TestCase):
+
+    def create_graph(self):
+        return {
+            "A": {"B": 1.0, "C": 0.25},
+            "B": {"A": 1.0, "C": 0.5, "D": 0.25},
+            "C": {"A": 0.25, "B": 0.5},
+            "D": {"B": 0.25},
+            "E": {},
+        }
+
+    def test_Distances(self):
+        tree = dijkstra(self.create_graph(), "A")
+        self.assertEqual(len(tree), 4)
+        self.assertEqual(tree.distance("A"), 0.0)
+        self.assertEqual(tree.distance("B"), 0.75)
+        self.assertEqual(tree.distance("D"), 1.0)
+
+    def test_UnreachableNode(self):
+        tree = dijkstra(self.create_graph(), "A")
+        self.assertNotIn("E", tree)
+        self.assertSetEqual(set(tree), set(["A", "B", "C", "D"]))
+
+    def test_PathTo(self):
+        tree = dijkstra(self.create_graph(), "A")
+        self.assertListEqual(tree.path_to("A"), ["A"])
+        self.assertListEqual(tree.path_to("D"), ["A", "C", "B", "D"])
+        self.assertEqual(tree.num_hops("D"), 3)
+
+    def test_IsPathTo(self):
+        tree = dijkstra(self.create_graph(), "A")
+        self.assertTrue(tree.is_path_to("D", ["A", "C", "B", "D"]))
+        self.assertFalse(tree.is_path_to("D", ["A", "B", "D"]))
+        self.assertFalse(tree.is_path_to("D", ["E", "C", "B", "D"]))
+        self.assertTrue(tree.is_path_to("A", ["A"]))
+
+class ShortestHopsTests(unittest.TestCase):
+
+    def create_graph(self):
+        # two hops from A to D either way around the square, and E hangs off D
+        return {
+            "A": {"B": 1, "C": 1},
+            "B": {"A": 1, "D": 1},
+            "C": {"A": 1, "D": 1},
+            "D": {"B": 1, "C": 1, "E": 1},
+            "E": {"D": 1},
+            "F": {},
+        }
+
+    def test_Depths(self):
+        dag = get_shortest_hops(self.create_graph(), "A")
+        self.assertEqual(len(dag), 5)
+        self.assertEqual(dag.depth("A"), 0)
+        self.assertEqual(dag.depth("D"), 2)
+        self.assertEqual(dag.depth("E"), 3)
+        self.assertNotIn("F", dag)
+
+    def test_NumPaths(self):
+        dag = get_shortest_hops(self.create_graph(), "A")
+        self.assertEqual(dag.num_paths["A"], 1)
+        self.assertEqual(dag.num_paths["B"], 1)
+        self.assertEqual(dag.num_paths["D"], 2)
+        self.assertEqual(dag.num_paths["E"], 2)
+
+    def test_IsShortestPath(self):
+        dag = get_shortest_hops(self.create_graph(), "A")
+        self.assertTrue(dag.is_shortest_path(["A"]))
+        self.assertTrue(dag.is_shortest_path(["A", "B", "D", "E"]))
+        self.assertTrue(dag.is_shortest_path(["A", "C", "D", "E"]))
+        self.assertFalse(dag.is_shortest_path(["A", "B", "D", "C"]))
+        self.assertFalse(dag.is_shortest_path(["B", "D", "E"]))
+        self.assertFalse(dag.is_shortest_path(["A", "B", "A", "C"]))
+        self.assertFalse(dag.is_shortest_path([]))
+
+    def test_IterPaths(self):
+        dag = get_shortest_hops(self.create_graph(), "A")
+        paths = sorted(dag.iter_paths("E"))
+        self.assertListEqual(paths, [["A", "B", "D", "E"], ["A", "C", "D", "E"]])
+        self.assertListEqual(list(dag.iter_paths("A")), [["A"]])
+        self.assertListEqual(list(dag.iter_paths("F")), [])
+
+    def test_NumPathsGrowsExponentially(self):
+        # a chain of 30 diamonds has 2**30 shortest paths end to end
+        graph = collections.defaultdict(dict)
+        for i in xrange(30):
+            for middle in ("L", "R"):
+                graph[i][(i, middle)] = 1
+                graph[(i, middle)][i] = 1
+                graph[(i, middle)][i + 1] = 1
+                graph[i + 1][(i, middle)] = 1
+        dag = get_shortest_hops(graph, 0)
+        self.assertEqual(dag.num_paths[30], 2 ** 30)
+        self.assertEqual(dag.depth(30), 60)
+
+class ParallelTests(unittest.TestCase):
+
+    COMICS = {
+        1: ["A", "B"],
+        2: ["A", "B", "C"],
+        3: ["B", "C"],
+        4: ["D", "E", "F"],
+        5: ["D", "A", "B"],
+        6: ["E", "A", "B"],
+        7: ["F", "G"],
+        8: ["A", "D"],
+        9: ["A", "D"],
+        10: ["H", "I"],
+    }
+
+    def test_CompactGraph(self):
+        graph = create_marvel_graph(self.COMICS)
+        compact_graph = CompactGraph(graph, shared=True)
+        self.assertEqual(len(compact_graph), len(graph))
+        for (handle, node) in enumerate(compact_graph.nodes):
+            start = compact_graph.offsets[handle]
+            end = compact_graph.offsets[handle + 1]
+            edges = {compact_graph.nodes[compact_graph.targets[i]]:
+                compact_graph.weights[i] for i in xrange(start, end)}
+            self.assertDictEqual(edges, graph[node])
+
+    def test_CountMatchesSerial(self):
+        graph = create_marvel_graph(self.COMICS)
+        compact_graph = CompactGraph(graph, shared=True)
+        for character in graph:
+            expected = get_num_different_paths(self.COMICS, [character])
+            actual = count_different_paths(compact_graph,
+                compact_graph.handles[character])
+            self.assertEqual(actual, expected)
+
+    def test_Parallel(self):
+        characters = ["A", "B", "C", "H"]
+        expected = get_num_different_paths(self.COMICS, characters)
+        actual = get_num_different_paths_parallel(self.COMICS, characters,
+            processes=2)
+        self.assertEqual(actual, expected)
+
+    def test_ParallelRepeatedCharacters(self):
+        # like the serial loop, a repeated character is counted every time
+        characters = ["B", "C", "B", "B"]
+        expected = get_num_different_paths(self.COMICS, characters)
+        self.assertGreater(expected, 0)
+        actual = get_num_different_paths_parallel(self.COMICS, characters,
+            processes=2)
+        self.assertEqual(actual, expected)
+
+    def test_ParallelAllCharacters(self):
+        expected = get_num_different_paths(self.COMICS, sorted(
+            create_marvel_graph(self.COMICS)))
+        actual = get_num_different_paths_parallel(self.COMICS, processes=2)
+        self.assertEqual(actual, expected)
+
 CHARACTERS_OF_INTEREST = [
     'SPIDER-MAN/PETER PAR',
     'GREEN GOBLIN/NORMAN ',
@@ -394,5 +660,5 @@ CHARACTERS_OF_INTEREST = [
 if __name__ == "__main__":
     print("load_marvel_characters()")
     comics = load_marvel_characters()
-    count = get_num_different_paths(comics, CHARACTERS_OF_INTEREST)
+    count = get_num_different_paths_parallel(comics, CHARACTERS_OF_INTEREST)
     print count
@@ -22,9 +22,24 @@
 # Hint: A variation of Dijkstra can be used to solve this problem.
 #
 
+import argparse
 import collections
 import io
+import os
 import pprint
+import unittest
+
+from cs215.finalexam.shortest_paths import BOTTLENECK
+from cs215.finalexam.shortest_paths import CompactGraph
+from cs215.finalexam.shortest_paths import algebraic_dijkstra
+from cs215.unit05.bottleneck_forest import BottleneckForest
+from cs215.unit05.contraction_hierarchy import ContractionHierarchy
+from cs215.unit05.contraction_hierarchy import build_contraction_hierarchy
+
+# where the contraction hierarchy of the imdb graph is cached between runs;
+# it is rebuilt whenever it is older than any of the GRAPH_FILENAMES
+HIERARCHY_FILENAME = "imdb-obscurity-hierarchy.pkl"
+GRAPH_FILENAMES = ("imdb-1.tsv", "imdb-weights.tsv")
 
 class Movie(object):
     __slots__ = ("name", "year", "__hash__")
@@ -41,6 +56,9 @@ class Movie(object):
         return "{} ({})".format(self.name, self.year)
     def __repr__(self):
         return "Movie({0.name!r}, {0.year!r}, {0.obscurity_score!r})".format(self)
+    def __reduce__(self):
+        # the bound __hash__ slot cannot be pickled, so rebuild it instead
+        return (Movie, (self.name, self.year))
 
 
 class Actor(object):
@@ -54,6 +72,8 @@ class Actor(object):
         return u"{}".format(self.name)
     def __repr__(self):
         return "Actor({!r})".format(self.name)
+    def __reduce__(self):
+        return (Actor, (self.name,))
 
 
 def load_graph():
@@ -111,43 +131,60 @@ def calculate_least_obscure_path_weight(graph, actor1, actor2):
     *graph* must be the object returned from load_graph().
     *actor1* and *actor2* must be the two Actor objects from actors whose
     least obscure path score to calculate.
+    *graph* may also be a CompactGraph of that object, to save rebuilding it
+    for every pair of actors.
+    """
+    if not isinstance(graph, CompactGraph):
+        graph = CompactGraph(graph)
+    final_dist = algebraic_dijkstra(graph, actor1, BOTTLENECK, target=actor2)
+    if actor2 not in final_dist:
+        raise Exception("unable to find path between the given nodes in the given graph")
+    return final_dist[actor2][0]
+
+def calculate_least_obscure_path_weights(graph, actor_name_pairs):
+    """
+    Calculates the same weight as calculate_least_obscure_path_weight() for
+    many pairs of actors at once, using a BottleneckForest of the graph.
+    Returns a dict mapping each of the given (actor1_name, actor2_name)
+    tuples to the weight of the least obscure path between them.
+    *graph* must be the object returned from load_graph().
+    """
+    forest = BottleneckForest(graph)
+    actor_pairs = {(Actor(name1), Actor(name2)): (name1, name2)
+        for (name1, name2) in actor_name_pairs}
+    weights = forest.query_all(actor_pairs)
+    return {actor_pairs[pair]:weights[pair] for pair in weights}
+
+def is_stale(filename, sources=GRAPH_FILENAMES):
+    """
+    Returns whether the given file is missing or older than any of the given
+    source files that exist.
+    """
+    if not os.path.exists(filename):
+        return True
+    mtime = os.path.getmtime(filename)
+    return any(os.path.getmtime(x) > mtime for x in sources
+        if os.path.exists(x))
+
+def load_or_build_hierarchy(graph, filename=HIERARCHY_FILENAME):
     """
-    finished = set()
-    unfinished = {actor1: 0.0}
-
-    while True:
-        (node, node_weight) = find_smallest_value(unfinished)
-        adjacent_nodes = graph[node]
-        for adjacent_node in adjacent_nodes:
-            if adjacent_node not in finished:
-                adjacent_node_weight = adjacent_nodes[adjacent_node]
-                adjacent_node_weight_final = max(adjacent_node_weight, node_weight)
-                if adjacent_node not in unfinished:
-                    unfinished[adjacent_node] = adjacent_node_weight_final
-                else:
-                    cur_adjacent_node_min_weight = unfinished[adjacent_node]
-                    if adjacent_node_weight_final < cur_adjacent_node_min_weight:
-                        unfinished[adjacent_node] = adjacent_node_weight_final
-
-        if node == actor2:
-            result = unfinished[node]
-            return result
-        del unfinished[node]
-        finished.add(node)
-
-    raise Exception("unable to find path between the given nodes in the given graph")
-
-def find_smallest_value(d):
-    smallest_key = None
-    smallest_value = None
-    for key in d:
-        value = d[key]
-        if smallest_value is None or value < smallest_value:
-            smallest_key = key
-            smallest_value = value
-    assert smallest_key is not None
-    return (smallest_key, smallest_value)
+    Returns a ContractionHierarchy of the given graph, from load_graph(), for
+    least obscure path queries.  The hierarchy is loaded from the given file
+    unless is_stale() says it is missing or older than the tsv files that
+    the graph was loaded from; otherwise it is built, which takes a minute
+    or two, and saved to that file for next time.
+    """
+    if not is_stale(filename):
+        print("Loading {}".format(filename))
+        with io.open(filename, "rb") as f:
+            return ContractionHierarchy.load(f)
 
+    print("Building contraction hierarchy")
+    hierarchy = build_contraction_hierarchy(graph, max, 0.0)
+    print("Saving {}".format(filename))
+    with io.open(filename, "wb") as f:
+        hierarchy.save(f)
+    return hierarchy
 
 # Change the `None` values in this dictionary to be the obscurity score
 # of the least obscure path between the two actors
@@ -196,28 +233,92 @@ test = {(u'Ali, Tony', u'Allen, Woody'): 0.5657,
         (u'Thompson, Sophie (I)', u'Foley, Dave (I)'): 0.1095,
         (u'Tzur, Mira', u'Heston, Charlton'): 0.3642}
 
-def run_test(graph):
+def run_test(graph, hierarchy=None):
+    if hierarchy is None:
+        weights = calculate_least_obscure_path_weights(graph, test)
     for actors in test:
         expected = test[actors]
         actor1_name, actor2_name = actors
         actor1, actor2 = Actor(actor1_name), Actor(actor2_name)
         print(u"Testing {} -> {}".format(actor1, actor2))
-        actual = calculate_least_obscure_path_weight(graph, actor1, actor2)
+        if hierarchy is None:
+            actual = weights[actors]
+        else:
+            actual = hierarchy.query(actor1, actor2)
         if actual == expected:
             print(u"PASS")
         else:
             print(u"** FAIL **: actual={} expected={}".format(actual, expected))
 
-def print_answer(graph):
-    results = {}
-    for actors in answer:
-        actor1_name, actor2_name = actors
-        actor1, actor2 = Actor(actor1_name), Actor(actor2_name)
-        print(u"Calculating {} -> {}".format(actor1, actor2))
-        actual = calculate_least_obscure_path_weight(graph, actor1, actor2)
-        results[actors] = actual
+def print_answer(graph, hierarchy=None):
+    if hierarchy is None:
+        results = calculate_least_obscure_path_weights(graph, answer)
+    else:
+        results = {}
+        for actors in answer:
+            actor1_name, actor2_name = actors
+            actor1, actor2 = Actor(actor1_name), Actor(actor2_name)
+            print(u"Calculating {} -> {}".format(actor1, actor2))
+            results[actors] = hierarchy.query(actor1, actor2)
     pprint.pprint(results)
 
+class LeastObscurePathTests(unittest.TestCase):
+
+    def create_graph(self):
+        # two actors who share two movies, and a third who shares one of them
+        graph = collections.defaultdict(dict)
+        for (actor_name, movie_name, obscurity_score) in [
+                (u"A", u"Old", 0.9), (u"B", u"Old", 0.9),
+                (u"A", u"New", 0.2), (u"B", u"New", 0.2),
+                (u"B", u"Rare", 0.7), (u"C", u"Rare", 0.7)]:
+            actor = Actor(actor_name)
+            movie = Movie(movie_name, u"2000")
+            graph[actor][movie] = obscurity_score
+            graph[movie][actor] = obscurity_score
+        return graph
+
+    def test_Untargeted(self):
+        # Actor.__eq__ must not be asked to compare a node with None
+        graph = self.create_graph()
+        for G in (graph, CompactGraph(graph)):
+            final_dist = algebraic_dijkstra(G, Actor(u"A"), BOTTLENECK)
+            self.assertEqual(len(final_dist), 6)
+            self.assertEqual(final_dist[Actor(u"B")][0], 0.2)
+            self.assertEqual(final_dist[Actor(u"C")][0], 0.7)
+
+    def test_Targeted(self):
+        graph = self.create_graph()
+        self.assertEqual(calculate_least_obscure_path_weight(graph,
+            Actor(u"C"), Actor(u"A")), 0.7)
+
+    def test_IsStale(self):
+        import shutil
+        import tempfile
+        directory = tempfile.mkdtemp()
+        try:
+            cache = os.path.join(directory, "cache.pkl")
+            source = os.path.join(directory, "source.tsv")
+            missing = os.path.join(directory, "missing.tsv")
+            self.assertTrue(is_stale(cache, [source]))
+            for filename in (cache, source):
+                with io.open(filename, "wb"):
+                    pass
+            os.utime(source, (1000, 1000))
+            os.utime(cache, (2000, 2000))
+            self.assertFalse(is_stale(cache, [source, missing]))
+            os.utime(source, (3000, 3000))
+            self.assertTrue(is_stale(cache, [source, missing]))
+        finally:
+            shutil.rmtree(directory)
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prints the least obscure "
+        "path weights between the actors in the answer.")
+    parser.add_argument("--hierarchy", action="store_true",
+        help="answer with the contraction hierarchy cached in {} (built on "
+        "first use and again whenever the tsv files change) instead of a "
+        "bottleneck forest".format(HIERARCHY_FILENAME))
+    args = parser.parse_args()
     graph = load_graph()
-    print_answer(graph)
+    hierarchy = load_or_build_hierarchy(graph) if args.hierarchy else None
+    print_answer(graph, hierarchy)